@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services.warmup import warmup
+
+router = APIRouter()
+
+@router.get("/health/live")
+async def live():
+    """Le processus répond (ne dépend d'aucun service)"""
+    return {"status": "alive"}
+
+@router.get("/health/ready")
+async def ready():
+    """Prêt à recevoir du trafic : pool OCR démarré et Tesseract chargé, pas
+    de redémarrage du pool en cours (503 sinon)"""
+    status = warmup.status()
+    return JSONResponse(status_code=200 if warmup.available else 503, content=status)
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services.metrics import render_metrics
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Métriques de ce processus au format Prometheus : durées par étape,
+    requêtes en cours, pages par méthode, files du pool OCR et des jobs"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
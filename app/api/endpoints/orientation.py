@@ -1,10 +1,20 @@
+import asyncio
 import json
 import logging
-from fastapi import APIRouter, HTTPException, Depends
-from app.models.schemas import OrientationProfile
-from app.models.requests import TextInput
-from app.services.cohere_service import get_orientation_data
-from app.services.text_processing import clean_text, parse_cohere_response
+import time
+import uuid
+from fastapi import APIRouter, HTTPException, Depends, File, Form, UploadFile
+from fastapi.responses import StreamingResponse
+from app.api.endpoints.text_extraction import PROCESS_TIMEOUT, validate_file
+from app.models.schemas import PROFILE_FIELDS, OrientationProfile
+from app.models.requests import BatchTextInput, TextInput
+from app.services.batch import ndjson, run_batch
+from app.services.orientation_service import extract_profile, cache_stats
+from app.services.pipeline import document_profile
+from app.services.uploads import remove_upload
+from app.services.warmup import require_ready
+from config.settings import settings
+from typing import Dict, Any, Optional
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -12,28 +22,78 @@ logger = logging.getLogger(__name__)
 @router.post("/process-text", response_model=OrientationProfile)
 async def process_text(input: TextInput):
     try:
-        logger.info(f"Début du traitement - Taille du texte: {len(input.text)} caractères")
+        logger.info("Début du traitement - Taille du texte: %s caractères", len(input.text))
         
-        text = clean_text(input.text)
-        if len(text) < 10:
-            logger.warning("Texte nettoyé trop court")
-            raise HTTPException(400, detail="Le texte doit contenir au moins 10 caractères valides")
-        
-        cohere_response = get_orientation_data(text)
-        profile_data = parse_cohere_response(cohere_response)
-        
-        if not profile_data:
-            logger.error("Échec du parsing de la réponse Cohere")
-            raise HTTPException(422, detail="Impossible d'analyser la réponse de l'IA")
+        profile = await extract_profile(input.text, input.fields)
         
         logger.info("Traitement réussi")
-        return OrientationProfile(**profile_data)
+        return profile
         
     except HTTPException:
         raise  # On laisse passer les HTTPException intentionnelles
     except json.JSONDecodeError as e:
-        logger.error(f"Erreur JSON: {str(e)}")
+        logger.error("Erreur JSON: %s", e)
         raise HTTPException(422, detail="Format de données invalide")
     except Exception as e:
-        logger.critical(f"Erreur critique: {str(e)}", exc_info=True)
-        raise HTTPException(500, detail="Échec du traitement")
\ No newline at end of file
+        logger.critical("Erreur critique: %s", e, exc_info=True)
+        raise HTTPException(500, detail="Échec du traitement")
+
+@router.post("/process-text/batch")
+async def process_text_batch(input: BatchTextInput):
+    """Profils d'une liste de textes, en flux NDJSON : une ligne `event: item`
+    par texte (`index` dans la liste, `result` ou `error`), dans l'ordre de la
+    liste ou des résultats (`order`), puis une ligne `event: batch`. Les
+    appels Cohere restent bornés par le client partagé."""
+    logger.info("Début traitement d'un lot de %s texte(s)", len(input.texts))
+
+    def item(text: str):
+        async def profile() -> Dict[str, Any]:
+            return (await extract_profile(text, input.fields)).dict()
+        return {}, profile
+
+    lines = run_batch(
+        [item(text) for text in input.texts],
+        input.order,
+        concurrency=settings.BATCH_CONCURRENCY,
+        timeout=PROCESS_TIMEOUT
+    )
+    return StreamingResponse(ndjson(lines), media_type="application/x-ndjson")
+
+@router.post("/process-document", response_model=Dict[str, Any], dependencies=[Depends(require_ready)])
+async def process_document(file: UploadFile = File(...), fields: Optional[str] = Form(None)):
+    """Document -> profil en un seul appel (extraction, nettoyage, Cohere,
+    parsing côté serveur). `fields` : champs voulus, séparés par des virgules.
+    Renvoie le profil et les métadonnées d'extraction, sans le texte."""
+    wanted = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+    unknown = [name for name in wanted or [] if name not in PROFILE_FIELDS]
+    if unknown:
+        raise HTTPException(422, detail=f"Champs inconnus : {', '.join(unknown)}")
+
+    logger.info("Début traitement document -> profil: %s", file.filename)
+    start_time = time.time()
+    upload = await validate_file(file)
+    try:
+        result = await asyncio.wait_for(
+            document_profile(upload.path, file.content_type, lane=uuid.uuid4().hex,
+                             digest=upload.digest, fields=wanted),
+            timeout=PROCESS_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        logger.error("Timeout du traitement")
+        raise HTTPException(504, detail="Traitement trop long")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.critical("Erreur critique: %s", e, exc_info=True)
+        raise HTTPException(500, detail="Échec du traitement")
+    finally:
+        remove_upload(upload.path)
+
+    result["processing_time"] = round(time.time() - start_time, 2)
+    logger.info("Traitement réussi en %ss", result['processing_time'])
+    return result
+
+@router.get("/cache/stats", response_model=Dict[str, Any])
+async def get_cache_stats():
+    """Statistiques du cache des profils"""
+    return cache_stats()
\ No newline at end of file
@@ -1,102 +1,68 @@
+import json
 import time
-from fastapi import APIRouter, File, UploadFile, HTTPException
-from io import BytesIO
-from app.services.file_processing import TextExtractor
+import uuid
+import asyncio
+from fastapi import APIRouter, Depends, File, Query, UploadFile, HTTPException
+from fastapi.responses import StreamingResponse
+from app.services.extraction_service import (
+    ALLOWED_TYPES, run_extraction, iter_extraction, cache_stats
+)
+from app.services.batch import BATCH_ORDERS, BatchItem, ndjson, run_batch
+from app.services.jobs import submit_job, job_view, store as job_store
+from app.services.metrics import stage
+from app.services.uploads import StoredUpload, spool_upload, remove_upload, unpack_zip
+from app.services.warmup import require_ready
+from config.settings import settings
 import logging
-from typing import Dict, Any
-import concurrent.futures
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple, Union
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 # Configuration
-ALLOWED_TYPES = {
-    'pdf': 'application/pdf',
-    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-    'jpg': 'image/jpeg',
-    'jpeg': 'image/jpeg',
-    'png': 'image/png'
-}
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_FILE_SIZE = settings.MAX_UPLOAD_SIZE
 PROCESS_TIMEOUT = 120  # 2 minutes
+ZIP_TYPES = {"application/zip", "application/x-zip-compressed"}
 
-async def validate_file(file: UploadFile) -> BytesIO:
-    """Validation du fichier"""
+async def validate_file(file: UploadFile, directory: Optional[str] = None) -> StoredUpload:
+    """Validation du fichier, recopié par blocs sur disque (à supprimer par l'appelant)"""
     if file.content_type not in ALLOWED_TYPES.values():
         raise HTTPException(
             status_code=400,
             detail=f"Type non supporté. Formats: {list(ALLOWED_TYPES.keys())}"
         )
+    with stage("upload"):
+        return await spool_upload(file, MAX_FILE_SIZE, directory or settings.UPLOAD_DIR)
 
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Taille max dépassée ({MAX_FILE_SIZE//(1024*1024)}MB)"
-        )
-    return BytesIO(content)
-
-def process_content(content: bytes, content_type: str) -> Dict[str, Any]:
-    """Traitement synchrone pour le thread pool"""
-    result = {
-        "text": "",
-        "ocr_used": False,
-        "file_type": content_type,
-        "status": "success"
-    }
-    
-    try:
-        file_bytes = BytesIO(content)
-        
-        if content_type == ALLOWED_TYPES['pdf']:
-            result["text"], result["ocr_used"] = TextExtractor.extract_from_pdf(file_bytes)
-        elif content_type in {ALLOWED_TYPES['jpg'], ALLOWED_TYPES['jpeg'], ALLOWED_TYPES['png']}:
-            result["text"] = TextExtractor.extract_from_image(file_bytes)
-            result["ocr_used"] = True
-        else:  # DOCX
-            result["text"], _ = TextExtractor.extract_from_word(file_bytes)
-
-        if not result["text"].strip():
-            raise HTTPException(
-                status_code=422,
-                detail="Aucun texte détecté"
-            )
-            
-        return result
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Erreur traitement: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail="Erreur de traitement"
-        )
-
-@router.post("/extract-text", response_model=Dict[str, Any])
+@router.post("/extract-text", response_model=Dict[str, Any], dependencies=[Depends(require_ready)])
 async def extract_text(file: UploadFile = File(...)):
     """Endpoint principal avec timeout"""
     try:
-        logger.info(f"Début traitement: {file.filename}")
+        logger.info("Début traitement: %s", file.filename)
         start_time = time.time()
         
         # Validation
-        file_bytes = await validate_file(file)
+        upload = await validate_file(file)
         
-        # Traitement avec timeout
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future = executor.submit(
-                process_content,
-                file_bytes.getvalue(),
-                file.content_type
+        # Traitement sur le pool partagé avec timeout, les workers lisent le fichier
+        try:
+            result = await asyncio.wait_for(
+                run_extraction(
+                    upload.path,
+                    file.content_type,
+                    lane=uuid.uuid4().hex,
+                    digest=upload.digest
+                ),
+                timeout=PROCESS_TIMEOUT
             )
-            result = future.result(timeout=PROCESS_TIMEOUT)
+        finally:
+            remove_upload(upload.path)
         
         result["processing_time"] = round(time.time() - start_time, 2)
-        logger.info(f"Traitement réussi en {result['processing_time']}s")
+        logger.info("Traitement réussi en %ss", result['processing_time'])
         return result
 
-    except concurrent.futures.TimeoutError:
+    except asyncio.TimeoutError:
         logger.error("Timeout du traitement")
         raise HTTPException(
             status_code=504,
@@ -105,8 +71,171 @@ async def extract_text(file: UploadFile = File(...)):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Erreur inattendue: {str(e)}", exc_info=True)
+        logger.error("Erreur inattendue: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="Erreur interne"
-        )
\ No newline at end of file
+        )
+
+async def _stream_events(events, start_time: float, upload: StoredUpload, first: Optional[Dict[str, Any]] = None):
+    """Sérialise les événements d'extraction en NDJSON, sous le timeout global.
+    Le fichier reçu est supprimé à la fin du flux."""
+    deadline = start_time + PROCESS_TIMEOUT
+    try:
+        while True:
+            if first is not None:
+                event, first = first, None
+            else:
+                try:
+                    event = await asyncio.wait_for(
+                        events.__anext__(),
+                        timeout=max(deadline - time.time(), 0)
+                    )
+                except StopAsyncIteration:
+                    return
+            if event["event"] == "document":
+                event["processing_time"] = round(time.time() - start_time, 2)
+                logger.info("Traitement réussi en %ss", event['processing_time'])
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+    except asyncio.TimeoutError:
+        logger.error("Timeout du traitement")
+        yield json.dumps({"event": "error", "status_code": 504, "detail": "Traitement trop long"}) + "\n"
+    except HTTPException as e:
+        yield json.dumps({"event": "error", "status_code": e.status_code, "detail": e.detail}, ensure_ascii=False) + "\n"
+    except Exception as e:
+        logger.error("Erreur inattendue: %s", e, exc_info=True)
+        yield json.dumps({"event": "error", "status_code": 500, "detail": "Erreur interne"}) + "\n"
+    finally:
+        await events.aclose()
+        remove_upload(upload.path)
+
+@router.post("/extract-text/stream", dependencies=[Depends(require_ready)])
+async def extract_text_stream(file: UploadFile = File(...)):
+    """Variante en flux NDJSON : une ligne par page dès qu'elle est prête
+    (`event: page`, numéro, OCR, durée), puis le document assemblé dans
+    l'ordre (`event: document`). Une erreur en cours de route est signalée
+    par une ligne `event: error`."""
+    logger.info("Début traitement en flux: %s", file.filename)
+    start_time = time.time()
+
+    upload = await validate_file(file)
+    events = iter_extraction(
+        upload.path,
+        file.content_type,
+        lane=uuid.uuid4().hex,
+        digest=upload.digest
+    )
+    # Premier événement attendu avant de répondre : un refus d'admission
+    # (429/503 avec Retry-After) reste une vraie réponse HTTP, pas une ligne du flux
+    try:
+        first = await asyncio.wait_for(events.__anext__(), timeout=PROCESS_TIMEOUT)
+    except BaseException as e:
+        await events.aclose()
+        remove_upload(upload.path)
+        if isinstance(e, asyncio.TimeoutError):
+            raise HTTPException(status_code=504, detail="Traitement trop long")
+        raise
+    return StreamingResponse(
+        _stream_events(events, start_time, upload, first),
+        media_type="application/x-ndjson"
+    )
+
+async def _receive_batch(files: List[UploadFile]) -> List[Tuple[str, Union[StoredUpload, HTTPException]]]:
+    """Fichiers d'un lot recopiés sur disque, archives zip dépliées ; un
+    fichier refusé garde sa place avec son erreur"""
+    uploads: List[Tuple[str, Union[StoredUpload, HTTPException]]] = []
+    try:
+        for file in files:
+            try:
+                if file.content_type in ZIP_TYPES or (file.filename or "").lower().endswith(".zip"):
+                    with stage("upload"):
+                        archive = await spool_upload(file, settings.BATCH_MAX_UPLOAD_SIZE, settings.UPLOAD_DIR)
+                    try:
+                        uploads.extend(await asyncio.to_thread(
+                            unpack_zip, archive.path, ALLOWED_TYPES, MAX_FILE_SIZE,
+                            settings.BATCH_MAX_ITEMS, settings.BATCH_MAX_UPLOAD_SIZE, settings.UPLOAD_DIR
+                        ))
+                    finally:
+                        remove_upload(archive.path)
+                else:
+                    uploads.append((file.filename, await validate_file(file)))
+            except HTTPException as e:
+                uploads.append((file.filename, e))
+            if len(uploads) > settings.BATCH_MAX_ITEMS:
+                raise HTTPException(status_code=400, detail=f"Trop de fichiers (max {settings.BATCH_MAX_ITEMS})")
+    except BaseException:
+        _remove_uploads(uploads)
+        raise
+    return uploads
+
+def _remove_uploads(uploads: List[Tuple[str, Union[StoredUpload, HTTPException]]]) -> None:
+    for _, upload in uploads:
+        if isinstance(upload, StoredUpload):
+            remove_upload(upload.path)
+
+async def _batch_lines(lines: AsyncIterator[Dict[str, Any]], uploads) -> AsyncIterator[Dict[str, Any]]:
+    """Lignes du lot ; les fichiers encore présents sont supprimés à la fin du flux"""
+    try:
+        async for line in lines:
+            yield line
+    finally:
+        await lines.aclose()
+        _remove_uploads(uploads)
+
+@router.post("/extract-text/batch", dependencies=[Depends(require_ready)])
+async def extract_text_batch(files: List[UploadFile] = File(...), order: str = Query("input")):
+    """Extraction de plusieurs fichiers (ou d'archives zip) en flux NDJSON :
+    une ligne `event: item` par fichier (`index`, `filename`, `result` ou
+    `error`), dans l'ordre d'envoi ou des résultats (`order=completion`),
+    puis une ligne `event: batch`. Le lot partage une seule file du pool
+    OCR : il n'affame pas les requêtes unitaires."""
+    if order not in BATCH_ORDERS:
+        raise HTTPException(status_code=422, detail=f"Ordre inconnu, valeurs possibles : {', '.join(BATCH_ORDERS)}")
+    uploads = await _receive_batch(files)
+    logger.info("Début traitement d'un lot de %s fichier(s)", len(uploads))
+    lane = uuid.uuid4().hex
+
+    def item(filename: str, upload: Union[StoredUpload, HTTPException]) -> BatchItem:
+        async def extract() -> Dict[str, Any]:
+            if isinstance(upload, HTTPException):
+                raise upload
+            try:
+                return await run_extraction(upload.path, upload.content_type, lane=lane, digest=upload.digest)
+            finally:
+                remove_upload(upload.path)
+        return {"filename": filename}, extract
+
+    lines = run_batch(
+        [item(filename, upload) for filename, upload in uploads],
+        order,
+        concurrency=settings.BATCH_CONCURRENCY,
+        timeout=PROCESS_TIMEOUT
+    )
+    return StreamingResponse(ndjson(_batch_lines(lines, uploads)), media_type="application/x-ndjson")
+
+@router.post("/jobs", status_code=202, response_model=Dict[str, Any], dependencies=[Depends(require_ready)])
+async def create_job(file: UploadFile = File(...)):
+    """Extraction asynchrone : retourne immédiatement l'identifiant du job,
+    à suivre avec GET /jobs/{id}. 429 + Retry-After si la file est pleine,
+    503 tant que le service n'est pas prêt (les jobs ne seraient pas traités)."""
+    # Reçu directement dans JOBS_DIR : la mise en file n'est qu'un renommage
+    upload = await validate_file(file, settings.JOBS_DIR)
+    try:
+        job = await submit_job(upload, file.content_type)
+    finally:
+        remove_upload(upload.path)
+    logger.info("Job %s créé pour %s", job['id'], file.filename)
+    return job
+
+@router.get("/jobs/{job_id}", response_model=Dict[str, Any])
+async def get_job(job_id: str):
+    """Statut, progression (pages traitées / total) et résultat d'un job"""
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job inconnu")
+    return job_view(job)
+
+@router.get("/cache/stats", response_model=Dict[str, Any])
+async def get_cache_stats():
+    """Statistiques du cache d'extraction"""
+    return cache_stats()
\ No newline at end of file
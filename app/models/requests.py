@@ -1,4 +1,42 @@
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, validator
+from app.models.schemas import PROFILE_FIELDS
+from app.services.batch import BATCH_ORDERS
+from config.settings import settings
+
+def _check_fields(fields: Optional[List[str]]) -> Optional[List[str]]:
+    unknown = [name for name in fields or [] if name not in PROFILE_FIELDS]
+    if unknown:
+        raise ValueError(f"Champs inconnus : {', '.join(unknown)}")
+    return fields
 
 class TextInput(BaseModel):
-    text: str
\ No newline at end of file
+    text: str
+    # Champs nécessaires à l'appelant (tous par défaut) : Cohere n'est pas
+    # appelé si les règles locales les ont tous trouvés
+    fields: Optional[List[str]] = None
+
+    @validator('fields')
+    def validate_fields(cls, v):
+        return _check_fields(v)
+
+class BatchTextInput(BaseModel):
+    texts: List[str]
+    fields: Optional[List[str]] = None
+    order: str = "input"  # "input" ou "completion"
+
+    @validator('texts')
+    def validate_texts(cls, v):
+        if not v or len(v) > settings.BATCH_MAX_ITEMS:
+            raise ValueError(f"Entre 1 et {settings.BATCH_MAX_ITEMS} textes par lot")
+        return v
+
+    @validator('fields')
+    def validate_fields(cls, v):
+        return _check_fields(v)
+
+    @validator('order')
+    def validate_order(cls, v):
+        if v not in BATCH_ORDERS:
+            raise ValueError(f"Ordre inconnu, valeurs possibles : {', '.join(BATCH_ORDERS)}")
+        return v
@@ -20,6 +20,8 @@ class OrientationProfile(BaseModel):
     skills: Optional[str] = None
     desiredFocus: Optional[str] = None
     previousExperience: Optional[str] = None
+    # Origine de chaque valeur renseignée ("email": "rules", "skills": "llm"...)
+    sources: Dict[str, str] = {}
 
     @validator('telephone')
     def validate_phone(cls, v):
@@ -31,4 +33,7 @@ class OrientationProfile(BaseModel):
     def validate_email(cls, v):
         if v and not re.match(r'[^@]+@[^@]+\.[^@]+', v):
             return None
-        return v
\ No newline at end of file
+        return v
+
+# Champs extraits du texte (hors métadonnées comme `sources`)
+PROFILE_FIELDS = tuple(name for name in OrientationProfile.__fields__ if name != "sources")
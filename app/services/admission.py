@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Deque, Optional, Tuple
+from fastapi import HTTPException
+from app.services.metrics import Counter, Gauge
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Client de la requête en cours (file équitable) et attente maximale
+# acceptée, fixés par le middleware de requête, les lots et les jobs
+client: ContextVar[str] = ContextVar("admission_client", default="-")
+max_wait: ContextVar[Optional[float]] = ContextVar("admission_max_wait", default=None)
+
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Requêtes refusées par le contrôle d'admission, par budget et code HTTP",
+    ["budget", "status"]
+)
+
+class Budget:
+    """Budget de travail admis simultanément, avec file d'attente équitable.
+
+    Une demande de coût `cost` (plafonné à `max_cost`, la capacité par
+    défaut : un gros document ne bloque pas tout le budget pendant son
+    traitement) passe tout de suite si le budget le permet
+    et que personne n'attend ; sinon elle attend son tour dans la file de son
+    client, les clients étant servis à tour de rôle. Au-delà de
+    `client_queue` demandes en attente pour un même client : 429 ; file
+    globale pleine ou attente plus longue que `max_wait` : 503. Les deux
+    réponses portent un Retry-After estimé d'après la durée moyenne
+    d'occupation du budget.
+    """
+
+    def __init__(self, name: str, capacity: int, client_queue: int, max_queue: int, max_cost: int = 0):
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.max_cost = max(1, min(max_cost or self.capacity, self.capacity))
+        self.client_queue = client_queue
+        self.max_queue = max_queue
+        self.in_use = 0
+        self.waiting = 0
+        self._queues: "OrderedDict[str, Deque[Tuple[int, asyncio.Future]]]" = OrderedDict()
+        self._hold_seconds = 1.0  # moyenne glissante d'une occupation (par unité)
+
+        Gauge(f"admission_{name}_in_use", f"Coût admis en cours sur le budget {name}", callback=lambda: self.in_use)
+        Gauge(f"admission_{name}_waiting", f"Demandes en attente sur le budget {name}", callback=lambda: self.waiting)
+
+    def retry_after(self) -> int:
+        """Secondes avant qu'une nouvelle demande ait des chances de passer"""
+        backlog = (self.in_use + sum(cost for queue in self._queues.values() for cost, _ in queue)) / self.capacity
+        return max(1, math.ceil(self._hold_seconds * backlog))
+
+    def _reject(self, status_code: int, detail: str) -> HTTPException:
+        ADMISSION_REJECTED.inc(budget=self.name, status=str(status_code))
+        logger.warning("Admission refusée (%s, %s): %s", self.name, status_code, detail)
+        return HTTPException(status_code, detail=detail, headers={"Retry-After": str(self.retry_after())})
+
+    def _grant(self) -> None:
+        """Attribue le budget libéré aux clients en attente, à tour de rôle"""
+        while self._queues:
+            name, queue = next(iter(self._queues.items()))
+            cost, future = queue[0]
+            if future.done():  # abandonnée (timeout, annulation)
+                queue.popleft()
+            elif self.in_use + cost <= self.capacity:
+                queue.popleft()
+                self.in_use += cost
+                future.set_result(None)
+            else:
+                # Pas de dépassement par des demandes plus petites : pas de famine
+                return
+            self._queues.move_to_end(name)
+            if not queue:
+                del self._queues[name]
+
+    async def acquire(self, cost: int, client_name: str, wait: Optional[float]) -> int:
+        """Réserve `cost` unités (plafonné à `max_cost`) ; renvoie le coût réservé"""
+        cost = min(max(1, cost), self.max_cost)
+        if not self._queues and self.in_use + cost <= self.capacity:
+            self.in_use += cost
+            return cost
+
+        queue = self._queues.get(client_name)
+        if queue is not None and len(queue) >= self.client_queue:
+            raise self._reject(429, "Trop de demandes en attente pour ce client")
+        if self.waiting >= self.max_queue or wait == 0:
+            raise self._reject(503, "Service saturé")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(client_name, deque()).append((cost, future))
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), wait)
+            return cost
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                self.release(cost, 0.0)  # accordé à l'expiration du délai
+            future.cancel()
+            raise self._reject(503, "Service saturé")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(cost, 0.0)  # accordé pendant l'annulation
+            future.cancel()
+            raise
+        finally:
+            self.waiting -= 1
+            self._grant()  # retire les demandes abandonnées en tête de file
+
+    def release(self, cost: int, held: float) -> None:
+        self.in_use -= cost
+        if held > 0:
+            self._hold_seconds = 0.9 * self._hold_seconds + 0.1 * held / cost
+        self._grant()
+
+    @asynccontextmanager
+    async def slot(self, cost: int = 1) -> AsyncIterator[int]:
+        """Occupe `cost` unités pendant le bloc, pour le client du contexte"""
+        wait = max_wait.get()
+        reserved = await self.acquire(cost, client.get(), settings.ADMISSION_MAX_WAIT if wait is None else wait)
+        start = time.monotonic()
+        try:
+            yield reserved
+        finally:
+            self.release(reserved, time.monotonic() - start)
+
+_workers = settings.OCR_WORKERS or os.cpu_count() or 1
+_ocr_capacity = settings.ADMISSION_OCR_BUDGET or 16 * _workers
+
+# Pages OCR (coût estimé par `estimate_cost`) et appels Cohere admis
+ocr = Budget(
+    "ocr",
+    _ocr_capacity,
+    settings.ADMISSION_CLIENT_QUEUE,
+    settings.ADMISSION_MAX_QUEUE,
+    max_cost=settings.ADMISSION_OCR_MAX_COST or _ocr_capacity // 2
+)
+llm = Budget(
+    "llm",
+    settings.ADMISSION_LLM_BUDGET or 2 * settings.COHERE_MAX_CONCURRENCY,
+    settings.ADMISSION_CLIENT_QUEUE,
+    settings.ADMISSION_MAX_QUEUE
+)
+
+def client_key(headers, host: Optional[str]) -> str:
+    """Identité du client pour la file équitable : adresse du pair, ou
+    X-Client-ID si ADMISSION_TRUST_CLIENT_ID l'autorise (sinon un client
+    contournerait ADMISSION_CLIENT_QUEUE en changeant d'en-tête à chaque appel)"""
+    if settings.ADMISSION_TRUST_CLIENT_ID:
+        value = headers.get("x-client-id", "")
+        if value:
+            return value[:64]
+    return host or "-"
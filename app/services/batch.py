@@ -0,0 +1,74 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+from fastapi import HTTPException
+from app.services import admission
+
+logger = logging.getLogger(__name__)
+
+# Ordre des lignes renvoyées : celui des éléments reçus, ou au fil des résultats
+BATCH_ORDERS = ("input", "completion")
+
+# Élément d'un lot : métadonnées recopiées dans sa ligne (nom de fichier...)
+# et fonction produisant son résultat
+BatchItem = Tuple[Dict[str, Any], Callable[[], Awaitable[Dict[str, Any]]]]
+
+def _error(status_code: int, detail: Any) -> Dict[str, Any]:
+    return {"status": "error", "error": {"status_code": status_code, "detail": detail}}
+
+async def run_batch(items: List[BatchItem], order: str, concurrency: int,
+                    timeout: float) -> AsyncIterator[Dict[str, Any]]:
+    """Traite les éléments d'un lot, au plus `concurrency` à la fois.
+
+    Produit une ligne `event: item` par élément (`index` dans le lot, succès
+    avec `result` ou erreur avec `error`) dans l'ordre demandé, puis une
+    ligne `event: batch` récapitulative. L'échec d'un élément (exception,
+    dépassement de `timeout` secondes) n'interrompt pas les autres ; fermer
+    le générateur annule les éléments restants.
+    """
+    start_time = time.perf_counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, meta: Dict[str, Any], fn) -> Dict[str, Any]:
+        line = {"event": "item", "index": index, **meta}
+        # Élément accepté dans le lot : il attend son admission jusqu'à son timeout
+        admission.max_wait.set(timeout)
+        async with semaphore:
+            try:
+                result = await asyncio.wait_for(fn(), timeout=timeout)
+                return {**line, "status": "success", "result": result}
+            except asyncio.TimeoutError:
+                return {**line, **_error(504, "Traitement trop long")}
+            except HTTPException as e:
+                return {**line, **_error(e.status_code, e.detail)}
+            except Exception as e:
+                logger.error("Erreur inattendue sur l'élément %s: %s", index, e, exc_info=True)
+                return {**line, **_error(500, "Erreur interne")}
+
+    tasks = [asyncio.ensure_future(run(index, meta, fn)) for index, (meta, fn) in enumerate(items)]
+    succeeded = 0
+    try:
+        for next_line in (tasks if order == "input" else asyncio.as_completed(tasks)):
+            line = await next_line
+            succeeded += line["status"] == "success"
+            yield line
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    processing_time = round(time.perf_counter() - start_time, 2)
+    logger.info("Lot traité en %ss : %s/%s élément(s) réussi(s)", processing_time, succeeded, len(items))
+    yield {
+        "event": "batch",
+        "items": len(items),
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "processing_time": processing_time
+    }
+
+async def ndjson(lines: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Sérialise les lignes d'un lot en NDJSON"""
+    async for line in lines:
+        yield json.dumps(line, ensure_ascii=False) + "\n"
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+class LRUCache:
+    """Cache mémoire borné, avec expiration optionnelle des entrées"""
+
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        expires = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class SQLiteDatabase:
+    """Fichier SQLite partagé entre processus (WAL), une connexion par thread.
+
+    Le dossier, le fichier et le schéma (SCHEMA, puis `_migrate`) ne sont
+    créés qu'à la première connexion : importer un module qui déclare une
+    base ne touche pas au disque. Appels bloquants : depuis la boucle
+    d'événements, passer par `asyncio.to_thread`.
+    """
+
+    SCHEMA: Sequence[str] = ()
+    TIMEOUT = 5.0  # Secondes d'attente d'un verrou
+    AUTOCOMMIT = False
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._created = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=self.TIMEOUT, isolation_level=None if self.AUTOCOMMIT else ""
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._lock:
+                if not self._created:
+                    for statement in self.SCHEMA:
+                        conn.execute(statement)
+                    self._migrate(conn)
+                    conn.commit()
+                    self._created = True
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Mise à niveau d'une base créée par une version précédente"""
+
+class SQLiteStore(SQLiteDatabase):
+    """Stockage clé/valeur JSON sur disque, partagé entre processus (WAL).
+
+    Borné par `max_entries` et `max_bytes` (taille des valeurs JSON, 0 =
+    illimité) : au-delà, les entrées les plus anciennement écrites sont
+    supprimées. Les entrées expirées et ce dépassement sont purgés par
+    `purge()`, appelé au démarrage et toutes les PURGE_EVERY écritures.
+    """
+
+    PURGE_EVERY = 200
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS entries ("
+        "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS entries_created ON entries (created)",
+    )
+
+    def __init__(self, path: str, ttl: Optional[float] = None, max_entries: int = 0, max_bytes: int = 0):
+        super().__init__(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            row = self._connect().execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Lecture cache disque impossible: %s", e)
+            return None
+        if row is None:
+            return None
+        if self.ttl and row[1] + self.ttl < time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, created) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), time.time())
+                )
+        except sqlite3.Error as e:
+            logger.warning("Écriture cache disque impossible: %s", e)
+            return
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self.purge()
+
+    def purge(self) -> int:
+        """Supprime les entrées expirées puis les plus anciennes au-delà des
+        limites, retourne le nombre d'entrées effacées"""
+        deleted = 0
+        try:
+            with self._connect() as conn:
+                if self.ttl:
+                    deleted += conn.execute(
+                        "DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,)
+                    ).rowcount
+                if self.max_entries:
+                    deleted += conn.execute(
+                        "DELETE FROM entries WHERE key IN ("
+                        "SELECT key FROM entries ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,)
+                    ).rowcount
+                if self.max_bytes:
+                    # Cumul des tailles des plus récentes aux plus anciennes
+                    deleted += conn.execute(
+                        "DELETE FROM entries WHERE key IN (SELECT key FROM ("
+                        "SELECT key, SUM(length(value)) OVER (ORDER BY created DESC, key) AS total "
+                        "FROM entries) WHERE total > ?)",
+                        (self.max_bytes,)
+                    ).rowcount
+        except sqlite3.Error as e:
+            logger.warning("Purge du cache disque impossible: %s", e)
+        return deleted
+
+class TieredCache:
+    """LRU mémoire devant un stockage SQLite optionnel, avec compteurs.
+
+    À utiliser depuis la boucle d'événements : la mémoire répond directement,
+    le disque est interrogé dans un thread (`asyncio.to_thread`).
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        path: str = "",
+        ttl: Optional[float] = None,
+        max_entries: int = 0,
+        max_bytes: int = 0
+    ):
+        self.memory = LRUCache(maxsize, ttl)
+        self.disk = SQLiteStore(path, ttl, max_entries, max_bytes) if path else None
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                self.memory.set(key, value)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value)
+
+    async def purge(self) -> int:
+        return await asyncio.to_thread(self.disk.purge) if self.disk is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "persistent": self.disk is not None
+        }
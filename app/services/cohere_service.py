@@ -1,47 +1,156 @@
-import cohere
+import asyncio
+import hashlib
+import json
 import logging
+import random
+import time
+import httpx
 from config.settings import settings
-from typing import Optional
+from typing import Dict, Optional, Sequence, Tuple
 from fastapi import HTTPException
+from app.services import admission
+from app.services.logging_pipeline import PAYLOAD, preview
+from app.services.metrics import COHERE_ATTEMPTS, Gauge, stage
 
 logger = logging.getLogger(__name__)
 
-try:
-    co = cohere.Client(settings.COHERE_API_KEY)
-except Exception as e:
-    logger.critical(f"Échec de l'initialisation du client Cohere: {str(e)}")
-    raise HTTPException(
-        status_code=500,
-        detail="Service d'analyse de texte indisponible"
-    )
+# Codes HTTP pour lesquels une nouvelle tentative a du sens
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
 
-def get_orientation_data(text: str) -> str:
-    if not text or len(text.strip()) < 10:
-        logger.warning(f"Texte d'entrée trop court: {len(text)} caractères")
-        raise ValueError("Le texte d'entrée doit contenir au moins 10 caractères")
+class AsyncCohereClient:
+    """Client asynchrone pour l'endpoint `/v1/generate` de Cohere.
+
+    - connexions HTTP réutilisées (keep-alive) via un `httpx.AsyncClient` partagé
+    - nombre d'appels simultanés borné par un sémaphore
+    - requêtes identiques en cours fusionnées (single-flight)
+    - nouvelles tentatives avec backoff aléatoire dans un budget de temps global
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.cohere.com",
+        max_concurrency: int = 8,
+        timeout: float = 30.0,
+        deadline: float = 60.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 8.0
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                    "Accept": "application/json"
+                },
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def generate(self, prompt: str, max_tokens: int = 600, temperature: float = 0.2) -> str:
+        """Génère un texte ; les appels identiques simultanés partagent une seule requête"""
+        payload = {"prompt": prompt, "max_tokens": max_tokens, "temperature": temperature}
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
 
-    prompt = f"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._generate(payload))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.debug("Requête Cohere identique déjà en cours, résultat partagé")
+        # shield : l'annulation d'un appelant n'annule pas les autres
+        return await asyncio.shield(task)
+
+    async def _generate(self, payload: dict) -> str:
+        deadline = time.monotonic() + self.deadline
+        response, error = None, None
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            try:
+                async with self._semaphore:
+                    response = await self.http.post(
+                        "/v1/generate",
+                        json=payload,
+                        timeout=min(self.timeout, max(remaining, 0.1))
+                    )
+                error = None
+            except httpx.TransportError as e:
+                response, error = None, e
+            COHERE_ATTEMPTS.inc(outcome=str(response.status_code) if response is not None else type(error).__name__)
+            if response is not None and response.status_code not in RETRYABLE_STATUS:
+                break
+
+            # Backoff exponentiel "full jitter", sans dépasser le budget de temps
+            delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+            if attempt == self.max_retries or time.monotonic() + delay >= deadline:
+                break
+            reason = f"HTTP {response.status_code}" if response is not None else type(error).__name__
+            logger.warning("Erreur Cohere (%s), nouvelle tentative dans %.2fs", reason, delay)
+            await asyncio.sleep(delay)
+
+        if response is None:
+            logger.error("Cohere injoignable: %s: %s", type(error).__name__, error)
+            raise HTTPException(
+                status_code=504 if isinstance(error, httpx.TimeoutException) else 502,
+                detail="Service d'analyse de texte indisponible"
+            )
+        if response.status_code != 200:
+            try:
+                message = response.json().get("message", response.text)
+            except ValueError:
+                message = response.text
+            logger.error("Erreur Cohere: %s - Code: %s", message, response.status_code)
+            raise HTTPException(
+                status_code=response.status_code if response.status_code < 500 else 502,
+                detail=f"Erreur du service d'analyse: {message}"
+            )
+        return response.json()["generations"][0]["text"]
+
+client = AsyncCohereClient(
+    settings.COHERE_API_KEY,
+    base_url=settings.COHERE_BASE_URL,
+    max_concurrency=settings.COHERE_MAX_CONCURRENCY,
+    timeout=settings.COHERE_TIMEOUT,
+    deadline=settings.COHERE_DEADLINE,
+    max_retries=settings.COHERE_MAX_RETRIES
+)
+
+Gauge("cohere_requests_in_flight", "Requêtes Cohere distinctes en cours", callback=lambda: len(client._inflight))
+
+# Toute modification de ce gabarit ou des schémas de champs change
+# PROMPT_VERSION et invalide les profils mémorisés (voir orientation_service)
+PROMPT_TEMPLATE = """
     Analyse ce texte et extrais TOUTES les informations pertinentes avec précision.
     Réponds UNIQUEMENT avec un JSON valide en suivant STRICTEMENT sans rajouter un seul champ qui n'est pas mentionne a ce schéma :
 
     {{
-        "firstName": "prénom ou null",
-        "lastName": "nom ou null",
-        "telephone": "numéro international ou null",
-        "email": "email valide ou null",
-        "preferredSubjects": "matières séparées par des virgules ou null",
-        "fee": {{
-            "formation": {{"min": "nombre (sans €) ou null", "max": "nombre ou null"}},
-            "logement": {{"min": "nombre ou null", "max": "nombre ou null"}}
-        }},
-        "address": {{
-            "city": "ville ou null",
-            "region": "région/pays ou null", 
-            "country": "pays ou null"
-        }},
-        "skills": "compétences séparées par des virgules ou null",
-        "desiredFocus": "domaine spécifique ou null",
-        "previousExperience": "expériences ou null"
+{schema}
     }}
 
     Règles CRITIQUES :
@@ -52,25 +161,70 @@ def get_orientation_data(text: str) -> str:
 
     Texte à analyser : {text}
     """
+
+# Schéma demandé et tokens de réponse prévus, par champ du profil
+FIELD_SCHEMAS = {
+    "firstName": ('"firstName": "prénom ou null"', 20),
+    "lastName": ('"lastName": "nom ou null"', 20),
+    "telephone": ('"telephone": "numéro international ou null"', 25),
+    "email": ('"email": "email valide ou null"', 30),
+    "preferredSubjects": ('"preferredSubjects": "matières séparées par des virgules ou null"', 60),
+    "fee": ("""\
+"fee": {
+            "formation": {"min": "nombre (sans €) ou null", "max": "nombre ou null"},
+            "logement": {"min": "nombre ou null", "max": "nombre ou null"}
+        }""", 90),
+    "address": ("""\
+"address": {
+            "city": "ville ou null",
+            "region": "région/pays ou null",
+            "country": "pays ou null"
+        }""", 50),
+    "skills": ('"skills": "compétences séparées par des virgules ou null"', 100),
+    "desiredFocus": ('"desiredFocus": "domaine spécifique ou null"', 40),
+    "previousExperience": ('"previousExperience": "expériences ou null"', 150),
+}
+# Accolades et séparateurs de la réponse
+PROMPT_BASE_TOKENS = 15
+
+PROMPT_VERSION = hashlib.sha256(
+    (PROMPT_TEMPLATE + json.dumps(FIELD_SCHEMAS, sort_keys=True)).encode()
+).hexdigest()[:12]
+
+def build_prompt(text: str, fields: Optional[Sequence[str]] = None) -> Tuple[str, int]:
+    """Prompt limité aux champs demandés (tous par défaut) et `max_tokens` associé"""
+    names = [name for name in FIELD_SCHEMAS if fields is None or name in fields]
+    schema = ",\n".join(f"        {FIELD_SCHEMAS[name][0]}" for name in names)
+    max_tokens = PROMPT_BASE_TOKENS + sum(FIELD_SCHEMAS[name][1] for name in names)
+    return PROMPT_TEMPLATE.format(schema=schema, text=text), max_tokens
+
+async def get_orientation_data(text: str, fields: Optional[Sequence[str]] = None) -> str:
+    if not text or len(text.strip()) < 10:
+        logger.warning("Texte d'entrée trop court: %s caractères", len(text))
+        raise ValueError("Le texte d'entrée doit contenir au moins 10 caractères")
+
+    prompt, max_tokens = build_prompt(text, fields)
     try:
-        logger.info(f"Envoi d'une requête à Cohere - Taille du texte: {len(text)} caractères")
-        response = co.generate(
-            prompt=prompt,
-            max_tokens=600,
-            temperature=0.2
-        )
-        logger.debug(f"Réponse reçue - Premiers 200 caractères: {response.generations[0].text[:200]}...")
-        return response.generations[0].text.strip()
-    
-    except cohere.CohereError as e:
-        logger.error(f"Erreur Cohere: {str(e)} - Code: {e.http_status}")
-        raise HTTPException(
-            status_code=e.http_status or 502,
-            detail=f"Erreur du service d'analyse: {e.message}"
+        logger.info(
+            "Envoi d'une requête à Cohere - Taille du texte: %s caractères, %s champ(s)",
+            len(text), len(fields) if fields is not None else len(FIELD_SCHEMAS)
         )
+        # Admission sur le budget LLM : file équitable par client, 429/503 sinon
+        async with admission.llm.slot():
+            with stage("cohere"):
+                generated = await client.generate(
+                    prompt=prompt,
+                    max_tokens=max_tokens,
+                    temperature=0.2
+                )
+        logger.debug("Réponse reçue - Premiers 200 caractères: %s...", preview(generated, 200), extra=PAYLOAD)
+        return generated.strip()
+
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.critical(f"Erreur inattendue: {str(e)}", exc_info=True)
+        logger.critical("Erreur inattendue: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="Erreur interne du serveur"
-        )
\ No newline at end of file
+        )
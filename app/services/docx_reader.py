@@ -0,0 +1,152 @@
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Any, BinaryIO, Dict, Iterator, List, Tuple, Union
+
+# Incrémenté quand le texte produit change (entre dans les clés de cache)
+DOCX_READER_VERSION = 1
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+P, T, TAB, BR, CR = _W + "p", _W + "t", _W + "tab", _W + "br", _W + "cr"
+TBL, TR, TC = _W + "tbl", _W + "tr", _W + "tc"
+TXBX, BODY = _W + "txbxContent", _W + "body"
+
+CELL_SEPARATOR = " | "
+
+_PART_NUMBER = re.compile(r"(\d+)")
+
+def _part_names(archive: zipfile.ZipFile, kind: str) -> List[str]:
+    """Parties `word/header*.xml` ou `word/footer*.xml`, dans l'ordre numérique"""
+    names = [
+        name for name in archive.namelist()
+        if name.startswith(f"word/{kind}") and name.endswith(".xml")
+    ]
+    return sorted(names, key=lambda name: [
+        int(part) if part.isdigit() else part for part in _PART_NUMBER.split(name)
+    ])
+
+class _PartReader:
+    """Parcours incrémental d'une partie WordprocessingML.
+
+    Les paragraphes sont émis dans l'ordre du document ; une ligne de tableau
+    devient une ligne de texte (cellules séparées par CELL_SEPARATOR) et le
+    contenu d'une zone de texte suit le paragraphe qui l'ancre. Les éléments
+    déjà traités sont retirés de l'arbre : la mémoire reste bornée par le plus
+    grand paragraphe ou tableau, pas par la taille du document.
+    """
+
+    def __init__(self, stats: Dict[str, int]):
+        self.stats = stats
+
+    def lines(self, stream: BinaryIO) -> Iterator[str]:
+        # Pile de conteneurs : None = flux principal, sinon liste de lignes
+        # (cellule, ligne de tableau, zone de texte) assemblée à la fermeture
+        containers: List[Any] = [None]
+        paragraphs: List[List[str]] = []
+        boxes: List[List[str]] = []  # Zones de texte de chaque paragraphe ouvert
+        elements: List[ET.Element] = []
+        fallback = 0  # Profondeur dans mc:Fallback (doublon VML des zones de texte)
+        output: List[str] = []
+
+        def emit(line: str) -> None:
+            target = containers[-1]
+            if target is None:
+                output.append(line)
+            else:
+                target.append(line)
+
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                elements.append(elem)
+                if tag == _MC_FALLBACK:
+                    fallback += 1
+                elif fallback:
+                    continue
+                elif tag == P:
+                    paragraphs.append([])
+                    boxes.append([])
+                elif tag in (TC, TR, TXBX):
+                    containers.append([])
+                continue
+
+            elements.pop()
+            if tag == _MC_FALLBACK:
+                fallback -= 1
+            elif fallback:
+                continue
+            elif tag == T and paragraphs:
+                paragraphs[-1].append(elem.text or "")
+            elif tag == TAB and paragraphs:
+                paragraphs[-1].append("\t")
+            elif tag in (BR, CR) and paragraphs:
+                paragraphs[-1].append("\n")
+            elif tag == P:
+                text = "".join(paragraphs.pop()).strip()
+                if text:
+                    self.stats["paragraphs"] += 1
+                    emit(text)
+                for line in boxes.pop():
+                    emit(line)
+            elif tag == TC:
+                cell = " ".join(containers.pop())
+                self.stats["table_cells"] += 1
+                containers[-1].append(cell)
+            elif tag == TR:
+                cells = containers.pop()
+                if any(cells):
+                    emit(CELL_SEPARATOR.join(cells))
+            elif tag == TBL:
+                self.stats["tables"] += 1
+            elif tag == TXBX:
+                lines = containers.pop()
+                self.stats["text_boxes"] += 1
+                (boxes[-1] if boxes else output).extend(lines)
+
+            # Libère les blocs de premier niveau une fois traités
+            if elements and elements[-1].tag == BODY:
+                elements[-1].remove(elem)
+            if output:
+                yield from output
+                output.clear()
+
+def read_docx(source: Union[str, BinaryIO]) -> Tuple[str, Dict[str, Any]]:
+    """Texte d'un DOCX (en-têtes, corps, tableaux, zones de texte, pieds de page)
+    et métadonnées de structure, sans construire le modèle objet du document.
+
+    Les parties XML sont lues en flux depuis l'archive ; les lignes d'en-tête
+    ou de pied de page répétées d'une section à l'autre n'apparaissent qu'une
+    fois.
+    """
+    stats = {"paragraphs": 0, "tables": 0, "table_cells": 0, "text_boxes": 0}
+    reader = _PartReader(stats)
+    with zipfile.ZipFile(source) as archive:
+        headers = _part_names(archive, "header")
+        footers = _part_names(archive, "footer")
+
+        def read_parts(names: List[str]) -> List[str]:
+            lines, seen = [], set()
+            for name in names:
+                with archive.open(name) as stream:
+                    for line in reader.lines(stream):
+                        if line not in seen:
+                            seen.add(line)
+                            lines.append(line)
+            return lines
+
+        header_lines = read_parts(headers)
+        with archive.open("word/document.xml") as stream:
+            body_lines = list(reader.lines(stream))
+        footer_lines = read_parts(footers)
+
+    text = "\n".join(header_lines + body_lines + footer_lines)
+    metadata = {
+        **stats,
+        "headers": len(headers),
+        "footers": len(footers),
+        "header_lines": len(header_lines),
+        "footer_lines": len(footer_lines)
+    }
+    return text, metadata
@@ -0,0 +1,368 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Dict, Any, Hashable, List, Optional
+from fastapi import HTTPException
+from app.services import admission
+from app.services.cache import TieredCache
+from app.services.metrics import PAGES
+from app.services.uploads import file_digest
+from app.services.worker_pool import pool
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_TYPES = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'tif': 'image/tiff',
+    'tiff': 'image/tiff'
+}
+IMAGE_TYPES = {ALLOWED_TYPES['jpg'], ALLOWED_TYPES['png'], ALLOWED_TYPES['tiff']}
+
+# Cache par contenu : documents complets et pages PDF individuelles
+# (même fichier SQLite : les limites sur disque portent sur l'ensemble)
+extraction_cache = TieredCache(
+    settings.EXTRACTION_CACHE_SIZE,
+    settings.EXTRACTION_CACHE_PATH,
+    max_entries=settings.EXTRACTION_CACHE_MAX_ENTRIES,
+    max_bytes=settings.EXTRACTION_CACHE_MAX_BYTES
+)
+page_cache = TieredCache(
+    settings.EXTRACTION_CACHE_SIZE * 8,
+    settings.EXTRACTION_CACHE_PATH,
+    max_entries=settings.EXTRACTION_CACHE_MAX_ENTRIES,
+    max_bytes=settings.EXTRACTION_CACHE_MAX_BYTES
+)
+_ocr_seconds_saved = 0.0
+
+def _extractor():
+    """`TextExtractor`, importé à la première utilisation : cv2, fitz, numpy,
+    PIL et pytesseract ne ralentissent pas le démarrage de l'API"""
+    from app.services.file_processing import TextExtractor
+    return TextExtractor
+
+def start_workers() -> None:
+    """Applique les réglages OCR de Settings et démarre le pool partagé"""
+    TextExtractor = _extractor()
+    options = {
+        "OCR_ADAPTIVE": settings.OCR_ADAPTIVE,
+        "OCR_MIN_CONFIDENCE": settings.OCR_MIN_CONFIDENCE,
+        "TEXT_REGIONS": settings.OCR_TEXT_REGIONS,
+        "NORMALIZE": settings.TEXT_NORMALIZE,
+        "OCR_LANGUAGES": settings.OCR_LANGUAGES,
+        "DETECT_LANGUAGE": settings.OCR_DETECT_LANGUAGE,
+        "DETECT_ORIENTATION": settings.OCR_DETECT_ORIENTATION,
+        "DETECT_MIN_PAGES": settings.OCR_DETECT_MIN_PAGES
+    }
+    # Le processus principal calcule les clés de cache : il doit voir les mêmes réglages
+    TextExtractor.configure(options)
+    pool.start(settings.OCR_WORKERS, initializer=TextExtractor.configure, initargs=(options,))
+
+def process_content(path: str, content_type: str) -> Dict[str, Any]:
+    """Traitement synchrone d'un document complet (job worker), lu depuis le disque"""
+    TextExtractor = _extractor()
+    result = {
+        "text": "",
+        "ocr_used": False,
+        "file_type": content_type,
+        "status": "success"
+    }
+
+    try:
+        if content_type == ALLOWED_TYPES['pdf']:
+            result["text"], result["ocr_used"] = TextExtractor.extract_from_pdf(path)
+        elif content_type in IMAGE_TYPES:
+            result["text"] = TextExtractor.extract_from_image(path)
+            result["ocr_used"] = True
+        else:  # DOCX
+            result["text"], result["structure"] = TextExtractor.extract_docx(path)
+
+        if not result["text"].strip():
+            raise HTTPException(
+                status_code=422,
+                detail="Aucun texte détecté"
+            )
+
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Erreur traitement: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail="Erreur de traitement"
+        )
+
+def _document_key(digest: str) -> str:
+    return f"doc:{digest}:{_extractor().settings_fingerprint()}"
+
+def _page_key(fingerprint: str) -> str:
+    return f"page:{fingerprint}:{_extractor().settings_fingerprint()}"
+
+def cache_stats() -> Dict[str, Any]:
+    """Statistiques du cache d'extraction (documents et pages)"""
+    return {
+        "documents": extraction_cache.stats(),
+        "pages": page_cache.stats(),
+        "ocr_seconds_saved": round(_ocr_seconds_saved, 2)
+    }
+
+def _record_saved(seconds: float) -> None:
+    global _ocr_seconds_saved
+    _ocr_seconds_saved += seconds
+
+def _count_page(page: Dict[str, Any]) -> None:
+    if page["cached"]:
+        method = "cached"
+    elif page["failed"]:
+        method = "failed"
+    else:
+        method = "ocr" if page["ocr_used"] else "text"
+    PAGES.inc(method=method)
+
+async def _extract_page(path: str, num: int, fingerprint: str, lane: Hashable,
+                        hints: Dict[str, Any]) -> Dict[str, Any]:
+    """Une page sur le pool, avec au plus PAGE_MAX_ATTEMPTS essais (attente
+    doublée entre deux essais) ; une page réussie est aussitôt mise en cache :
+    un nouvel essai du document ne refait que les pages manquantes"""
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            page = await pool.submit(lane, _extractor().extract_pdf_page, path, num, hints)
+        except Exception as e:
+            # Worker en erreur ou perdu : même traitement qu'une page en échec
+            page = {"text": "", "ocr_used": False, "failed": True, "error": str(e), "page": num, "time": 0.0}
+        if not page["failed"] or attempts >= settings.PAGE_MAX_ATTEMPTS:
+            break
+        logger.warning("Page %s en échec (essai %s/%s): %s", num, attempts, settings.PAGE_MAX_ATTEMPTS, page.get("error"))
+        await asyncio.sleep(settings.PAGE_RETRY_BACKOFF * 2 ** (attempts - 1))
+
+    page = {**page, "attempts": attempts}
+    if not page["failed"]:
+        await page_cache.set(_page_key(fingerprint), page)
+    return {**page, "cached": False}
+
+async def iter_pdf_pages(path: str, lane: Hashable) -> AsyncIterator[Dict[str, Any]]:
+    """Pages d'un PDF dans l'ordre où elles sont prêtes (cache d'abord, puis
+    OCR), précédées d'un événement `start` donnant le nombre de pages et
+    celui des pages déjà en cache.
+
+    Seules les pages absentes du cache (empreinte de contenu et réglages OCR)
+    sont traitées, avec la langue et la rotation détectées une fois pour le
+    document (`detect_pdf`) ; une page en échec est réessayée (voir
+    `_extract_page`). Une requête relancée après un timeout ou des pages en
+    échec, ou un job repris, ne traite donc que les pages manquantes (après
+    un redémarrage, avec le cache disque). Fermer le générateur annule les
+    pages encore en file.
+    """
+    TextExtractor = _extractor()
+    fingerprints = await pool.submit(lane, TextExtractor.pdf_page_fingerprints, path)
+    cached = await asyncio.gather(*(page_cache.get(_page_key(fingerprint)) for fingerprint in fingerprints))
+    missing = [num for num, page in enumerate(cached) if page is None]
+    yield {"event": "start", "pages_total": len(fingerprints), "pages_resumed": len(fingerprints) - len(missing)}
+    for page in cached:
+        if page is not None:
+            _record_saved(page["time"])
+            page = {**page, "cached": True}
+            _count_page(page)
+            yield page
+
+    hints = await pool.submit(lane, TextExtractor.detect_pdf, path) if missing else None
+    tasks = [
+        asyncio.ensure_future(_extract_page(path, num, fingerprints[num], lane, hints))
+        for num in missing
+    ]
+    try:
+        for next_page in asyncio.as_completed(tasks):
+            page = await next_page
+            _count_page(page)
+            yield page
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def extract_image(path: str, lane: Hashable) -> Dict[str, Any]:
+    """OCR d'une image sur le pool partagé.
+
+    La langue et la rotation sont détectées une fois (`detect_image`), puis
+    chaque frame (TIFF multipage) est préparée dans un worker (redressement,
+    normalisation, blocs de texte, bandes) ; toutes les bandes de toutes les
+    frames sont reconnues en parallèle et réassemblées dans l'ordre de lecture.
+    """
+    TextExtractor = _extractor()
+    frame_count, hints = await asyncio.gather(
+        pool.submit(lane, TextExtractor.image_frame_count, path),
+        pool.submit(lane, TextExtractor.detect_image, path)
+    )
+    frames = await asyncio.gather(*(
+        pool.submit(lane, TextExtractor.image_units, path, frame, hints["rotate"])
+        for frame in range(frame_count)
+    ))
+    tiles = [tile for units in frames for tiles in units for tile in tiles]
+    results = iter(await asyncio.gather(*(
+        pool.submit(lane, TextExtractor.ocr_region, tile, hints["lang"]) for tile in tiles
+    )))
+
+    merged_frames = [
+        TextExtractor.merge_units([[next(results) for _ in tiles] for tiles in units])
+        for units in frames
+    ]
+    merged = TextExtractor.merge_region_results(merged_frames)
+    texts = (TextExtractor.normalize(frame["text"]) for frame in merged_frames)
+    merged["text"] = "\n\n".join(text for text in texts if text)
+    merged["regions"] = sum(frame["regions"] for frame in merged_frames)
+    merged["tiles"] = sum(frame["tiles"] for frame in merged_frames)
+    merged["frames"] = frame_count
+    merged["lang"], merged["rotate"] = hints["lang"], hints["rotate"]
+    return {**merged, "page": 0, "ocr_used": True, "failed": False, "cached": False}
+
+async def estimate_cost(path: str, content_type: str) -> int:
+    """Coût d'admission d'un document sur le budget OCR (voir `admission`)"""
+    TextExtractor = _extractor()
+    try:
+        if content_type == ALLOWED_TYPES['pdf']:
+            return await asyncio.to_thread(TextExtractor.pdf_cost, path, settings.ADMISSION_OCR_PAGE_COST)
+        if content_type in IMAGE_TYPES:
+            frames = await asyncio.to_thread(TextExtractor.image_frame_count, path)
+            return frames * settings.ADMISSION_OCR_PAGE_COST
+    except Exception as e:
+        # Fichier illisible : l'extraction renverra l'erreur détaillée
+        logger.debug("Estimation du coût impossible: %s", e)
+    return 1
+
+def strip_margins(texts: List[str]) -> List[str]:
+    """Textes de pages consécutives sans les en-têtes et pieds de page répétés"""
+    return _extractor().strip_margins(texts)
+
+def _assemble(pages: List[Dict[str, Any]]) -> str:
+    """Texte du document dans l'ordre des pages, sans les en-têtes et pieds
+    de page répétés"""
+    texts = [page["text"] for page in sorted(pages, key=lambda page: page["page"]) if page["text"]]
+    return "\n".join(strip_margins(texts))
+
+async def iter_extraction(path: str, content_type: str, lane: Hashable,
+                          digest: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Extraction d'un document sur le pool de workers, avec cache par contenu.
+
+    Produit un événement `start` (nombre de pages, sauf document déjà en
+    cache), un événement `page` par page dès qu'elle est prête (ordre de
+    complétion, champ `page` pour le numéro), puis un événement `document`
+    avec le texte assemblé dans l'ordre du document. Les PDF sont découpés
+    en jobs par page ; abandonner l'itération (timeout, client parti) retire
+    de la file les pages qui n'ont pas encore démarré.
+
+    Le document est lu par les workers depuis `path` (jamais chargé en
+    mémoire ici) ; `digest` est l'empreinte SHA-256 calculée à la réception,
+    recalculée depuis le fichier si absente.
+    """
+    start_time = time.perf_counter()
+    if digest is None:
+        digest = await file_digest(path)
+    cached = await extraction_cache.get(_document_key(digest))
+    if cached is not None:
+        _record_saved(cached["ocr_seconds"])
+        result = {key: value for key, value in cached.items() if key != "ocr_seconds"}
+        yield {"event": "document", **result, "cache": {"hit": True}}
+        return
+
+    # Admission sur le budget OCR, tenu jusqu'à la fin (ou l'abandon) de l'itération
+    async with admission.ocr.slot(await estimate_cost(path, content_type)):
+        events = _extract_uncached(path, content_type, lane, digest, start_time)
+        try:
+            async for event in events:
+                yield event
+        finally:
+            await events.aclose()
+
+async def _extract_uncached(path: str, content_type: str, lane: Hashable, digest: str,
+                            start_time: float) -> AsyncIterator[Dict[str, Any]]:
+    complete = True
+    if content_type != ALLOWED_TYPES['pdf']:
+        yield {"event": "start", "pages_total": 1}
+    if content_type in IMAGE_TYPES:
+        page = await extract_image(path, lane)
+        PAGES.inc(page["frames"], method="ocr")
+        page["time"] = round(time.perf_counter() - start_time, 3)
+        yield {"event": "page", **page}
+        if not page["text"].strip():
+            raise HTTPException(
+                status_code=422,
+                detail="Aucun texte détecté"
+            )
+        result = {
+            "text": page["text"],
+            "ocr_used": True,
+            "file_type": content_type,
+            "status": "success",
+            "cache": {"hit": False},
+            "pages": [{key: value for key, value in page.items() if key != "text"}]
+        }
+    elif content_type != ALLOWED_TYPES['pdf']:
+        result = await pool.submit(lane, process_content, path, content_type)
+        PAGES.inc(method="docx")
+        yield {
+            "event": "page",
+            "page": 0,
+            "text": result["text"],
+            "ocr_used": result["ocr_used"],
+            "failed": False,
+            "cached": False,
+            "time": round(time.perf_counter() - start_time, 3)
+        }
+        result["cache"] = {"hit": False}
+    else:
+        pages = []
+        async for event in iter_pdf_pages(path, lane):
+            if event.get("event") == "start":
+                yield event
+                continue
+            pages.append(event)
+            yield {"event": "page", **event}
+
+        text = _assemble(pages)
+        failed = [
+            {"page": page["page"], "attempts": page.get("attempts", 1), "error": page.get("error")}
+            for page in sorted(pages, key=lambda page: page["page"]) if page["failed"]
+        ]
+        if not text.strip():
+            raise HTTPException(
+                status_code=422,
+                detail=f"Échec de l'extraction de {len(failed)} page(s)" if failed else "Aucun texte détecté"
+            )
+        # Document incomplet : seules les pages réussies restent en cache,
+        # un nouvel essai ne traitera que les pages en échec
+        complete = not failed
+        result = {
+            "text": text,
+            "ocr_used": any(page["ocr_used"] for page in pages),
+            "file_type": content_type,
+            "status": "success" if complete else "partial",
+            "failed_pages": failed,
+            "cache": {
+                "hit": False,
+                "pages_cached": sum(page["cached"] for page in pages)
+            },
+            "pages": [
+                {key: value for key, value in page.items() if key != "text"}
+                for page in sorted(pages, key=lambda page: page["page"])
+            ]
+        }
+
+    if complete:
+        entry = {key: value for key, value in result.items() if key != "cache"}
+        entry["ocr_seconds"] = round(time.perf_counter() - start_time, 3)
+        await extraction_cache.set(_document_key(digest), entry)
+    yield {"event": "document", **result}
+
+async def run_extraction(path: str, content_type: str, lane: Hashable,
+                         digest: Optional[str] = None) -> Dict[str, Any]:
+    """Extraction complète d'un document (voir `iter_extraction`)"""
+    async for event in iter_extraction(path, content_type, lane, digest):
+        if event["event"] == "document":
+            return {key: value for key, value in event.items() if key != "event"}
@@ -1,15 +1,21 @@
+import hashlib
 import logging
-from io import BytesIO
-from typing import Tuple, List, Optional
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple, List, Optional, Dict, Any, Callable, NamedTuple, Union, BinaryIO
 from fastapi import HTTPException
 from PIL import Image
 import pytesseract
 import fitz  # PyMuPDF
-from docx import Document
 import numpy as np
 import cv2
-import concurrent.futures
-from functools import partial
+from app.services.docx_reader import DOCX_READER_VERSION, read_docx
+from app.services.language import SCRIPT_LANGUAGES, guess_language
+from app.services.normalize import NORMALIZE_VERSION, normalize_text, strip_repeated_lines
+from app.services.metrics import stage
 
 # Vérifie que Tesseract est accessible
 # try:
@@ -20,136 +26,813 @@ from functools import partial
 
 logger = logging.getLogger(__name__)
 
+# Documents ouverts par ce processus worker, réutilisés d'une page à l'autre
+_OPEN_DOCUMENTS: "OrderedDict[tuple, fitz.Document]" = OrderedDict()
+_MAX_OPEN_DOCUMENTS = 4
+
+def _open_pdf(path: str) -> "fitz.Document":
+    """Ouvre un PDF depuis son chemin en gardant les derniers documents en cache"""
+    stat = os.stat(path)
+    key = (path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    doc = _OPEN_DOCUMENTS.get(key)
+    if doc is None:
+        doc = fitz.open(path, filetype="pdf")
+        _OPEN_DOCUMENTS[key] = doc
+        while len(_OPEN_DOCUMENTS) > _MAX_OPEN_DOCUMENTS:
+            _, old = _OPEN_DOCUMENTS.popitem(last=False)
+            old.close()
+    else:
+        _OPEN_DOCUMENTS.move_to_end(key)
+    return doc
+
+# Modèles de langue Tesseract installés (lus une fois par processus)
+_LANGUAGES: Optional[set] = None
+
+def _installed_languages() -> set:
+    global _LANGUAGES
+    if _LANGUAGES is None:
+        try:
+            _LANGUAGES = set(pytesseract.get_languages(config=""))
+        except Exception as e:
+            logger.warning("Langues Tesseract inconnues: %s", e)
+            _LANGUAGES = set()
+    return _LANGUAGES
+
+# Objets CLAHE réutilisés d'une page à l'autre (un par thread)
+_CLAHE = threading.local()
+
+def _get_clahe() -> "cv2.CLAHE":
+    clahe = getattr(_CLAHE, "instance", None)
+    if clahe is None:
+        clahe = _CLAHE.instance = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    return clahe
+
+# Document source : chemin sur disque (ouvert sans copie en mémoire) ou fichier ouvert
+Source = Union[str, BinaryIO]
+
+def _open_image(source: Source) -> Image.Image:
+    if not isinstance(source, str):
+        source.seek(0)
+    return Image.open(source)
+
+class OCRTier(NamedTuple):
+    """Un échelon de l'OCR adaptatif"""
+    name: str
+    dpi: int
+    max_size: int  # Taille max en pixels à ce DPI
+    psm: Optional[int]  # None = celui de OCR_CONFIG
+    binarize: bool
+
 class TextExtractor:
     # Configuration optimisée
-    OCR_CONFIG = r'--oem 1 --psm 6 -l fra+eng'  # OCR rapide
+    OCR_CONFIG = r'--oem 1 --psm 6'  # OCR rapide
+    OCR_LANGUAGES = "fra+eng"  # Modèles utilisés quand la langue n'est pas identifiée
+    NORMALIZE = True  # Mots coupés recollés, lignes parasites et en-têtes répétés retirés
     PDF_DPI = 200  # Résolution réduite
     MAX_PAGE_SIZE = 1600  # Taille max en pixels
     PAGE_TIMEOUT = 20  # Secondes par page
-    MAX_WORKERS = 4  # Threads parallèles
+
+    # OCR adaptatif : passe rapide, puis échelons plus coûteux tant que la
+    # confiance moyenne des mots reste sous OCR_MIN_CONFIDENCE
+    OCR_ADAPTIVE = True
+    OCR_MIN_CONFIDENCE = 75.0
+    OCR_LADDER = (
+        OCRTier("rapide", 150, 1200, 6, True),
+        OCRTier("haute-resolution", 300, 2400, 6, True),
+        OCRTier("sans-binarisation", 300, 2400, 6, False),
+        OCRTier("texte-epars", 300, 2400, 11, False),
+    )
+
+    # Découpage en blocs de texte avant l'OCR (pages éparses, photos de formulaires)
+    TEXT_REGIONS = True
+    REGION_DETECTION_SIZE = 1000  # Taille max de l'image utilisée pour la détection
+    REGION_MAX_COVERAGE = 0.8  # Au-delà, la page entière est traitée d'un bloc
+
+    # Détection par document (une fois, avant les pages) : rotation et
+    # script par l'OSD de Tesseract, langue d'après la couche texte ou un
+    # échantillon OCR basse résolution de la première page scannée
+    DETECT_LANGUAGE = True
+    DETECT_ORIENTATION = True
+    DETECT_MIN_PAGES = 3  # Pages à OCRiser à partir desquelles l'échantillon OCR est rentable
+    DETECT_DPI = 150
+    DETECT_MAX_SIZE = 1200
+    OSD_MIN_CONFIDENCE = 2.0  # Confiance OSD minimale pour tourner la page ou retenir le script
+
+    # Photos : normalisation de la taille du texte et découpage des grandes images
+    TEXT_HEIGHT_TARGET = 30  # Hauteur de caractère visée, en pixels
+    MAX_IMAGE_SIZE = 4000  # Plus grand côté après normalisation
+    TILE_SIZE = 1600  # Hauteur nominale des bandes OCR
+    TILE_OVERLAP = 80  # Chevauchement entre bandes, en pixels
+
+    @classmethod
+    def configure(cls, options: Dict[str, Any]) -> None:
+        """Applique des réglages (ex. issus de Settings) ; utilisé aussi comme initializer des workers"""
+        for name, value in options.items():
+            if not hasattr(cls, name):
+                raise AttributeError(f"Réglage OCR inconnu: {name}")
+            setattr(cls, name, value)
+
+    @staticmethod
+    def warm_up() -> Dict[str, Any]:
+        """Préchauffe un worker : binaire et données de langue Tesseract, OpenCV, CLAHE (job worker)"""
+        start = time.perf_counter()
+        version = str(pytesseract.get_tesseract_version())
+        sample = np.full((48, 160), 255, dtype=np.uint8)
+        cv2.putText(sample, "ok", (10, 36), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+        TextExtractor.ocr_data(TextExtractor.enhance_array(sample), 7)
+        return {"pid": os.getpid(), "tesseract": version, "seconds": round(time.perf_counter() - start, 3)}
+
+    @staticmethod
+    @stage("enhance")
+    def enhance_array(gray: np.ndarray) -> np.ndarray:
+        """CLAHE + seuillage adaptatif sur une image en niveaux de gris.
+
+        `gray` peut être une vue en lecture seule (pixmap) : il n'est jamais modifié.
+        """
+        # CLAHE - Amélioration de contraste
+        img_array = _get_clahe().apply(gray)
+
+        # Seuillage adaptatif, en place sur le tableau produit par CLAHE
+        return cv2.adaptiveThreshold(
+            img_array, 255,
+            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+            cv2.THRESH_BINARY, 11, 2,
+            dst=img_array
+        )
 
     @staticmethod
     def enhance_image(image: Image) -> Image:
         """Amélioration d'image optimisée pour l'OCR"""
         try:
             # Conversion en niveaux de gris
-            img_array = np.array(image.convert('L'))
-            
-            # CLAHE - Amélioration de contraste
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-            img_array = clahe.apply(img_array)
-            
-            # Seuillage adaptatif
-            img_array = cv2.adaptiveThreshold(
-                img_array, 255,
-                cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                cv2.THRESH_BINARY, 11, 2
-            )
-            
-            return Image.fromarray(img_array)
+            img_array = np.asarray(image.convert('L'))
+            return Image.fromarray(TextExtractor.enhance_array(img_array))
         except Exception as e:
-            logger.warning(f"Échec prétraitement: {str(e)}")
+            logger.warning("Échec prétraitement: %s", e)
             return image
 
     @staticmethod
-    def process_page(page, page_num: int) -> Optional[str]:
-        """Traite une page avec timeout"""
+    @stage("render")
+    def render_page(page, dpi: Optional[int] = None, max_size: Optional[int] = None) -> "fitz.Pixmap":
+        """Rendu unique de la page en niveaux de gris.
+
+        L'échelle finale (DPI plafonné par MAX_PAGE_SIZE) est calculée à partir
+        des dimensions de la page avant la rastérisation.
+        """
+        zoom = (dpi or TextExtractor.PDF_DPI) / 72
+        max_size = max_size or TextExtractor.MAX_PAGE_SIZE
+        longest = max(page.rect.width, page.rect.height) * zoom
+        if longest > max_size:
+            zoom *= max_size / longest
+        return page.get_pixmap(
+            matrix=fitz.Matrix(zoom, zoom),
+            colorspace=fitz.csGRAY,
+            alpha=False
+        )
+
+    @staticmethod
+    def pixmap_array(pix: "fitz.Pixmap") -> np.ndarray:
+        """Vue NumPy (sans copie) sur les échantillons d'un pixmap en niveaux de gris.
+
+        La vue n'est valide que tant que `pix` est vivant.
+        """
+        samples = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+        return samples.reshape(pix.height, pix.stride)[:, :pix.width]
+
+    @staticmethod
+    @stage("regions")
+    def detect_text_regions(gray: np.ndarray) -> List[Tuple[float, float, float, float]]:
+        """Blocs de texte d'une image en niveaux de gris, dans l'ordre de lecture.
+
+        Gradient morphologique + Otsu pour trouver les traits, fermeture
+        horizontale pour fondre les caractères en lignes puis dilatation
+        verticale pour fondre les lignes en blocs. Les boîtes sont retournées
+        en fractions (x0, y0, x1, y1) de la taille de l'image, pour pouvoir
+        être appliquées à un rendu d'une autre résolution. Liste vide si les
+        blocs couvrent presque toute l'image (rien à gagner à découper).
+        """
+        height, width = gray.shape[:2]
+        scale = min(1.0, TextExtractor.REGION_DETECTION_SIZE / max(height, width))
+        small = gray
+        if scale < 1.0:
+            small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        h, w = small.shape[:2]
+
+        ellipse = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+        gradient = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, ellipse)
+        _, strokes = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        lines = cv2.morphologyEx(
+            strokes, cv2.MORPH_CLOSE,
+            cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, w // 60), 1))
+        )
+        blocks = cv2.dilate(
+            lines, cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, w // 100), max(3, h // 80)))
+        )
+        contours, _ = cv2.findContours(blocks, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        margin = max(2, w // 200)
+        boxes = []
+        for contour in contours:
+            x, y, bw, bh = cv2.boundingRect(contour)
+            if bh < 6 or bw < 6 or bw * bh < 0.0005 * w * h:
+                continue
+            # Photos et aplats : trop peu (ou trop) de traits pour être du texte
+            density = cv2.countNonZero(strokes[y:y + bh, x:x + bw]) / float(bw * bh)
+            if not 0.03 <= density <= 0.45:
+                continue
+            boxes.append((
+                max(0, x - margin), max(0, y - margin),
+                min(w, x + bw + margin), min(h, y + bh + margin)
+            ))
+
+        covered = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in boxes)
+        if not boxes or covered > TextExtractor.REGION_MAX_COVERAGE * w * h:
+            return []
+
+        # Ordre de lecture : bandes horizontales de haut en bas, puis gauche à droite
+        boxes.sort(key=lambda box: box[1])
+        ordered, band, band_bottom = [], [], None
+        for box in boxes:
+            if band and box[1] >= band_bottom:
+                ordered.extend(sorted(band, key=lambda b: b[0]))
+                band = []
+            band_bottom = box[3] if not band else max(band_bottom, box[3])
+            band.append(box)
+        ordered.extend(sorted(band, key=lambda b: b[0]))
+
+        return [(x0 / w, y0 / h, x1 / w, y1 / h) for x0, y0, x1, y1 in ordered]
+
+    @staticmethod
+    def crop_region(image: np.ndarray, box: Tuple[float, float, float, float]) -> np.ndarray:
+        """Vue sur une région (fractions x0, y0, x1, y1) d'une image"""
+        height, width = image.shape[:2]
+        x0, y0, x1, y1 = box
+        return image[int(y0 * height):int(np.ceil(y1 * height)), int(x0 * width):int(np.ceil(x1 * width))]
+
+    @staticmethod
+    def merge_region_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Assemble les résultats OCR de plusieurs régions (déjà dans l'ordre de lecture)"""
+        texts = [result["text"] for result in results if result["text"]]
+        weight = sum(len(result["text"]) for result in results)
+        tiers = [tier.name for tier in TextExtractor.OCR_LADDER]
+        return {
+            "text": "\n\n".join(texts),
+            "confidence": round(
+                sum(result["confidence"] * len(result["text"]) for result in results) / weight, 1
+            ) if weight else 0.0,
+            # Échelon le plus coûteux atteint par une région
+            "tier": max(
+                (result["tier"] for result in results),
+                key=lambda name: tiers.index(name) if name in tiers else -1
+            ),
+            "tiers_tried": max(result["tiers_tried"] for result in results),
+            "regions": len(results)
+        }
+
+    @staticmethod
+    def ocr_regions(render: Callable[[OCRTier], np.ndarray], scalable: bool = True,
+                    lang: Optional[str] = None) -> Dict[str, Any]:
+        """OCR limité aux blocs de texte détectés, chacun avec sa propre échelle de qualité.
+
+        Les régions sont détectées sur le rendu du premier échelon puis
+        appliquées (en coordonnées relatives) aux rendus plus fins. Sans bloc
+        détecté, ou si le découpage est désactivé, la page entière est traitée.
+        """
+        first = TextExtractor.OCR_LADDER[0] if TextExtractor.OCR_ADAPTIVE else None
+        boxes = []
+        if TextExtractor.TEXT_REGIONS:
+            base = render(first) if first else render(
+                OCRTier("fixe", TextExtractor.PDF_DPI, TextExtractor.MAX_PAGE_SIZE, None, True)
+            )
+            boxes = TextExtractor.detect_text_regions(base)
+        if not boxes:
+            return {**TextExtractor.ocr_ladder(render, scalable, lang), "regions": 1}
+
+        return TextExtractor.merge_region_results([
+            TextExtractor.ocr_ladder(
+                lambda tier, box=box: TextExtractor.crop_region(render(tier), box),
+                scalable,
+                lang
+            )
+            for box in boxes
+        ])
+
+    @staticmethod
+    def image_frame_count(source: Source) -> int:
+        """Nombre d'images (frames) d'un fichier, > 1 pour les TIFF multipages (job worker)"""
+        try:
+            with _open_image(source) as image:
+                return getattr(image, "n_frames", 1)
+        except Exception as e:
+            logger.error("Erreur image: %s", e)
+            raise HTTPException(
+                status_code=422,
+                detail="Échec reconnaissance texte"
+            )
+
+    @staticmethod
+    @stage("decode")
+    def load_image_frame(source: Source, frame: int = 0) -> Tuple[np.ndarray, Optional[float]]:
+        """Décode une frame en niveaux de gris, avec sa résolution déclarée (DPI) si connue"""
+        with _open_image(source) as image:
+            if frame:
+                image.seek(frame)
+            dpi = image.info.get("dpi")
+            return np.asarray(image.convert('L')), (float(dpi[0]) if dpi and dpi[0] else None)
+
+    @staticmethod
+    def estimate_text_height(gray: np.ndarray) -> Optional[float]:
+        """Hauteur médiane des caractères, en pixels, d'après les composantes connexes"""
+        height, width = gray.shape[:2]
+        scale = min(1.0, TextExtractor.REGION_DETECTION_SIZE * 2 / max(height, width))
+        small = gray
+        if scale < 1.0:
+            small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        _, ink = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+
+        limit = small.shape[0] / 10
+        heights = [
+            stats[i, cv2.CC_STAT_HEIGHT] for i in range(1, count)
+            if 4 <= stats[i, cv2.CC_STAT_HEIGHT] <= limit
+            and stats[i, cv2.CC_STAT_WIDTH] <= 3 * stats[i, cv2.CC_STAT_HEIGHT]
+        ]
+        if len(heights) < 20:
+            return None
+        return float(np.median(heights)) / scale
+
+    @staticmethod
+    @stage("normalize")
+    def normalize_image(gray: np.ndarray, dpi: Optional[float] = None) -> np.ndarray:
+        """Ramène une photo à une taille de texte adaptée à Tesseract.
+
+        Priorité à la hauteur de caractère mesurée (TEXT_HEIGHT_TARGET), sinon
+        à la résolution déclarée (PDF_DPI visé) ; dans tous les cas le plus
+        grand côté reste sous MAX_IMAGE_SIZE.
+        """
+        height, width = gray.shape[:2]
+        text_height = TextExtractor.estimate_text_height(gray)
+        if text_height:
+            scale = TextExtractor.TEXT_HEIGHT_TARGET / text_height
+        elif dpi:
+            scale = TextExtractor.PDF_DPI / dpi
+        else:
+            scale = 1.0
+        scale = min(max(scale, 0.25), 2.0, TextExtractor.MAX_IMAGE_SIZE / max(height, width))
+        if 0.9 <= scale <= 1.1:
+            return gray
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+        return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation)
+
+    @staticmethod
+    def split_tiles(gray: np.ndarray) -> List[np.ndarray]:
+        """Découpe une image haute en bandes horizontales qui se chevauchent.
+
+        Chaque coupe est placée sur la ligne de pixels la moins encrée autour
+        de la position nominale, pour éviter de trancher une ligne de texte ;
+        le chevauchement (TILE_OVERLAP) couvre les cas où ce n'est pas possible.
+        """
+        height = gray.shape[0]
+        if height <= TextExtractor.TILE_SIZE * 1.5:
+            return [gray]
+
+        ink = (gray < 128).sum(axis=1)
+        window = TextExtractor.TILE_OVERLAP
+        tiles, top = [], 0
+        while top < height:
+            nominal = top + TextExtractor.TILE_SIZE
+            if nominal + TextExtractor.TILE_SIZE // 2 >= height:
+                tiles.append(gray[max(0, top - window):])
+                break
+            low, high = nominal - window, nominal + window
+            cut = low + int(np.argmin(ink[low:high]))
+            tiles.append(gray[max(0, top - window):cut + window])
+            top = cut
+        return tiles
+
+    @staticmethod
+    def stitch_tiles(texts: List[str]) -> str:
+        """Recolle le texte de bandes successives en supprimant les lignes
+        répétées dans les zones de chevauchement"""
+        def key(line: str) -> str:
+            return re.sub(r'\W+', '', line).lower()
+
+        lines: List[str] = []
+        for text in texts:
+            tile_lines = text.splitlines()
+            # Plus long suffixe déjà émis identique au début de la bande
+            overlap = 0
+            for n in range(min(len(lines), len(tile_lines), 8), 0, -1):
+                tail = [key(line) for line in lines[-n:]]
+                head = [key(line) for line in tile_lines[:n]]
+                if tail == head and any(tail):
+                    overlap = n
+                    break
+            lines.extend(tile_lines[overlap:])
+        return "\n".join(lines).strip()
+
+    @staticmethod
+    def image_units(source: Source, frame: int = 0, rotate: int = 0) -> List[List[np.ndarray]]:
+        """Prépare une frame pour l'OCR (job worker) : redressement (`rotate`
+        degrés, voir `detect_image`), normalisation de taille, découpage en
+        blocs de texte puis en bandes pour les blocs trop hauts.
+
+        Retourne, dans l'ordre de lecture, la liste des bandes de chaque bloc.
+        """
+        try:
+            gray, dpi = TextExtractor.load_image_frame(source, frame)
+        except Exception as e:
+            logger.error("Erreur image: %s", e)
+            raise HTTPException(
+                status_code=422,
+                detail="Échec reconnaissance texte"
+            )
+        gray = TextExtractor.normalize_image(TextExtractor.rotate_array(gray, rotate), dpi)
+        boxes = TextExtractor.detect_text_regions(gray) if TextExtractor.TEXT_REGIONS else []
+        regions = [TextExtractor.crop_region(gray, box) for box in boxes] or [gray]
+        return [
+            [np.ascontiguousarray(tile) for tile in TextExtractor.split_tiles(region)]
+            for region in regions
+        ]
+
+    @staticmethod
+    def merge_units(units: List[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Assemble les résultats OCR d'une frame : bandes recollées par bloc, puis blocs"""
+        regions = []
+        for tiles in units:
+            merged = TextExtractor.merge_region_results(tiles)
+            if len(tiles) > 1:
+                merged["text"] = TextExtractor.stitch_tiles([tile["text"] for tile in tiles])
+            regions.append(merged)
+        result = TextExtractor.merge_region_results(regions)
+        result["regions"] = len(units)
+        result["tiles"] = sum(len(tiles) for tiles in units)
+        return result
+
+    @staticmethod
+    def ocr_region(gray: np.ndarray, lang: Optional[str] = None) -> Dict[str, Any]:
+        """OCR adaptatif d'une région déjà découpée (job worker)"""
+        try:
+            return TextExtractor.ocr_ladder(lambda tier: gray, scalable=False, lang=lang)
+        except Exception as e:
+            logger.error("Erreur image: %s", e)
+            raise HTTPException(
+                status_code=422,
+                detail="Échec reconnaissance texte"
+            )
+
+    @staticmethod
+    @stage("ocr")
+    def ocr_data(image, psm: Optional[int] = None, lang: Optional[str] = None) -> Tuple[str, float]:
+        """OCR via `image_to_data` : texte reconstruit ligne par ligne et confiance
+        moyenne des mots (pondérée par leur longueur, 0 à 100). `lang` : modèles
+        Tesseract ("fra", "eng+deu"...), OCR_LANGUAGES par défaut"""
+        config = TextExtractor.OCR_CONFIG
+        if psm is not None:
+            config = re.sub(r'--psm \d+', f'--psm {psm}', config)
+        data = pytesseract.image_to_data(
+            image, lang=lang or TextExtractor.OCR_LANGUAGES, config=config, output_type=pytesseract.Output.DICT
+        )
+
+        lines: "OrderedDict[tuple, List[str]]" = OrderedDict()
+        total = weight = 0.0
+        for i, word in enumerate(data["text"]):
+            word = word.strip()
+            confidence = float(data["conf"][i])
+            if not word or confidence < 0:
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            lines.setdefault(key, []).append(word)
+            total += confidence * len(word)
+            weight += len(word)
+
+        text_lines = []
+        previous = None
+        for key, words in lines.items():
+            if previous is not None and key[:2] != previous[:2]:
+                text_lines.append("")  # Nouveau paragraphe
+            text_lines.append(" ".join(words))
+            previous = key
+        return "\n".join(text_lines), (total / weight if weight else 0.0)
+
+    @staticmethod
+    def ocr_ladder(render: Callable[[OCRTier], np.ndarray], scalable: bool = True,
+                   lang: Optional[str] = None) -> Dict[str, Any]:
+        """Échelle de qualité OCR pilotée par la confiance de Tesseract.
+
+        `render(tier)` fournit l'image en niveaux de gris pour un échelon. Si
+        l'image ne dépend pas du DPI (`scalable=False`, photos), les échelons
+        qui ne diffèrent que par la résolution ne sont pas rejoués. Le meilleur
+        résultat est retenu si aucun échelon n'atteint le seuil.
+        """
+        if TextExtractor.OCR_ADAPTIVE:
+            tiers = TextExtractor.OCR_LADDER
+        else:
+            tiers = (OCRTier("fixe", TextExtractor.PDF_DPI, TextExtractor.MAX_PAGE_SIZE, None, True),)
+
+        best = None
+        tried = set()
+        for tier in tiers:
+            variant = tier if scalable else (tier.psm, tier.binarize)
+            if variant in tried:
+                continue
+            tried.add(variant)
+
+            gray = render(tier)
+            image = gray
+            if tier.binarize:
+                try:
+                    image = TextExtractor.enhance_array(gray)
+                except Exception as e:
+                    logger.warning("Échec prétraitement: %s", e)
+            text, confidence = TextExtractor.ocr_data(image, tier.psm, lang)
+
+            if best is None or confidence > best["confidence"]:
+                best = {"text": text.strip(), "tier": tier.name, "confidence": round(confidence, 1)}
+            if confidence >= TextExtractor.OCR_MIN_CONFIDENCE:
+                break
+        best["tiers_tried"] = len(tried)
+        return best
+
+    @staticmethod
+    @stage("normalize_text")
+    def normalize(text: str, ocr: bool = True) -> str:
+        """Texte extrait normalisé (voir `normalize_text`) si NORMALIZE est actif ;
+        lignes parasites et mots coupés par l'OCR ne sont traités que dans un
+        texte issu de l'OCR (une couche texte garde ses traits d'union)"""
+        return normalize_text(text, drop_junk=ocr, join_hyphens=ocr) if TextExtractor.NORMALIZE else text
+
+    @staticmethod
+    def strip_margins(pages: List[str]) -> List[str]:
+        """En-têtes et pieds de page répétés retirés des pages d'un document"""
+        return strip_repeated_lines(pages) if TextExtractor.NORMALIZE else pages
+
+    @staticmethod
+    def rotate_array(gray: np.ndarray, degrees: int) -> np.ndarray:
+        """Tourne une image de `degrees` (multiple de 90) dans le sens horaire"""
+        if not degrees % 360:
+            return gray
+        return np.ascontiguousarray(np.rot90(gray, -(degrees // 90)))
+
+    @staticmethod
+    def default_hints() -> Dict[str, Any]:
+        return {"lang": TextExtractor.OCR_LANGUAGES, "rotate": 0, "script": None, "source": "default"}
+
+    @staticmethod
+    @stage("detect")
+    def detect_hints(sample: Optional[np.ndarray], text: str, ocr_pages: int) -> Dict[str, Any]:
+        """Langue et rotation d'un document, choisies une fois pour toutes ses pages.
+
+        `sample` : rendu basse résolution de la première page à OCRiser (None
+        si aucune), `text` : couche texte disponible, `ocr_pages` : nombre de
+        pages à OCRiser. L'OSD donne la rotation et le script ; un script non
+        latin désigne directement son modèle. Sinon la langue est devinée sur
+        la couche texte, ou sur un OCR rapide de l'échantillon si le document
+        a au moins DETECT_MIN_PAGES pages à OCRiser. En cas de doute, les
+        modèles par défaut (OCR_LANGUAGES) sont gardés.
+        """
+        hints = TextExtractor.default_hints()
+        installed = _installed_languages()
+        if sample is not None and TextExtractor.DETECT_ORIENTATION and "osd" in installed:
+            try:
+                osd = pytesseract.image_to_osd(sample, output_type=pytesseract.Output.DICT)
+                if float(osd["orientation_conf"]) >= TextExtractor.OSD_MIN_CONFIDENCE:
+                    hints["rotate"] = int(osd["rotate"]) % 360
+                if float(osd["script_conf"]) >= TextExtractor.OSD_MIN_CONFIDENCE:
+                    hints["script"] = osd["script"]
+            except Exception as e:
+                # Trop peu de caractères pour l'OSD : page gardée telle quelle
+                logger.debug("OSD impossible: %s", e)
+
+        if not TextExtractor.DETECT_LANGUAGE:
+            return hints
+        script_lang = SCRIPT_LANGUAGES.get(hints["script"])
+        if script_lang in installed:
+            hints.update(lang=script_lang, source="script")
+            return hints
+        source = "text"
+        if not text.strip() and sample is not None and ocr_pages >= TextExtractor.DETECT_MIN_PAGES:
+            text, _ = TextExtractor.ocr_data(TextExtractor.rotate_array(sample, hints["rotate"]), 6)
+            source = "ocr"
+        lang = guess_language(text, installed)
+        if lang is not None:
+            hints.update(lang=lang, source=source)
+        return hints
+
+    @staticmethod
+    def detect_pdf(source: Union[str, "fitz.Document"]) -> Dict[str, Any]:
+        """Langue et rotation d'un PDF (job worker, voir `detect_hints`).
+        Sans page scannée (toutes ont une police), rien à détecter."""
+        try:
+            doc = _open_pdf(source) if isinstance(source, str) else source
+            scanned = [page.number for page in doc if not page.get_fonts()]
+            if not scanned:
+                return TextExtractor.default_hints()
+            # Quelques pages de couche texte suffisent à reconnaître la langue
+            text = "\n".join(
+                page.get_text("text") for page in doc if page.number < 5 and page.number not in scanned
+            )
+            pix = TextExtractor.render_page(doc[scanned[0]], TextExtractor.DETECT_DPI, TextExtractor.DETECT_MAX_SIZE)
+            sample = TextExtractor.pixmap_array(pix)
+            return TextExtractor.detect_hints(sample, text, len(scanned))
+        except Exception as e:
+            logger.warning("Détection de langue impossible: %s", e)
+            return TextExtractor.default_hints()
+
+    @staticmethod
+    def detect_image(source: Source) -> Dict[str, Any]:
+        """Langue et rotation d'une image (job worker), d'après sa première frame"""
+        try:
+            gray, _ = TextExtractor.load_image_frame(source, 0)
+            scale = TextExtractor.DETECT_MAX_SIZE / max(gray.shape)
+            if scale < 1:
+                gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            return TextExtractor.detect_hints(gray, "", TextExtractor.image_frame_count(source))
+        except Exception as e:
+            logger.warning("Détection de langue impossible: %s", e)
+            return TextExtractor.default_hints()
+
+    @staticmethod
+    def analyze_page(page, page_num: int, hints: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Traite une page : couche texte si présente, sinon OCR adaptatif avec
+        la langue et la rotation du document (`hints`, voir `detect_pdf`)"""
         try:
             # Essai extraction texte standard
-            text = page.get_text("text").strip()
+            with stage("text_layer"):
+                text = page.get_text("text").strip()
             if text:
-                return text
+                return {"text": TextExtractor.normalize(text, ocr=False), "ocr_used": False, "failed": False}
+
+            # Fallback OCR pour page scannée : un rendu par échelon, en niveaux de gris
+            hints = hints or TextExtractor.default_hints()
+            pixmaps = {}
+
+            def render(tier: OCRTier) -> np.ndarray:
+                key = (tier.dpi, tier.max_size)
+                if key not in pixmaps:
+                    # Le pixmap reste référencé tant que sa vue NumPy est utilisée
+                    pixmaps[key] = TextExtractor.render_page(page, tier.dpi, tier.max_size)
+                return TextExtractor.rotate_array(TextExtractor.pixmap_array(pixmaps[key]), hints["rotate"])
+
+            result = TextExtractor.ocr_regions(render, lang=hints["lang"])
+            result["text"] = TextExtractor.normalize(result["text"])
+            return {**result, "ocr_used": True, "failed": False, "lang": hints["lang"], "rotate": hints["rotate"]}
 
-            # Fallback OCR pour page scannée
-            pix = page.get_pixmap(dpi=TextExtractor.PDF_DPI)
-            
-            # Réduction de taille si nécessaire
-            if max(pix.width, pix.height) > TextExtractor.MAX_PAGE_SIZE:
-                scale = TextExtractor.MAX_PAGE_SIZE / max(pix.width, pix.height)
-                pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
-            
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            processed_img = TextExtractor.enhance_image(img)
-            
-            return pytesseract.image_to_string(
-                processed_img,
-                config=TextExtractor.OCR_CONFIG
-            ).strip()
-            
         except Exception as e:
-            logger.warning(f"Erreur page {page_num}: {str(e)}")
-            return None
+            logger.warning("Erreur page %s: %s", page_num, e)
+            return {"text": None, "ocr_used": False, "failed": True, "error": str(e)}
+
+    @staticmethod
+    def process_page(page, page_num: int, hints: Optional[Dict[str, Any]] = None) -> Tuple[Optional[str], bool]:
+        """Traite une page, retourne le texte et si l'OCR a été utilisé"""
+        result = TextExtractor.analyze_page(page, page_num, hints)
+        return result["text"], result["ocr_used"]
+
+    @staticmethod
+    def settings_fingerprint() -> str:
+        """Empreinte des réglages qui influencent le texte extrait"""
+        signature = repr((
+            TextExtractor.OCR_CONFIG,
+            TextExtractor.PDF_DPI,
+            TextExtractor.MAX_PAGE_SIZE,
+            TextExtractor.OCR_ADAPTIVE,
+            TextExtractor.OCR_MIN_CONFIDENCE,
+            TextExtractor.OCR_LADDER,
+            TextExtractor.TEXT_REGIONS,
+            TextExtractor.TEXT_HEIGHT_TARGET,
+            TextExtractor.MAX_IMAGE_SIZE,
+            TextExtractor.TILE_SIZE,
+            TextExtractor.TILE_OVERLAP,
+            TextExtractor.OCR_LANGUAGES,
+            TextExtractor.DETECT_LANGUAGE,
+            TextExtractor.DETECT_ORIENTATION,
+            TextExtractor.DETECT_MIN_PAGES,
+            TextExtractor.DETECT_DPI,
+            TextExtractor.DETECT_MAX_SIZE,
+            TextExtractor.OSD_MIN_CONFIDENCE,
+            TextExtractor.NORMALIZE,
+            NORMALIZE_VERSION,
+            DOCX_READER_VERSION
+        ))
+        return hashlib.sha256(signature.encode()).hexdigest()[:16]
+
+    @staticmethod
+    def page_fingerprint(doc, page) -> str:
+        """Empreinte du contenu d'une page : flux de contenu, images, polices et formulaires"""
+        digest = hashlib.sha256(repr((tuple(page.rect), page.rotation)).encode())
+        for xref in page.get_contents():
+            digest.update(doc.xref_stream_raw(xref) or b"")
+        xrefs = {item[0] for item in page.get_images(full=True)}
+        xrefs.update(item[0] for item in page.get_fonts(full=True))
+        xrefs.update(item[0] for item in page.get_xobjects())
+        for xref in sorted(xrefs):
+            if xref > 0:
+                digest.update(doc.xref_object(xref, compressed=True).encode())
+                digest.update(doc.xref_stream_raw(xref) or b"")
+        return digest.hexdigest()
+
+    @staticmethod
+    def pdf_page_fingerprints(path: str) -> List[str]:
+        """Empreinte de chaque page d'un PDF (job worker)"""
+        try:
+            doc = _open_pdf(path)
+            return [TextExtractor.page_fingerprint(doc, page) for page in doc]
+        except Exception as e:
+            logger.error("Erreur PDF: %s", e)
+            raise HTTPException(
+                status_code=422,
+                detail="Erreur d'extraction PDF"
+            )
+
+    @staticmethod
+    def pdf_cost(path: str, ocr_page_cost: int) -> int:
+        """Coût d'admission d'un PDF : `ocr_page_cost` par page sans police
+        (scannée, donc OCR), 1 par page avec couche texte. Sans rendu ni
+        extraction : seules les ressources des pages sont lues."""
+        with fitz.open(path, filetype="pdf") as doc:
+            return sum(1 if page.get_fonts() else ocr_page_cost for page in doc)
+
+    @staticmethod
+    def extract_pdf_page(path: str, page_num: int, hints: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Traite une seule page d'un PDF sur disque (job worker)"""
+        start_time = time.perf_counter()
+        result = TextExtractor.analyze_page(_open_pdf(path)[page_num], page_num, hints)
+        return {
+            **result,
+            "page": page_num,
+            "text": result["text"] or "",
+            "time": round(time.perf_counter() - start_time, 3)
+        }
 
     @staticmethod
-    def extract_from_pdf(file: BytesIO) -> Tuple[str, bool]:
-        """Extraction PDF parallélisée"""
+    def extract_from_pdf(file: Source) -> Tuple[str, bool]:
+        """Extraction PDF séquentielle, pages dans l'ordre du document.
+
+        Le parallélisme entre pages est assuré par le pool de workers partagé
+        (voir `extraction_service`), pas par un pool par document.
+        """
         try:
-            file.seek(0)
-            doc = fitz.open(stream=file.read(), filetype="pdf")
+            if isinstance(file, str):
+                source = {"filename": file}
+            else:
+                file.seek(0)
+                source = {"stream": file.read()}
             text_parts = []
             ocr_used = False
-            
-            with concurrent.futures.ThreadPoolExecutor(
-                max_workers=TextExtractor.MAX_WORKERS
-            ) as executor:
-                futures = {
-                    executor.submit(
-                        TextExtractor.process_page,
-                        page,
-                        num
-                    ): num for num, page in enumerate(doc)
-                }
-                
-                for future in concurrent.futures.as_completed(futures):
-                    result = future.result()
-                    if result:
-                        text_parts.append(result)
-                        if futures[future] > 0:  # Vérifie si OCR utilisé
-                            ocr_used = True
-
-            return "\n".join(text_parts), ocr_used
+            with fitz.open(**source, filetype="pdf") as doc:
+                hints = TextExtractor.detect_pdf(doc)
+                for num, page in enumerate(doc):
+                    text, page_ocr = TextExtractor.process_page(page, num, hints)
+                    if text:
+                        text_parts.append(text)
+                        ocr_used = ocr_used or page_ocr
+
+            return "\n".join(TextExtractor.strip_margins(text_parts)), ocr_used
             
         except Exception as e:
-            logger.error(f"Erreur PDF: {str(e)}", exc_info=True)
+            logger.error("Erreur PDF: %s", e, exc_info=True)
             raise HTTPException(
                 status_code=422,
                 detail="Erreur d'extraction PDF"
             )
 
     @staticmethod
-    def extract_from_image(file: BytesIO) -> str:
+    def extract_from_image(file: Source) -> str:
         """Extraction depuis image avec gestion d'erreur"""
         try:
-            file.seek(0)
-            image = Image.open(file)
-            
-            if image.mode not in ('L', 'RGB'):
-                image = image.convert('RGB')
-            
-            processed_img = TextExtractor.enhance_image(image)
-            text = pytesseract.image_to_string(
-                processed_img,
-                config=TextExtractor.OCR_CONFIG
-            )
-            return text.strip()
+            texts = []
+            hints = TextExtractor.detect_image(file)
+            for frame in range(TextExtractor.image_frame_count(file)):
+                units = TextExtractor.image_units(file, frame, hints["rotate"])
+                result = TextExtractor.merge_units([
+                    [TextExtractor.ocr_region(tile, hints["lang"]) for tile in tiles] for tiles in units
+                ])
+                texts.append(TextExtractor.normalize(result["text"]))
+            return "\n\n".join(text for text in texts if text).strip()
         except Exception as e:
-            logger.error(f"Erreur image: {str(e)}")
+            logger.error("Erreur image: %s", e)
             raise HTTPException(
                 status_code=422,
                 detail="Échec reconnaissance texte"
             )
 
     @staticmethod
-    def extract_from_word(file: BytesIO) -> Tuple[str, bool]:
+    def extract_from_word(file: Source) -> Tuple[str, bool]:
         """Extraction depuis Word"""
+        text, _ = TextExtractor.extract_docx(file)
+        return text, False
+
+    @staticmethod
+    @stage("docx")
+    def extract_docx(file: Source) -> Tuple[str, Dict[str, Any]]:
+        """Extraction Word en flux (voir `read_docx`) : texte et structure"""
         try:
-            doc = Document(file)
-            text = "\n".join(
-                p.text for p in doc.paragraphs if p.text.strip()
-            )
-            return text.strip(), False
+            if not isinstance(file, str):
+                file.seek(0)
+            text, structure = read_docx(file)
+            return text.strip(), structure
         except Exception as e:
-            logger.error(f"Erreur Word: {str(e)}")
+            logger.error("Erreur Word: %s", e)
             raise HTTPException(
                 status_code=422,
                 detail="Échec extraction Word"
@@ -0,0 +1,136 @@
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+# Villes les plus fréquentes dans les profils : (ville, région, pays)
+CITIES = [
+    ("Paris", "Île-de-France", "France"),
+    ("Marseille", "Provence-Alpes-Côte d'Azur", "France"),
+    ("Lyon", "Auvergne-Rhône-Alpes", "France"),
+    ("Toulouse", "Occitanie", "France"),
+    ("Nice", "Provence-Alpes-Côte d'Azur", "France"),
+    ("Nantes", "Pays de la Loire", "France"),
+    ("Montpellier", "Occitanie", "France"),
+    ("Strasbourg", "Grand Est", "France"),
+    ("Bordeaux", "Nouvelle-Aquitaine", "France"),
+    ("Lille", "Hauts-de-France", "France"),
+    ("Rennes", "Bretagne", "France"),
+    ("Reims", "Grand Est", "France"),
+    ("Toulon", "Provence-Alpes-Côte d'Azur", "France"),
+    ("Saint-Étienne", "Auvergne-Rhône-Alpes", "France"),
+    ("Le Havre", "Normandie", "France"),
+    ("Grenoble", "Auvergne-Rhône-Alpes", "France"),
+    ("Dijon", "Bourgogne-Franche-Comté", "France"),
+    ("Angers", "Pays de la Loire", "France"),
+    ("Nîmes", "Occitanie", "France"),
+    ("Villeurbanne", "Auvergne-Rhône-Alpes", "France"),
+    ("Clermont-Ferrand", "Auvergne-Rhône-Alpes", "France"),
+    ("Le Mans", "Pays de la Loire", "France"),
+    ("Aix-en-Provence", "Provence-Alpes-Côte d'Azur", "France"),
+    ("Brest", "Bretagne", "France"),
+    ("Tours", "Centre-Val de Loire", "France"),
+    ("Amiens", "Hauts-de-France", "France"),
+    ("Limoges", "Nouvelle-Aquitaine", "France"),
+    ("Annecy", "Auvergne-Rhône-Alpes", "France"),
+    ("Perpignan", "Occitanie", "France"),
+    ("Metz", "Grand Est", "France"),
+    ("Besançon", "Bourgogne-Franche-Comté", "France"),
+    ("Orléans", "Centre-Val de Loire", "France"),
+    ("Rouen", "Normandie", "France"),
+    ("Caen", "Normandie", "France"),
+    ("Mulhouse", "Grand Est", "France"),
+    ("Nancy", "Grand Est", "France"),
+    ("Argenteuil", "Île-de-France", "France"),
+    ("Montreuil", "Île-de-France", "France"),
+    ("Saint-Denis", "Île-de-France", "France"),
+    ("Avignon", "Provence-Alpes-Côte d'Azur", "France"),
+    ("Poitiers", "Nouvelle-Aquitaine", "France"),
+    ("La Rochelle", "Nouvelle-Aquitaine", "France"),
+    ("Pau", "Nouvelle-Aquitaine", "France"),
+    ("Bayonne", "Nouvelle-Aquitaine", "France"),
+    ("Ajaccio", "Corse", "France"),
+    ("Bastia", "Corse", "France"),
+    ("Bruxelles", "Bruxelles-Capitale", "Belgique"),
+    ("Liège", "Wallonie", "Belgique"),
+    ("Namur", "Wallonie", "Belgique"),
+    ("Genève", "Genève", "Suisse"),
+    ("Lausanne", "Vaud", "Suisse"),
+    ("Montréal", "Québec", "Canada"),
+    ("Québec", "Québec", "Canada"),
+    ("Luxembourg", "Luxembourg", "Luxembourg"),
+    ("Casablanca", "Casablanca-Settat", "Maroc"),
+    ("Rabat", "Rabat-Salé-Kénitra", "Maroc"),
+    ("Marrakech", "Marrakech-Safi", "Maroc"),
+    ("Tunis", "Tunis", "Tunisie"),
+    ("Alger", "Alger", "Algérie"),
+    ("Dakar", "Dakar", "Sénégal"),
+    ("Abidjan", "Abidjan", "Côte d'Ivoire"),
+    ("Douala", "Littoral", "Cameroun"),
+    ("Yaoundé", "Centre", "Cameroun"),
+]
+
+REGIONS = [
+    ("Île-de-France", "France"), ("Provence-Alpes-Côte d'Azur", "France"), ("Auvergne-Rhône-Alpes", "France"),
+    ("Occitanie", "France"), ("Pays de la Loire", "France"), ("Grand Est", "France"),
+    ("Nouvelle-Aquitaine", "France"), ("Hauts-de-France", "France"), ("Bretagne", "France"),
+    ("Normandie", "France"), ("Bourgogne-Franche-Comté", "France"), ("Centre-Val de Loire", "France"),
+    ("Corse", "France"), ("Wallonie", "Belgique"), ("Flandre", "Belgique"),
+]
+
+COUNTRIES = [
+    "France", "Belgique", "Suisse", "Canada", "Luxembourg", "Maroc", "Tunisie", "Algérie",
+    "Sénégal", "Côte d'Ivoire", "Cameroun", "Espagne", "Italie", "Allemagne", "Portugal",
+]
+
+# Noms qui sont aussi des mots courants : retenus seulement après "à", "sur"
+# ou un code postal
+AMBIGUOUS = {"nice", "tours", "pau", "caen", "metz"}
+
+# Les noms composés du gazetteer comptent au plus 4 mots ("Pays de la Loire")
+MAX_WORDS = 4
+
+def normalize(name: str) -> str:
+    """Clé de recherche : minuscules, sans accents, tirets et apostrophes en espaces"""
+    decomposed = unicodedata.normalize("NFKD", name.lower())
+    ascii_name = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(re.split(r"[\s\-'’]+", ascii_name)).strip()
+
+# Index en mémoire : clé normalisée -> (type, ville, région, pays)
+Place = Tuple[str, Optional[str], Optional[str], Optional[str]]
+INDEX: Dict[str, Place] = {}
+for _country in COUNTRIES:
+    INDEX[normalize(_country)] = ("country", None, None, _country)
+for _region, _country in REGIONS:
+    INDEX[normalize(_region)] = ("region", None, _region, _country)
+for _city, _region, _country in CITIES:
+    INDEX[normalize(_city)] = ("city", _city, _region, _country)
+
+_WORD = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+def find_places(text: str) -> List[Tuple[int, Place]]:
+    """Lieux connus cités dans le texte, avec leur position.
+
+    Seules les suites de mots commençant par une majuscule sont cherchées
+    dans l'index, de la plus longue (MAX_WORDS mots) à la plus courte.
+    """
+    words = list(_WORD.finditer(text))
+    found = []
+    i = 0
+    while i < len(words):
+        if not words[i].group(0)[0].isupper():
+            i += 1
+            continue
+        for size in range(min(MAX_WORDS, len(words) - i), 0, -1):
+            span = text[words[i].start():words[i + size - 1].end()]
+            place = INDEX.get(normalize(span))
+            if place is None:
+                continue
+            if place[0] == "city" and normalize(span) in AMBIGUOUS:
+                before = text[max(0, words[i].start() - 12):words[i].start()].lower()
+                if not re.search(r"(?:\bà|\bsur|\d{5})\s*$", before):
+                    continue
+            found.append((words[i].start(), place))
+            i += size - 1
+            break
+        i += 1
+    return found
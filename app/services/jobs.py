@@ -0,0 +1,345 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from app.services import admission
+from app.services.cache import SQLiteDatabase
+from app.services.extraction_service import iter_extraction
+from app.services.logging_pipeline import request_id
+from app.services.metrics import Gauge
+from app.services.uploads import StoredUpload, remove_upload
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class JobStore(SQLiteDatabase):
+    """Jobs d'extraction persistés dans SQLite, partagés entre workers uvicorn.
+
+    Méthodes bloquantes : depuis la boucle d'événements, passer par
+    `asyncio.to_thread`.
+    """
+
+    TIMEOUT = 10.0
+    AUTOCOMMIT = True  # Transactions explicites (BEGIN IMMEDIATE)
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        "id TEXT PRIMARY KEY, status TEXT NOT NULL, filename TEXT, "
+        "content_type TEXT NOT NULL, upload_path TEXT NOT NULL, "
+        "pages_done INTEGER NOT NULL DEFAULT 0, pages_total INTEGER, "
+        "result TEXT, error TEXT, owner TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+        "created REAL NOT NULL, started REAL, updated REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)",
+    )
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        # Base créée avant le compteur d'essais
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "attempts" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+
+    def enqueue(self, filename: str, content_type: str, upload_path: str,
+                max_queue: int) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Ajoute un job si moins de `max_queue` jobs sont en file ou en cours,
+        tous workers confondus (comptage et insertion dans la même
+        transaction). Retourne le job créé (None si refusé) et le nombre de
+        jobs en attente avant l'ajout."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+            row = None
+            if pending < max_queue:
+                now = time.time()
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO jobs (id, status, filename, content_type, upload_path, created, updated) "
+                    "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                    (job_id, filename, content_type, upload_path, now, now)
+                )
+                row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return (dict(row) if row else None), pending
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def pending(self) -> int:
+        """Jobs en file ou en cours, tous workers confondus"""
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+        ).fetchone()[0]
+
+    def average_duration(self, sample: int = 20) -> Optional[float]:
+        row = self._connect().execute(
+            "SELECT AVG(updated - started) FROM (SELECT updated, started FROM jobs "
+            "WHERE status = 'done' AND started IS NOT NULL ORDER BY updated DESC LIMIT ?)",
+            (sample,)
+        ).fetchone()
+        return row[0]
+
+    def claim(self, owner: str) -> Optional[Dict[str, Any]]:
+        """Passe atomiquement le plus ancien job en file à `running` pour
+        `owner`, en comptant un essai de plus"""
+        conn = self._connect()
+        # Lecture seule d'abord : un consommateur inactif ne prend pas le
+        # verrou d'écriture à chaque interrogation
+        if conn.execute("SELECT 1 FROM jobs WHERE status = 'queued' LIMIT 1").fetchone() is None:
+            return None
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, attempts = attempts + 1, "
+                "started = ?, updated = ? WHERE id = ?",
+                (owner, now, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return dict(row)
+
+    def progress(self, job_id: str, pages_done: int, pages_total: Optional[int]) -> None:
+        self._connect().execute(
+            "UPDATE jobs SET pages_done = ?, pages_total = COALESCE(?, pages_total), updated = ? WHERE id = ?",
+            (pages_done, pages_total, time.time(), job_id)
+        )
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        self._connect().executemany(
+            "UPDATE jobs SET updated = ? WHERE id = ? AND status = 'running'",
+            [(time.time(), job_id) for job_id in job_ids]
+        )
+
+    def finish(self, job_id: str, result: Optional[dict] = None, error: Optional[dict] = None) -> None:
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, updated = ? WHERE id = ?",
+            (
+                "failed" if error else "done",
+                json.dumps(result, ensure_ascii=False) if result is not None else None,
+                json.dumps(error, ensure_ascii=False) if error is not None else None,
+                time.time(),
+                job_id
+            )
+        )
+
+    def requeue_stale(self, stale_after: float, max_attempts: int) -> Tuple[int, int]:
+        """Remet en file les jobs `running` dont le worker ne donne plus signe
+        de vie, ou les passe en échec après `max_attempts` essais (un document
+        qui fait tomber son worker ne boucle pas indéfiniment). Retourne le
+        nombre de jobs remis en file et passés en échec."""
+        conn = self._connect()
+        now = time.time()
+        error = json.dumps(
+            {"status_code": 500, "detail": f"Traitement interrompu {max_attempts} fois, abandonné"},
+            ensure_ascii=False
+        )
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            failed = conn.execute(
+                "UPDATE jobs SET status = 'failed', owner = NULL, error = ?, updated = ? "
+                "WHERE status = 'running' AND updated < ? AND attempts >= ?",
+                (error, now, now - stale_after, max_attempts)
+            ).rowcount
+            requeued = conn.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL WHERE status = 'running' AND updated < ?",
+                (now - stale_after,)
+            ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return requeued, failed
+
+    def purge(self, older_than: float) -> List[str]:
+        """Supprime les jobs terminés trop anciens, retourne les fichiers à effacer"""
+        conn = self._connect()
+        limit = time.time() - older_than
+        rows = conn.execute(
+            "SELECT upload_path FROM jobs WHERE status IN ('done', 'failed') AND updated < ?", (limit,)
+        ).fetchall()
+        conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated < ?", (limit,))
+        return [row[0] for row in rows]
+
+def job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Représentation publique d'un job"""
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "filename": job["filename"],
+        "progress": {"pages_done": job["pages_done"], "pages_total": job["pages_total"]},
+        "attempts": job["attempts"],
+        "result": json.loads(job["result"]) if job["result"] else None,
+        "error": json.loads(job["error"]) if job["error"] else None,
+        "created": job["created"],
+        "updated": job["updated"]
+    }
+
+class JobRunner:
+    """Consomme la file de jobs dans ce processus, à concurrence bornée.
+
+    Chaque worker uvicorn lance son runner ; SQLite arbitre quel processus
+    prend quel job. Les jobs abandonnés (processus arrêté en cours de route)
+    sont remis en file une fois leur heartbeat expiré ; les pages déjà
+    traitées sont alors servies par le cache de pages. Après `max_attempts`
+    essais interrompus, le job passe en échec.
+    """
+
+    HEARTBEAT = 10.0  # Secondes
+    STALE_AFTER = 60.0
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, store: JobStore, concurrency: int, timeout: float, max_attempts: int):
+        self.store = store
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, float] = {}
+
+    def notify(self) -> None:
+        """Réveille les consommateurs après l'ajout d'un job"""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        self._tasks = [asyncio.ensure_future(self._consume()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.ensure_future(self._maintain()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _requeue_stale(self) -> None:
+        requeued, failed = await asyncio.to_thread(self.store.requeue_stale, self.STALE_AFTER, self.max_attempts)
+        if requeued:
+            logger.warning("%s job(s) abandonné(s) remis en file", requeued)
+        if failed:
+            logger.error("%s job(s) abandonné(s) après %s essais", failed, self.max_attempts)
+
+    async def _consume(self) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim, self.owner)
+            except sqlite3.Error as e:
+                logger.warning("Lecture de la file de jobs impossible: %s", e)
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._running[job["id"]] = time.time()
+            try:
+                await self._run(job)
+            finally:
+                self._running.pop(job["id"], None)
+
+    async def _maintain(self) -> None:
+        # Jobs laissés par un processus arrêté : repris dès le démarrage
+        heartbeat = False
+        while True:
+            try:
+                if heartbeat:
+                    await asyncio.to_thread(self.store.heartbeat, list(self._running))
+                await self._requeue_stale()
+                for path in await asyncio.to_thread(self.store.purge, settings.JOBS_RESULT_TTL):
+                    remove_upload(path)
+            except sqlite3.Error as e:
+                logger.warning("Maintenance des jobs impossible: %s", e)
+            heartbeat = True
+            await asyncio.sleep(self.HEARTBEAT)
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        request_id.set(job_id)  # corrélation des journaux du job (tâche dédiée)
+        # Travail de fond : file d'admission commune aux jobs, attente bornée par leur timeout
+        admission.client.set("jobs")
+        admission.max_wait.set(self.timeout)
+        logger.info("Début du job %s: %s", job_id, job['filename'])
+        start_time = time.time()
+        try:
+            result = await asyncio.wait_for(
+                self._extract(job_id, job["upload_path"], job["content_type"]),
+                timeout=self.timeout
+            )
+            result["processing_time"] = round(time.time() - start_time, 2)
+            await asyncio.to_thread(self.store.finish, job_id, result=result)
+            logger.info("Job %s terminé en %ss", job_id, result['processing_time'])
+        except asyncio.CancelledError:
+            # Arrêt du processus : le job sera repris via son heartbeat expiré
+            raise
+        except asyncio.TimeoutError:
+            logger.error("Timeout du job %s", job_id)
+            await asyncio.to_thread(self.store.finish, job_id, error={"status_code": 504, "detail": "Traitement trop long"})
+        except HTTPException as e:
+            await asyncio.to_thread(self.store.finish, job_id, error={"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            logger.error("Erreur du job %s: %s", job_id, e, exc_info=True)
+            await asyncio.to_thread(self.store.finish, job_id, error={"status_code": 500, "detail": "Erreur interne"})
+        remove_upload(job["upload_path"])
+
+    async def _extract(self, job_id: str, path: str, content_type: str) -> Dict[str, Any]:
+        pages_done, pages_total = 0, None
+        async for event in iter_extraction(path, content_type, lane=f"job:{job_id}"):
+            if event["event"] == "start":
+                pages_total = event["pages_total"]
+                await asyncio.to_thread(self.store.progress, job_id, pages_done, pages_total)
+            elif event["event"] == "page":
+                pages_done += 1
+                await asyncio.to_thread(self.store.progress, job_id, pages_done, pages_total)
+            elif event["event"] == "document":
+                return {key: value for key, value in event.items() if key != "event"}
+
+store = JobStore(settings.JOBS_DB_PATH)
+runner = JobRunner(store, settings.JOBS_CONCURRENCY, settings.JOBS_TIMEOUT, settings.JOBS_MAX_ATTEMPTS)
+
+Gauge("extraction_jobs_pending", "Jobs en file ou en cours, tous workers confondus", callback=store.pending)
+
+async def submit_job(upload: StoredUpload, content_type: str) -> Dict[str, Any]:
+    """Enregistre un job, ou 429 avec Retry-After si la file est pleine.
+
+    Le fichier reçu est déplacé (pas recopié) dans JOBS_DIR ; en cas de
+    refus il est remis en place et reste à la charge de l'appelant.
+    """
+    os.makedirs(settings.JOBS_DIR, exist_ok=True)
+    upload_path = os.path.join(settings.JOBS_DIR, uuid.uuid4().hex)
+    shutil.move(upload.path, upload_path)
+    job, pending = await asyncio.to_thread(
+        store.enqueue, upload.filename, content_type, upload_path, settings.JOBS_MAX_QUEUE
+    )
+    if job is None:
+        shutil.move(upload_path, upload.path)
+        average = await asyncio.to_thread(store.average_duration) or 30.0
+        retry_after = max(1, int(average * (pending - settings.JOBS_MAX_QUEUE + 1) / settings.JOBS_CONCURRENCY))
+        logger.warning("File de jobs pleine (%s), nouvelle tentative dans %ss", pending, retry_after)
+        raise HTTPException(
+            status_code=429,
+            detail="File de traitement pleine",
+            headers={"Retry-After": str(retry_after)}
+        )
+    runner.notify()
+    return job_view(job)
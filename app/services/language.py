@@ -0,0 +1,60 @@
+import re
+from collections import Counter
+from typing import Iterable, Optional
+
+# Mots outils les plus fréquents, par code de langue Tesseract
+STOPWORDS = {
+    "fra": {"le", "la", "les", "des", "du", "de", "et", "en", "un", "une", "pour", "dans", "par",
+            "sur", "au", "aux", "avec", "est", "que", "qui", "ne", "pas", "mois", "ans"},
+    "eng": {"the", "and", "of", "to", "in", "for", "with", "on", "at", "by", "is", "are", "was",
+            "from", "as", "an", "this", "that", "years", "months"},
+    "deu": {"der", "die", "das", "und", "mit", "von", "für", "auf", "ist", "den", "dem", "ein",
+            "eine", "nicht", "bei", "im", "zu", "als", "jahre"},
+    "spa": {"el", "los", "las", "del", "y", "con", "para", "por", "una", "uno", "es", "que",
+            "en", "al", "años", "meses", "como"},
+    "ita": {"il", "lo", "gli", "della", "delle", "di", "e", "con", "per", "una", "che", "è",
+            "nel", "alla", "anni", "mesi", "come"},
+    "por": {"o", "os", "as", "do", "da", "dos", "das", "e", "com", "para", "por", "uma", "que",
+            "em", "no", "na", "anos", "meses"},
+    "nld": {"de", "het", "een", "en", "van", "met", "voor", "op", "is", "dat", "niet", "bij",
+            "aan", "jaar", "maanden"},
+}
+
+# Script détecté par l'OSD de Tesseract -> modèle de langue à utiliser
+SCRIPT_LANGUAGES = {
+    "Arabic": "ara",
+    "Cyrillic": "rus",
+    "Greek": "ell",
+    "Hebrew": "heb",
+    "Devanagari": "hin",
+    "Thai": "tha",
+    "Han": "chi_sim",
+    "Japanese": "jpn",
+    "Hangul": "kor",
+}
+
+# Au moins ce nombre de mots outils reconnus, et deux fois plus que la
+# langue suivante, pour se prononcer
+MIN_HITS = 8
+
+# Mots propres à une seule langue : "de", "en", "que"... ne départagent rien
+DISTINCTIVE = {
+    code: words - set().union(*(other for name, other in STOPWORDS.items() if name != code))
+    for code, words in STOPWORDS.items()
+}
+
+_WORD = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+def guess_language(text: str, candidates: Iterable[str]) -> Optional[str]:
+    """Langue du texte parmi `candidates` (codes Tesseract) d'après ses mots
+    outils distinctifs, ou None si le texte est trop court ou ambigu"""
+    words = Counter(word.lower() for word in _WORD.findall(text))
+    scores = sorted(
+        ((sum(words[word] for word in DISTINCTIVE[code]), code) for code in candidates if code in DISTINCTIVE),
+        reverse=True
+    )
+    if not scores or scores[0][0] < MIN_HITS:
+        return None
+    if len(scores) > 1 and scores[0][0] < 2 * scores[1][0]:
+        return None
+    return scores[0][1]
@@ -0,0 +1,241 @@
+import atexit
+import copy
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import re
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.services.metrics import Counter
+
+# Identifiant de corrélation de la requête (ou du job) en cours
+request_id: ContextVar[str] = ContextVar("request_id", default="-")
+
+# En-tête X-Request-ID accepté tel quel s'il est raisonnable, régénéré sinon
+REQUEST_ID_PATTERN = re.compile(r"[\w.\-]{1,64}")
+
+# `extra` des journaux volumineux (textes, réponses, profils) : échantillonnés
+PAYLOAD = {"payload": True}
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+
+LOG_RECORDS_DROPPED = Counter("log_records_dropped_total", "Journaux perdus, file d'écriture pleine")
+
+class lazy:
+    """Argument de journal calculé seulement si le message est formaté :
+    `logger.debug("Profil: %s", lazy(json.dumps, data))`"""
+
+    def __init__(self, fn: Callable[..., Any], *args: Any, **kwargs: Any):
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+
+    def __str__(self) -> str:
+        return str(self.fn(*self.args, **self.kwargs))
+
+def preview(text: str, size: int) -> lazy:
+    """Début d'un texte, extrait seulement si le message est formaté"""
+    return lazy(lambda: text[:size])
+
+class ContextFilter(logging.Filter):
+    """Ajoute l'identifiant de corrélation, lu dans le contexte de l'appelant"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+class PayloadSampler(logging.Filter):
+    """Ne garde qu'une part `rate` des journaux marqués PAYLOAD"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "payload", False):
+            return self.rate >= 1.0 or random.random() < self.rate
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par enregistrement"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "process": record.process
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:  # trace déjà formatée dans un worker OCR
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _QueueHandler(QueueHandler):
+    """Dépose l'enregistrement tel quel : le formatage (message, trace
+    d'exception) se fait dans le thread d'écriture, pas dans la requête"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+class _WorkerQueueHandler(_QueueHandler):
+    """Côté worker OCR : l'enregistrement traverse une file multiprocessing,
+    message et trace d'exception sont donc mis en texte avant l'envoi"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class _QueueListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # File pleine à l'arrêt : attendre une place plutôt que d'échouer
+        self.queue.put(self._sentinel)
+
+_listener: Optional[QueueListener] = None
+# Journaux des workers OCR : file multiprocessing lue par un second thread d'écriture
+_worker_queue: Optional[Any] = None
+_worker_listener: Optional[QueueListener] = None
+_queue_size = 0
+_sample_rate = 1.0
+
+def process_log_file(path: str) -> str:
+    """Fichier de journal propre au processus ("api.log" -> "api.1234.log") :
+    plusieurs workers uvicorn ne font pas tourner le même fichier"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{os.getpid()}{ext or '.log'}"
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # processus d'un autre utilisateur
+        return True
+    return True
+
+def remove_stale_log_files(path: str, keep: int) -> int:
+    """Supprime les journaux des processus arrêtés (`process_log_file` et ses
+    fichiers tournés), sauf ceux des `keep` processus les plus récents :
+    les redémarrages n'accumulent pas un fichier par pid. Retourne le nombre
+    de fichiers effacés."""
+    root, ext = os.path.splitext(path)
+    directory = os.path.dirname(root) or "."
+    pattern = re.compile(re.escape(os.path.basename(root)) + r"\.(\d+)" + re.escape(ext or ".log") + r"(\..+)?$")
+    files: Dict[int, List[str]] = {}
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return 0
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            files.setdefault(int(match.group(1)), []).append(os.path.join(directory, name))
+
+    def last_write(pid: int) -> float:
+        return max((os.path.getmtime(name) for name in files[pid] if os.path.exists(name)), default=0.0)
+
+    stale = sorted(
+        (pid for pid in files if pid != os.getpid() and not _alive(pid)), key=last_write, reverse=True
+    )
+    removed = 0
+    for pid in stale[keep:]:
+        for name in files[pid]:
+            try:
+                os.remove(name)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+def setup_logging(settings) -> None:
+    """Journalisation via une file : les appels de log ne font que déposer
+    l'enregistrement, un thread dédié formate et écrit (console en texte,
+    fichier tournant en JSON ou texte, un par processus)"""
+    global _listener, _queue_size, _sample_rate
+    if _listener is not None:
+        return
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(TEXT_FORMAT))
+    handlers = [console]
+    removed = 0
+    if settings.LOG_FILE:
+        removed = remove_stale_log_files(settings.LOG_FILE, settings.LOG_BACKUP_COUNT)
+        path = process_log_file(settings.LOG_FILE)
+        if settings.LOG_ROTATE_WHEN:
+            file_handler = TimedRotatingFileHandler(
+                path, when=settings.LOG_ROTATE_WHEN,
+                backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8"
+            )
+        else:
+            file_handler = RotatingFileHandler(
+                path, maxBytes=settings.LOG_MAX_BYTES,
+                backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8"
+            )
+        file_handler.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+        handlers.append(file_handler)
+
+    handler = _QueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+    handler.addFilter(ContextFilter())
+    handler.addFilter(PayloadSampler(settings.LOG_PAYLOAD_SAMPLE_RATE))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    _queue_size = settings.LOG_QUEUE_SIZE
+    _sample_rate = settings.LOG_PAYLOAD_SAMPLE_RATE
+    _listener = _QueueListener(handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    if removed:
+        logging.getLogger(__name__).info("%s journal(aux) de processus arrêtés supprimé(s)", removed)
+
+def worker_logging() -> Optional[Tuple[Any, int, float]]:
+    """Arguments de `setup_worker_logging` pour les workers OCR (file vers les
+    handlers de ce processus, niveau, échantillonnage), ou None si la
+    journalisation n'est pas configurée"""
+    global _worker_queue, _worker_listener
+    if _listener is None:
+        return None
+    if _worker_queue is None:
+        _worker_queue = multiprocessing.get_context("spawn").Queue(_queue_size)
+        _worker_listener = _QueueListener(_worker_queue, *_listener.handlers, respect_handler_level=True)
+        _worker_listener.start()
+    return _worker_queue, logging.getLogger().level, _sample_rate
+
+def setup_worker_logging(log_queue: Any, level: int, sample_rate: float) -> None:
+    """Dans un worker OCR : journaux envoyés au processus principal, qui les
+    écrit avec les mêmes handlers (format JSON, identifiant de requête)"""
+    handler = _WorkerQueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+    handler.addFilter(PayloadSampler(sample_rate))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+
+def stop_logging() -> None:
+    """Écrit les enregistrements encore en file et arrête les threads d'écriture"""
+    global _listener, _worker_listener
+    if _worker_listener is not None:
+        _worker_listener.stop()
+        _worker_listener = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
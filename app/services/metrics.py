@@ -0,0 +1,204 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Durées en secondes, de l'étape d'image (ms) à l'appel Cohere complet
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_REGISTRY: List["_Metric"] = []
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+class Counter(_Metric):
+    """Compteur monotone, par combinaison de labels"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+class Gauge(_Metric):
+    """Valeur instantanée ; `callback` la calcule au moment de la collecte"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation)
+        self.callback = callback
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    def samples(self) -> List[str]:
+        value = self.callback() if self.callback is not None else self._value
+        return [f"{self.name} {_number(value)}"]
+
+class Histogram(_Metric):
+    """Distribution cumulée par seaux (format Prometheus), par combinaison de labels"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[Tuple[str, ...], list] = {}  # clé -> [compte par seau, somme]
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+def render_metrics() -> str:
+    """Toutes les métriques de ce processus au format texte Prometheus"""
+    return "".join(metric.render() for metric in _REGISTRY)
+
+# --- Étapes de traitement ------------------------------------------------------
+
+STAGE_SECONDS = Histogram(
+    "extraction_stage_seconds",
+    "Durée des étapes de traitement (upload, rendu, prétraitement, OCR, Cohere, parsing)",
+    ["stage"]
+)
+
+# Observations de la requête en cours (Server-Timing) ou du job en cours dans
+# un worker, qui les renvoie au processus principal avec son résultat
+_observations: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("stage_observations", default=None)
+
+def observe_stage(name: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=name)
+    observations = _observations.get()
+    if observations is not None:
+        observations.append((name, seconds))
+
+def record_stages(observations: List[Tuple[str, float]]) -> None:
+    """Rejoue dans ce processus les étapes mesurées par un worker"""
+    for name, seconds in observations:
+        observe_stage(name, seconds)
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Chronomètre un bloc (ou une fonction, en décorateur) comme étape `name`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+@contextmanager
+def collect_stages() -> Iterator[List[Tuple[str, float]]]:
+    """Collecte les étapes mesurées dans le bloc (requête, job de worker)"""
+    observations: List[Tuple[str, float]] = []
+    token = _observations.set(observations)
+    try:
+        yield observations
+    finally:
+        _observations.reset(token)
+
+def server_timing(observations: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """En-tête Server-Timing : durée cumulée (ms) et nombre d'occurrences par étape"""
+    totals: Dict[str, List[float]] = {}
+    for name, seconds in observations:
+        entry = totals.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+    parts = [
+        f'{name};dur={1000 * seconds:.1f}' + (f';desc="x{count}"' if count > 1 else "")
+        for name, (seconds, count) in totals.items()
+    ]
+    if total is not None:
+        parts.append(f"total;dur={1000 * total:.1f}")
+    return ", ".join(parts)
+
+# --- Requêtes et pages ---------------------------------------------------------
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Durée des requêtes HTTP (jusqu'aux en-têtes de réponse)",
+    ["method", "route", "status"]
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requêtes HTTP en cours")
+PAGES = Counter(
+    "extraction_pages_total",
+    "Pages traitées, par méthode (text = couche texte, ocr, cached, failed, docx)",
+    ["method"]
+)
+COHERE_ATTEMPTS = Counter("cohere_attempts_total", "Tentatives d'appel à Cohere, par résultat", ["outcome"])
+PROFILE_REBASES = Counter(
+    "document_profile_rebases_total",
+    "Profils de documents : fragments lancés pendant l'extraction gardés (kept) "
+    "ou profil recalculé sur le texte assemblé (recomputed)",
+    ["outcome"]
+)
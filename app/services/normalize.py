@@ -0,0 +1,113 @@
+import math
+import re
+from collections import Counter
+from typing import List, Tuple
+
+# À incrémenter quand la normalisation change : invalide les extractions en cache
+NORMALIZE_VERSION = 3
+
+ALNUM = re.compile(r"[^\W_]")
+# Numéro de page : "Page 3", "p. 3 / 12", ou ligne réduite à "3", "- 3 -", "3/12"
+PAGE_NUMBER = re.compile(
+    r"\b(?:page|p\.)\s*\d+(?:\s*(?:/|sur|of)\s*\d+)?\b|^[^\w]*\d+(?:\s*(?:/|sur)\s*\d+)?[^\w]*$",
+    re.IGNORECASE
+)
+
+# Lignes de marge (début et fin de page) examinées pour les en-têtes et pieds de page
+MARGIN_LINES = 2
+
+def _is_junk(line: str) -> bool:
+    """Ligne parasite typique de l'OCR : aucun caractère alphanumérique
+    ("| ~ .", "—— ,,"). Une ligne courte ("A", "5") est gardée"""
+    return not ALNUM.search(line)
+
+def _join(head: str, line: str) -> str:
+    """Recolle un mot coupé en fin de ligne : "infor-" + "mation" donne
+    "information" ; le trait d'union est gardé devant une majuscule ou un
+    chiffre ("Jean-Pierre", "2020-2021") et après une seule lettre ("E-mail")"""
+    word = head.rsplit(" ", 1)[-1]
+    if line[0].islower() and len(word) > 1:
+        return head + line
+    return f"{head}-{line}"
+
+def normalize_text(text: str, flatten: bool = False, drop_junk: bool = True,
+                   join_hyphens: bool = True) -> str:
+    """Normalisation en une passe sur les lignes du texte.
+
+    - espaces consécutifs réduits à un seul, lignes rognées ;
+    - mot coupé en fin de ligne recollé, avant tout filtrage : sans son trait
+      d'union en sortie d'OCR (`join_hyphens`, voir `_join`), avec dans un
+      texte saisi ou une couche texte, où il appartient le plus souvent au
+      mot ("porte-monnaie", "c'est-à-dire") ;
+    - lignes parasites de l'OCR retirées (`drop_junk`) ;
+    - lignes vides consécutives réduites à une (séparateur de paragraphe).
+
+    Avec `flatten`, les lignes sont jointes par des espaces (texte sur une
+    seule ligne, comme attendu par l'analyse d'orientation).
+    """
+    lines: List[str] = []
+    pending = ""  # ligne terminée par un mot coupé, sans son trait d'union
+    for raw in text.splitlines():
+        # split() sans argument : blancs consécutifs réduits et ligne rognée, sans regex
+        line = " ".join(raw.split())
+        if pending:
+            if line and line[0].isalnum():
+                line = _join(pending, line) if join_hyphens else f"{pending}-{line}"
+            else:
+                lines.append(pending + "-")
+            pending = ""
+        if not line:
+            if lines and lines[-1] and not flatten:
+                lines.append("")
+            continue
+        if len(line) > 1 and line[-1] == "-" and line[-2].isalnum():
+            pending = line[:-1]
+            continue
+        if drop_junk and _is_junk(line):
+            continue
+        lines.append(line)
+    if pending:
+        lines.append(pending + "-")
+    while lines and not lines[-1]:
+        lines.pop()
+    return (" " if flatten else "\n").join(lines)
+
+def _margin_key(line: str) -> str:
+    # Seul un numéro de page peut varier : "Page 3 / 12" et "Page 4 / 12" se répètent
+    return PAGE_NUMBER.sub("#", line)
+
+def _margins(lines: List[str]) -> List[Tuple[int, Tuple[str, int]]]:
+    """Indices des lignes de marge d'une page, avec leur position (haut ou bas, rang)"""
+    filled = [index for index, line in enumerate(lines) if line]
+    top = [(index, ("top", rank)) for rank, index in enumerate(filled[:MARGIN_LINES])]
+    bottom = [(index, ("bottom", rank)) for rank, index in enumerate(reversed(filled[-MARGIN_LINES:]))]
+    return top + bottom
+
+def strip_repeated_lines(pages: List[str], min_pages: int = 3, min_share: float = 0.5) -> List[str]:
+    """Retire les en-têtes et pieds de page répétés d'une page à l'autre.
+
+    Une ligne parmi les MARGIN_LINES premières ou dernières d'une page est
+    retirée si la même ligne, au numéro de page près, se retrouve à la même
+    place dans au moins `min_share` des pages, et au moins `min_pages` pages.
+    Une page qui serait vidée est gardée telle quelle.
+    """
+    if len(pages) < min_pages:
+        return pages
+    split = [page.split("\n") for page in pages]
+    counts: Counter = Counter()
+    for lines in split:
+        counts.update({(position, _margin_key(lines[index])) for index, position in _margins(lines)})
+    threshold = max(min_pages, math.ceil(min_share * len(pages)))
+    repeated = {key for key, count in counts.items() if count >= threshold}
+    if not repeated:
+        return pages
+
+    result = []
+    for page, lines in zip(pages, split):
+        dropped = {
+            index for index, position in _margins(lines)
+            if (position, _margin_key(lines[index])) in repeated
+        }
+        kept = "\n".join(line for index, line in enumerate(lines) if index not in dropped).strip("\n")
+        result.append(kept if kept.strip() else page)
+    return result
@@ -0,0 +1,282 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from fastapi import HTTPException
+from app.models.schemas import PROFILE_FIELDS, OrientationProfile
+from app.services.cache import TieredCache
+from app.services.cohere_service import PROMPT_VERSION, get_orientation_data
+from app.services.text_processing import (
+    RULES_VERSION, clean_text, extract_rule_fields, merge_profiles, parse_cohere_response, split_text,
+    text_spans
+)
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Estimation sans tokenizer : ~4 caractères par token pour du français
+CHARS_PER_TOKEN = 4
+
+# Version des entrées mémorisées : gabarit du prompt, schéma du profil, règles, découpage
+CACHE_VERSION = hashlib.sha256((
+    PROMPT_VERSION
+    + str(RULES_VERSION)
+    + json.dumps(OrientationProfile.schema(), sort_keys=True)
+    + repr((settings.ORIENTATION_CHUNK_TOKENS, settings.ORIENTATION_CHUNK_OVERLAP, settings.ORIENTATION_MAX_CHUNKS))
+).encode()).hexdigest()[:12]
+
+profile_cache = TieredCache(
+    settings.ORIENTATION_CACHE_SIZE,
+    settings.ORIENTATION_CACHE_PATH,
+    ttl=settings.ORIENTATION_CACHE_TTL,
+    max_entries=settings.ORIENTATION_CACHE_MAX_ENTRIES
+)
+
+def _cache_key(text: str, fields: Sequence[str]) -> str:
+    digest = hashlib.sha256(text.encode()).hexdigest()
+    return f"profile:{CACHE_VERSION}:{','.join(sorted(fields))}:{digest}"
+
+def cache_stats() -> Dict[str, Any]:
+    """Statistiques du cache des profils"""
+    return {**profile_cache.stats(), "version": CACHE_VERSION}
+
+CHUNK_CHARS = settings.ORIENTATION_CHUNK_TOKENS * CHARS_PER_TOKEN
+OVERLAP_CHARS = settings.ORIENTATION_CHUNK_OVERLAP * CHARS_PER_TOKEN
+
+def chunk_text(text: str, max_chunks: Optional[int] = None) -> List[str]:
+    """Fenêtres d'au plus ORIENTATION_CHUNK_TOKENS tokens (estimés), en nombre
+    borné par `max_chunks` (ORIENTATION_MAX_CHUNKS par défaut)"""
+    if len(text) <= CHUNK_CHARS:
+        return [text]
+    # Texte très long : fenêtres agrandies plutôt que plus nombreuses
+    max_chunks = max_chunks or settings.ORIENTATION_MAX_CHUNKS
+    max_chars = max(CHUNK_CHARS, math.ceil(len(text) / max_chunks) + OVERLAP_CHARS)
+    return split_text(text, max_chars, OVERLAP_CHARS)
+
+def _covered(found: Set[str]) -> Set[str]:
+    """Champs du profil entièrement remplis par les règles locales"""
+    covered = {field for field in found if "." not in field}
+    if {"fee.formation", "fee.logement"} <= found:
+        covered.add("fee")
+    if "address.city" in found:  # la ville donne aussi région et pays
+        covered.add("address")
+    return covered
+
+def _with_rules(profile_data: Dict[str, Any], rule_data: Dict[str, Any],
+                found: Set[str]) -> Tuple[Dict[str, Any], Set[str]]:
+    """Valeurs trouvées par les règles, complétées par celles du modèle.
+
+    L'adresse des règles ne l'emporte que si elle est explicite (dans
+    `found`) ; sinon elle ne sert qu'à défaut d'adresse donnée par le modèle.
+    Retourne aussi les champs repris des règles.
+    """
+    combined = {**profile_data, **{k: v for k, v in rule_data.items() if k not in ("fee", "address")}}
+    fee = profile_data.get("fee") or {}
+    combined["fee"] = {
+        kind: {**(fee.get(kind) or {"min": None, "max": None}), **rule_data.get("fee", {}).get(kind, {})}
+        for kind in ("formation", "logement")
+    }
+    address = profile_data.get("address") or {}
+    rule_address = rule_data.get("address", {})
+    used = set(found)
+    if any(field.startswith("address.") for field in found) or not any(address.values()):
+        combined["address"] = {
+            key: rule_address.get(key) or address.get(key)
+            for key in ("city", "region", "country")
+        }
+        used |= {f"address.{key}" for key, value in rule_address.items() if value}
+    else:
+        combined["address"] = {key: address.get(key) for key in ("city", "region", "country")}
+    return combined, used
+
+def _sources(profile: OrientationProfile, found: Set[str]) -> Dict[str, str]:
+    """Origine ("rules" ou "llm") de chaque valeur renseignée du profil"""
+    data = profile.dict(exclude={"sources"})
+    values = {}
+    for field, value in data.items():
+        if isinstance(value, dict):
+            for key, sub in value.items():
+                filled = any(v is not None for v in sub.values()) if isinstance(sub, dict) else sub is not None
+                if filled:
+                    values[f"{field}.{key}"] = True
+        elif value is not None:
+            values[field] = True
+    return {name: "rules" if name in found else "llm" for name in values}
+
+async def _partial_profile(chunk: str, fields: Sequence[str]) -> Dict[str, Any]:
+    """Profil d'un fragment ({} si la réponse est inexploitable)"""
+    profile_data = parse_cohere_response(await get_orientation_data(chunk, fields))
+    if not profile_data:
+        return {}
+    return OrientationProfile(**profile_data).dict()
+
+def _reduce(results: List[Any], chunks: int) -> Dict[str, Any]:
+    """Fusion dans l'ordre du texte des profils partiels (ou exceptions) des fragments"""
+    profiles = [result for result in results if isinstance(result, dict) and result]
+    errors = [result for result in results if isinstance(result, BaseException)]
+    for error in errors:
+        # Délestage (429/503 avec Retry-After) : pas de profil partiel mis en cache
+        if isinstance(error, HTTPException) and error.status_code in (429, 503) and error.headers:
+            raise error
+    if not profiles:
+        if errors:
+            raise errors[0]
+        return {}
+    if errors or len(profiles) < chunks:
+        logger.warning("%s/%s fragment(s) sans profil exploitable", chunks - len(profiles), chunks)
+    return merge_profiles(profiles)
+
+async def _map_reduce(chunks: List[str], fields: Sequence[str]) -> Dict[str, Any]:
+    """Fragments analysés en parallèle (concurrence bornée par le client Cohere),
+    puis fusionnés dans l'ordre du texte"""
+    results = await asyncio.gather(*(_partial_profile(chunk, fields) for chunk in chunks), return_exceptions=True)
+    return _reduce(results, len(chunks))
+
+async def _finalize(key: str, profile_data: Dict[str, Any], rule_data: Dict[str, Any],
+              found: Set[str]) -> OrientationProfile:
+    """Profil final : valeurs du modèle complétées par les règles, mis en cache"""
+    if not profile_data and not found:
+        logger.error("Échec du parsing de la réponse Cohere")
+        raise HTTPException(422, detail="Impossible d'analyser la réponse de l'IA")
+    combined, used = _with_rules(profile_data, rule_data, found)
+    profile = OrientationProfile(**combined)
+    profile.sources = _sources(profile, used)
+    await profile_cache.set(key, profile.dict())
+    return profile
+
+async def extract_profile(raw_text: str, fields: Optional[Sequence[str]] = None) -> OrientationProfile:
+    """Texte brut -> profil d'orientation, avec mémorisation sur le texte nettoyé.
+
+    Les champs sûrs (email, téléphone, budgets, lieu...) sont d'abord extraits
+    localement ; Cohere ne reçoit que le schéma des champs restants parmi
+    `fields` (tous par défaut) et n'est pas appelé s'il n'en reste aucun.
+    Un texte long est découpé en fragments analysés en parallèle puis
+    fusionnés (voir `merge_profiles`) : la latence suit le fragment le plus
+    lent plutôt que la taille du texte.
+    """
+    text = clean_text(raw_text)
+    if len(text) < 10:
+        logger.warning("Texte nettoyé trop court")
+        raise HTTPException(400, detail="Le texte doit contenir au moins 10 caractères valides")
+
+    wanted = list(fields) if fields else list(PROFILE_FIELDS)
+    key = _cache_key(text, wanted)
+    cached = await profile_cache.get(key)
+    if cached is not None:
+        logger.info("Profil servi depuis le cache")
+        return OrientationProfile(**cached)
+
+    rule_data, found = extract_rule_fields(text)
+    remaining = [field for field in wanted if field not in _covered(found)]
+    profile_data: Dict[str, Any] = {}
+    if not remaining:
+        logger.info("Champs demandés tous trouvés par les règles locales (%s), appel Cohere évité", len(found))
+    else:
+        logger.info("%s champ(s) trouvé(s) par les règles, %s demandé(s) à Cohere", len(found), len(remaining))
+        chunks = chunk_text(text)
+        if len(chunks) == 1:
+            profile_data = parse_cohere_response(await get_orientation_data(text, remaining))
+        else:
+            logger.info("Texte long (%s caractères) découpé en %s fragments", len(text), len(chunks))
+            profile_data = await _map_reduce(chunks, remaining)
+        if not profile_data and found:
+            logger.warning("Réponse Cohere inexploitable, profil limité aux règles locales")
+
+    return await _finalize(key, profile_data, rule_data, found)
+
+class ProfileBuilder:
+    """Profil construit au fil d'un texte reçu par morceaux (pages extraites).
+
+    Chaque fenêtre complète (ORIENTATION_CHUNK_TOKENS) part vers Cohere dès
+    que le texte qui la précède est connu, pendant que la suite du document
+    est encore extraite ; `finish` envoie la fin du texte puis fusionne comme
+    `extract_profile`. Un texte qui tient dans une seule fenêtre suit
+    simplement `extract_profile` (cache et règles compris).
+
+    Le profil n'est pas toujours identique à celui d'`extract_profile` sur le
+    même texte (même clé de cache) : les fenêtres lancées en cours de route
+    ont la taille fixe CHUNK_CHARS, alors que `chunk_text` les agrandit pour
+    un texte très long, et chacune ne demande que les champs que les règles
+    n'ont pas trouvés dans le texte déjà reçu.
+    """
+
+    def __init__(self, fields: Optional[Sequence[str]] = None):
+        self.wanted = list(fields) if fields else list(PROFILE_FIELDS)
+        self.text = ""
+        self._start = 0  # début de la fenêtre en cours
+        self._sent = 0  # fin de la dernière fenêtre lancée
+        self._tasks: List[asyncio.Future] = []
+
+    @property
+    def chunks_started(self) -> int:
+        return len(self._tasks)
+
+    def _launch(self, chunk: str) -> None:
+        # Champs déjà trouvés par les règles sur le début du texte : non demandés
+        covered = _covered(extract_rule_fields(self.text)[1])
+        remaining = [field for field in self.wanted if field not in covered]
+        if remaining:
+            self._tasks.append(asyncio.ensure_future(_partial_profile(chunk, remaining)))
+
+    def feed(self, raw_text: str) -> None:
+        """Ajoute la suite du texte ; lance les fenêtres devenues complètes"""
+        text = clean_text(raw_text)
+        if not text:
+            return
+        self.text = f"{self.text} {text}" if self.text else text
+        # La dernière fenêtre attend la suite ; une place reste pour la fin du texte
+        while len(self._tasks) < settings.ORIENTATION_MAX_CHUNKS - 1:
+            spans = text_spans(self.text[self._start:], CHUNK_CHARS, OVERLAP_CHARS)
+            if len(spans) < 2:
+                break
+            start, end = spans[0]
+            self._launch(self.text[self._start + start:self._start + end].strip())
+            self._sent = self._start + end
+            self._start += spans[1][0]
+
+    def rebase(self, raw_text: str) -> bool:
+        """Remplace le texte reçu par le texte complet `raw_text`.
+
+        Les fenêtres déjà lancées sont gardées si le texte qu'elles couvrent
+        est inchangé (seule la suite diffère : marges repérées sur tout le
+        document, mot coupé entre deux pages...) ; sinon elles sont annulées
+        et le texte repart de zéro. Retourne True si elles sont gardées.
+        """
+        text = clean_text(raw_text)
+        if text[:self._sent] == self.text[:self._sent]:
+            self.text = text
+            return True
+        self.cancel()
+        self.text = ""
+        self._start = self._sent = 0
+        self._tasks = []
+        self.feed(raw_text)
+        return False
+
+    def cancel(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+    async def finish(self) -> OrientationProfile:
+        """Profil du texte complet"""
+        if not self._tasks:
+            return await extract_profile(self.text, self.wanted)
+
+        key = _cache_key(self.text, self.wanted)
+        cached = await profile_cache.get(key)
+        if cached is not None:
+            self.cancel()
+            logger.info("Profil servi depuis le cache")
+            return OrientationProfile(**cached)
+
+        tail = chunk_text(self.text[self._start:], settings.ORIENTATION_MAX_CHUNKS - len(self._tasks))
+        early = len(self._tasks)
+        for chunk in tail:
+            if len(chunk) >= 10:
+                self._launch(chunk)
+        logger.info("Texte découpé en %s fragments, dont %s lancé(s) pendant l'extraction", early + len(tail), early)
+        rule_data, found = extract_rule_fields(self.text)
+        results = await asyncio.gather(*self._tasks, return_exceptions=True)
+        return await _finalize(key, _reduce(results, len(self._tasks)), rule_data, found)
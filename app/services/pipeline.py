@@ -0,0 +1,80 @@
+import logging
+import time
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+from app.services.extraction_service import iter_extraction, strip_margins
+from app.services.metrics import PROFILE_REBASES
+from app.services.orientation_service import ProfileBuilder
+
+logger = logging.getLogger(__name__)
+
+# Pages reçues avant de repérer les en-têtes et pieds de page répétés
+MARGIN_PAGES = 3
+
+async def document_profile(path: str, content_type: str, lane: Hashable,
+                           digest: Optional[str] = None,
+                           fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Document -> profil d'orientation en un seul passage côté serveur.
+
+    Les pages extraites (ordre de complétion) sont remises dans l'ordre du
+    document, débarrassées des en-têtes et pieds de page répétés (repérés sur
+    les pages déjà reçues, par lots qui doublent pour rester linéaire) et
+    transmises au fur et à mesure à un `ProfileBuilder` : les premières
+    fenêtres de texte partent vers Cohere pendant que l'OCR des pages
+    suivantes continue.
+
+    Le profil est finalement calculé sur le texte assemblé du document, donc
+    sous la même clé de cache que `/extract-text` suivi de `/process-text`.
+    Ce texte peut différer de celui transmis (marges repérées autrement sur
+    l'ensemble des pages, mot coupé entre deux pages) : les fragments déjà
+    lancés sont gardés si le texte qu'ils couvrent est inchangé, sinon le
+    profil est recalculé (voir `ProfileBuilder.rebase`, compteur
+    `document_profile_rebases_total`). Les fragments eux-mêmes peuvent
+    différer de ceux de `/process-text` (voir `ProfileBuilder`). Renvoie le
+    profil et les métadonnées d'extraction (sans le texte).
+    """
+    start_time = time.perf_counter()
+    builder = ProfileBuilder(fields)
+    events = iter_extraction(path, content_type, lane, digest)
+    ready: Dict[int, str] = {}
+    ordered: List[str] = []  # textes non vides, dans l'ordre du document
+    fed = 0
+    next_page = 0
+    extraction: Dict[str, Any] = {}
+    recomputed = False
+    try:
+        async for event in events:
+            if event["event"] == "page":
+                ready[event["page"]] = event["text"]
+                while next_page in ready:
+                    text = ready.pop(next_page)
+                    if text:
+                        ordered.append(text)
+                    next_page += 1
+                if len(ordered) >= max(MARGIN_PAGES, 2 * fed):
+                    for text in strip_margins(ordered)[fed:]:
+                        builder.feed(text)
+                    fed = len(ordered)
+            elif event["event"] == "document":
+                extraction = {key: value for key, value in event.items() if key not in ("event", "text")}
+                # Dernières pages, avec les marges repérées sur tout le document
+                for text in strip_margins(ordered)[fed:]:
+                    builder.feed(text)
+                # Document servi par le cache (aucune page), ou texte assemblé différent
+                if builder.chunks_started:
+                    recomputed = not builder.rebase(event["text"])
+                    PROFILE_REBASES.inc(outcome="recomputed" if recomputed else "kept")
+                    if recomputed:
+                        logger.info("Texte assemblé différent du texte transmis, profil recalculé")
+                else:
+                    builder.rebase(event["text"])
+        extraction["extraction_time"] = round(time.perf_counter() - start_time, 2)
+        extraction["characters"] = len(builder.text)
+        early = 0 if recomputed else builder.chunks_started
+        profile = await builder.finish()
+    finally:
+        await events.aclose()
+        builder.cancel()
+
+    extraction["profile_chunks_during_extraction"] = early
+    extraction["profile_recomputed"] = recomputed
+    return {"profile": profile.dict(), "extraction": extraction}
@@ -1,23 +1,33 @@
 import re
 import json
 import logging
-from typing import Dict, Optional  # Ajout de Optional ici
+from typing import Dict, List, Optional, Set, Tuple
+from app.models.schemas import OrientationProfile
+from app.services.gazetteer import find_places
+from app.services.logging_pipeline import PAYLOAD, lazy, preview
+from app.services.metrics import stage
+from app.services.normalize import normalize_text
 
 logger = logging.getLogger(__name__)
 
+@stage("clean_text")
 def clean_text(text: str) -> str:
-    logger.debug(f"Nettoyage du texte original: {text[:100]}...")
-    cleaned = text.strip().replace("\n", " ")
-    cleaned = re.sub(r'\s+', ' ', cleaned)
-    logger.debug(f"Texte nettoyé: {cleaned[:100]}...")
+    """Texte sur une seule ligne (voir `normalize_text`). Les lignes parasites
+    et les traits d'union de fin de ligne ne sont retirés qu'à l'extraction
+    (OCR) : un texte saisi garde ses mots composés ("porte-monnaie")"""
+    logger.debug("Nettoyage du texte original: %s...", preview(text, 100), extra=PAYLOAD)
+    cleaned = normalize_text(text, flatten=True, drop_junk=False, join_hyphens=False)
+    logger.debug("Texte nettoyé: %s...", preview(cleaned, 100), extra=PAYLOAD)
     return cleaned
 
+NUMBER_PATTERN = re.compile(r'\b\d+\b')
+
 def extract_budgets(budget_str: str) -> Dict[str, Optional[int]]:
     if not budget_str:
         return {"min": None, "max": None}
     
     # Extraction améliorée des nombres (ignore €, k, etc.)
-    numbers = [int(num) for num in re.findall(r'\b\d+\b', str(budget_str))]
+    numbers = [int(num) for num in NUMBER_PATTERN.findall(str(budget_str))]
     
     if len(numbers) >= 2:
         return {"min": min(numbers), "max": max(numbers)}
@@ -25,15 +35,42 @@ def extract_budgets(budget_str: str) -> Dict[str, Optional[int]]:
         return {"min": numbers[0], "max": numbers[0]}
     return {"min": None, "max": None}
 
+# Bornes de la recherche du JSON dans une réponse : caractères parcourus
+# pour trouver une accolade ouvrante, et accolades essayées
+JSON_SCAN_LIMIT = 200_000
+JSON_MAX_ATTEMPTS = 8
+
+_decoder = json.JSONDecoder()
+
+def first_json_object(text: str) -> Optional[dict]:
+    """Premier objet JSON complet du texte (texte ou balises ``` autour).
+
+    Le décodage part de chaque "{" et s'arrête à l'accolade qui l'équilibre :
+    la suite de la réponse n'est jamais parcourue. Une accolade qui n'ouvre
+    pas un objet valide ("{nom}" dans une phrase) passe à la suivante, dans
+    la limite de JSON_MAX_ATTEMPTS essais et des JSON_SCAN_LIMIT premiers
+    caractères.
+    """
+    start = text.find("{", 0, JSON_SCAN_LIMIT)
+    for _ in range(JSON_MAX_ATTEMPTS):
+        if start < 0:
+            break
+        try:
+            value, _end = _decoder.raw_decode(text, start)
+            if isinstance(value, dict):
+                return value
+        except json.JSONDecodeError:
+            pass
+        start = text.find("{", start + 1, JSON_SCAN_LIMIT)
+    return None
+
+@stage("parse_response")
 def parse_cohere_response(response_text: str) -> dict:
     try:
-        logger.debug(f"Parsing de la réponse: {response_text[:200]}...")
-        # Extraction plus robuste du JSON
-        json_str = re.search(r'\{.*\}', response_text, re.DOTALL)
-        if not json_str:
+        logger.debug("Parsing de la réponse: %s...", preview(response_text, 200), extra=PAYLOAD)
+        data = first_json_object(response_text)
+        if data is None:
             raise ValueError("No JSON found in response")
-            
-        data = json.loads(json_str.group(0))
         
         # Normalisation des nombres
         if 'fee' in data:
@@ -44,11 +81,224 @@ def parse_cohere_response(response_text: str) -> dict:
         
         # Nettoyage des chaînes de caractères
         for field in ['firstName', 'lastName', 'preferredSubjects', 'skills']:
-            if field in data and data[field]:
+            if isinstance(data.get(field), str):
                 data[field] = data[field].strip().replace('"', '')
         
-        logger.info(f"Parsing réussi: {json.dumps(data, indent=2)}")
+        logger.info("Parsing réussi (%s champs)", len(data))
+        logger.debug("Profil analysé: %s", lazy(json.dumps, data, ensure_ascii=False), extra=PAYLOAD)
         return data
     except Exception as e:
-        logger.error(f"Erreur de parsing: {str(e)} - Réponse originale: {response_text[:500]}", exc_info=True)
-        return {}
\ No newline at end of file
+        logger.error("Erreur de parsing: %s - Réponse originale: %s", e, response_text[:500], exc_info=True)
+        return {}
+
+def text_spans(text: str, max_chars: int, overlap_chars: int = 0) -> List[Tuple[int, int]]:
+    """Bornes (début, fin) des fenêtres de `split_text`, dans l'ordre du texte"""
+    if len(text) <= max_chars:
+        return [(0, len(text))]
+
+    spans = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        if end < len(text):
+            window = text[start:end]
+            cut = max(window.rfind(". "), window.rfind("! "), window.rfind("? "))
+            if cut < max_chars // 2:
+                cut = window.rfind(" ")
+            if cut > 0:
+                end = start + cut + 1
+        spans.append((start, end))
+        if end >= len(text):
+            break
+        # Reprise sur une frontière de mot, et toujours en avançant
+        next_start = text.rfind(" ", start + 1, max(end - overlap_chars, start + 1)) + 1
+        start = next_start if next_start > start else end
+    return spans
+
+def split_text(text: str, max_chars: int, overlap_chars: int = 0) -> List[str]:
+    """Découpe un texte nettoyé en fenêtres d'au plus `max_chars` caractères.
+
+    Les coupures tombent en fin de phrase si possible, sinon entre deux mots ;
+    chaque fenêtre reprend les `overlap_chars` derniers caractères de la
+    précédente pour ne pas couper une information en deux.
+    """
+    chunks = (text[start:end].strip() for start, end in text_spans(text, max_chars, overlap_chars))
+    return [chunk for chunk in chunks if chunk]
+
+# Fusion des profils partiels : premier non nul, union des listes, bornes des budgets
+FIRST_VALUE_FIELDS = ("firstName", "lastName", "telephone", "email", "desiredFocus")
+LIST_FIELDS = {"preferredSubjects": ",", "skills": ",", "previousExperience": ";"}
+
+def _union(values: List[str], delimiter: str) -> Optional[str]:
+    """Union sans doublons (casse ignorée) d'éléments séparés par `delimiter`"""
+    items, seen = [], set()
+    for value in values:
+        for item in value.split(delimiter):
+            item = item.strip()
+            if item and item.lower() not in seen:
+                seen.add(item.lower())
+                items.append(item)
+    return f"{delimiter} ".join(items) or None
+
+def merge_profiles(profiles: List[dict]) -> dict:
+    """Fusion déterministe (ordre des fragments) de profils partiels"""
+    merged: dict = {}
+    for field in FIRST_VALUE_FIELDS:
+        merged[field] = next((p[field] for p in profiles if p.get(field)), None)
+    for field, delimiter in LIST_FIELDS.items():
+        merged[field] = _union([p[field] for p in profiles if p.get(field)], delimiter)
+
+    merged["address"] = {
+        key: next((p["address"][key] for p in profiles if (p.get("address") or {}).get(key)), None)
+        for key in ("city", "region", "country")
+    }
+    merged["fee"] = {}
+    for kind in ("formation", "logement"):
+        ranges = [(p.get("fee") or {}).get(kind) or {} for p in profiles]
+        minimums = [r["min"] for r in ranges if r.get("min") is not None]
+        maximums = [r["max"] for r in ranges if r.get("max") is not None]
+        merged["fee"][kind] = {
+            "min": min(minimums) if minimums else None,
+            "max": max(maximums) if maximums else None
+        }
+    return merged
+
+# --- Extraction locale par règles ---------------------------------------------
+# Champs sûrs (motifs précompilés, gazetteer) remplis sans appel à Cohere
+
+# À incrémenter quand les règles changent : invalide les profils mémorisés
+RULES_VERSION = 2
+
+EMAIL_PATTERN = re.compile(r'\b[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-zA-Z]{2,}\b')
+PHONE_PATTERN = re.compile(
+    r'(?<![\d+])(?:(?:\+|00)33[\s.\-]?(?:\(0\)[\s.\-]?)?|0)[1-9](?:[\s.\-]?\d{2}){4}(?!\d)'
+    r'|(?<![\d+])\+\d{2,3}(?:[\s.\-]?\d{2,4}){3,5}(?!\d)'
+)
+# "+33 (0)6..." : le 0 entre parenthèses n'est pas composé depuis l'étranger
+PHONE_TRUNK = re.compile(r'\s*\(0\)\s*')
+PHONE_SEPARATORS = re.compile(r'[.\s]+')
+NAME_WORD = r"[A-ZÀ-Ý][a-zà-ÿ]+(?:-[A-ZÀ-Ý][a-zà-ÿ]+)?"
+FULL_NAME_PATTERN = re.compile(rf"\b(?:[Jj]e m'appelle|[Jj]e me nomme|[Mm]on nom est)\s+({NAME_WORD})\s+({NAME_WORD}|[A-ZÀ-Ý]{{2,}})\b")
+FIRST_NAME_PATTERN = re.compile(rf"\bPr[ée]nom\s*:\s*({NAME_WORD})\b")
+LAST_NAME_PATTERN = re.compile(rf"\bNom(?: de famille)?\s*:\s*({NAME_WORD}|[A-ZÀ-Ý]{{2,}})\b")
+
+# Montants : "3 000 €", "1,5 k€", "entre 400 et 600 euros", "500-700€"
+_AMOUNT = r'\d{1,3}(?:[\s\u202f.]\d{3})+|\d+(?:,\d+)?'
+_CURRENCY = r'\s*(?:k\s*)?(?:€|euros?\b|eur\b)'
+FEE_PATTERN = re.compile(
+    rf'(?:(?P<low>{_AMOUNT})(?P<low_k>\s*k)?(?:{_CURRENCY})?\s*(?:-|–|à|et)\s*)?(?P<high>{_AMOUNT})(?P<high_k>\s*k)?(?={_CURRENCY})',
+    re.IGNORECASE
+)
+FEE_KEYWORDS = {
+    "formation": re.compile(r"formation|scolarit|frais d'inscription|inscription|[ée]tudes|[ée]cole|cursus", re.IGNORECASE),
+    "logement": re.compile(r"logement|loyer|h[ée]bergement|appartement|studio|colocation|chambre", re.IGNORECASE),
+}
+FEE_UPPER = re.compile(r"(?:jusqu'[àa]|maximum|max\.?|au plus|moins de|ne pas d[ée]passer)\s*$", re.IGNORECASE)
+FEE_LOWER = re.compile(r"(?:au moins|minimum|min\.?|à partir de|plus de)\s*$", re.IGNORECASE)
+# Fin de proposition : ponctuation (hors séparateur décimal ou de milliers) ou saut de ligne
+CLAUSE_SPLIT = re.compile(r'[.;!?,](?!\d)|\n')
+# Indices d'adresse : la ville qui suit est celle du domicile
+ADDRESS_CUE = re.compile(
+    r"(?:habite|r[ée]side|domicile|domicili[ée]e?|adresse|vis|\d{5})\s*(?:à|au|en|:)?\s*$", re.IGNORECASE
+)
+
+def _amount(value: str, thousands: Optional[str]) -> int:
+    number = float(re.sub(r'[\s\u202f.]', '', value).replace(',', '.'))
+    return int(round(number * 1000)) if thousands else int(number)
+
+def _fees(text: str) -> Dict[str, Dict[str, Optional[int]]]:
+    """Budgets formation / logement : montant en euros rattaché au mot-clé qui
+    le précède dans la même proposition, depuis le montant précédent. Sans
+    mot-clé, avec les deux, ou avec deux montants différents pour le même
+    budget, le budget est laissé au modèle"""
+    fees: Dict[str, Dict[str, Optional[int]]] = {}
+    conflicts: Set[str] = set()
+    for clause in CLAUSE_SPLIT.split(text):
+        previous = 0
+        for match in FEE_PATTERN.finditer(clause):
+            before = clause[previous:match.start()]
+            previous = match.end()
+            kinds = [kind for kind, keyword in FEE_KEYWORDS.items() if keyword.search(before)]
+            if len(kinds) != 1:
+                continue
+            kind = kinds[0]
+            high = _amount(match.group("high"), match.group("high_k"))
+            if match.group("low"):
+                low = _amount(match.group("low"), match.group("low_k") or match.group("high_k"))
+                budget = extract_budgets(f"{low} {high}")
+            elif FEE_UPPER.search(before):
+                budget = {"min": None, "max": high}
+            elif FEE_LOWER.search(before):
+                budget = {"min": high, "max": None}
+            else:
+                budget = extract_budgets(str(high))
+            if fees.setdefault(kind, budget) != budget:
+                conflicts.add(kind)
+    return {kind: budget for kind, budget in fees.items() if kind not in conflicts}
+
+def _address(text: str) -> Tuple[Dict[str, Optional[str]], bool]:
+    """Ville (avec région et pays) si elle est désignée sans ambiguïté : ville
+    précédée d'un indice d'adresse, sinon seule ville citée ; à défaut, la
+    seule région ou le seul pays cité. Le booléen indique une adresse
+    explicite (indice d'adresse ou de domicile) : une ville seulement citée
+    peut être celle d'une école ou d'un employeur"""
+    places = find_places(text)
+    cities = {place for _, place in places if place[0] == "city"}
+    cued = {place for start, place in places
+            if place[0] == "city" and ADDRESS_CUE.search(text[max(0, start - 30):start])}
+    for candidates, explicit in ((cued, True), (cities, False)):
+        if len(candidates) == 1:
+            _, city, region, country = next(iter(candidates))
+            return {"city": city, "region": region, "country": country}, explicit
+        if len(candidates) > 1:
+            return {}, False
+    regions = {place for _, place in places if place[0] == "region"}
+    if len(regions) == 1:
+        _, _, region, country = next(iter(regions))
+        return {"region": region, "country": country}, False
+    countries = {place[3] for _, place in places}
+    if len(countries) == 1:
+        return {"country": next(iter(countries))}, False
+    return {}, False
+
+@stage("rules")
+def extract_rule_fields(text: str) -> Tuple[dict, Set[str]]:
+    """Pré-extraction locale sur le texte nettoyé.
+
+    Renvoie un profil partiel (même forme que `OrientationProfile`) et
+    l'ensemble des champs trouvés, en notation pointée ("fee.formation",
+    "address.city"). Seules les valeurs sans ambiguïté sont retenues ; une
+    adresse sans indice de domicile est renvoyée mais pas comptée comme
+    trouvée (le modèle est interrogé et l'emporte, voir `_with_rules`).
+    """
+    data: dict = {}
+    email = EMAIL_PATTERN.search(text)
+    if email:
+        data["email"] = email.group(0)
+    phone = PHONE_PATTERN.search(text)
+    if phone:
+        telephone = PHONE_SEPARATORS.sub(' ', PHONE_TRUNK.sub(' ', phone.group(0))).strip()
+        # Retenu seulement s'il passe la validation du profil
+        if OrientationProfile(telephone=telephone).telephone:
+            data["telephone"] = telephone
+
+    full_name = FULL_NAME_PATTERN.search(text)
+    first_name = FIRST_NAME_PATTERN.search(text)
+    last_name = LAST_NAME_PATTERN.search(text)
+    if first_name or full_name:
+        data["firstName"] = (first_name or full_name).group(1)
+    if last_name or full_name:
+        data["lastName"] = last_name.group(1) if last_name else full_name.group(2)
+
+    fees = _fees(text)
+    if fees:
+        data["fee"] = fees
+    address, explicit = _address(text)
+    if address:
+        data["address"] = address
+
+    found = {field for field in data if field not in ("fee", "address")}
+    found |= {f"fee.{kind}" for kind in fees}
+    if explicit:
+        found |= {f"address.{key}" for key, value in address.items() if value}
+    return data, found
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import zipfile
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+from fastapi import HTTPException, UploadFile
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+class StoredUpload(NamedTuple):
+    """Fichier reçu, recopié sur disque sans passer entièrement en mémoire"""
+    path: str
+    size: int
+    digest: str  # SHA-256 du contenu
+    filename: Optional[str]
+    content_type: str
+
+def _max_size_error(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"Taille max dépassée ({max_size//(1024*1024)}MB)"
+    )
+
+async def spool_upload(file: UploadFile, max_size: int, directory: Optional[str] = None) -> StoredUpload:
+    """Recopie l'upload par blocs dans un fichier temporaire.
+
+    La taille est vérifiée au fil de l'eau (rejet dès le dépassement) et
+    l'empreinte SHA-256 calculée au passage, ce qui évite une relecture pour
+    le cache. L'appelant est responsable de la suppression du fichier.
+    """
+    if file.size is not None and file.size > max_size:
+        raise _max_size_error(max_size)
+
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    tmp = tempfile.NamedTemporaryFile(dir=directory or None, prefix="upload-", delete=False)
+    try:
+        with tmp:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise _max_size_error(max_size)
+                digest.update(chunk)
+                tmp.write(chunk)
+    except BaseException:
+        remove_upload(tmp.name)
+        raise
+    return StoredUpload(tmp.name, size, digest.hexdigest(), file.filename, file.content_type)
+
+def remove_upload(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def _digest_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+async def file_digest(path: str) -> str:
+    """SHA-256 d'un fichier sur disque, calculé hors de la boucle d'événements"""
+    return await asyncio.to_thread(_digest_file, path)
+
+def _unpack_entry(archive: zipfile.ZipFile, info: zipfile.ZipInfo, content_type: str,
+                  max_size: int, directory: Optional[str]) -> StoredUpload:
+    # Taille vérifiée sur les octets décompressés : l'en-tête du zip peut mentir
+    digest = hashlib.sha256()
+    size = 0
+    tmp = tempfile.NamedTemporaryFile(dir=directory or None, prefix="upload-", delete=False)
+    try:
+        with tmp, archive.open(info) as entry:
+            for chunk in iter(lambda: entry.read(CHUNK_SIZE), b""):
+                size += len(chunk)
+                if size > max_size:
+                    raise _max_size_error(max_size)
+                digest.update(chunk)
+                tmp.write(chunk)
+    except BaseException:
+        remove_upload(tmp.name)
+        raise
+    return StoredUpload(tmp.name, size, digest.hexdigest(), info.filename, content_type)
+
+def unpack_zip(path: str, types: Dict[str, str], max_size: int, max_items: int,
+               max_total: int, directory: Optional[str] = None) -> List[Tuple[str, Union[StoredUpload, HTTPException]]]:
+    """Recopie sur disque chaque fichier d'une archive zip (appel bloquant).
+
+    `types` associe une extension à son type MIME ; une entrée de type non
+    supporté, trop grosse ou illisible donne une HTTPException à sa place
+    dans la liste, sans faire échouer les autres ; une fois `max_total`
+    octets décompressés, les entrées suivantes sont refusées. L'appelant
+    supprime les fichiers produits.
+    """
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Archive zip invalide")
+
+    entries: List[Tuple[str, Union[StoredUpload, HTTPException]]] = []
+    total = 0
+    try:
+        with archive:
+            infos = [
+                info for info in archive.infolist()
+                if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+            ]
+            if len(infos) > max_items:
+                raise HTTPException(status_code=400, detail=f"Trop de fichiers dans l'archive (max {max_items})")
+            for info in infos:
+                extension = os.path.splitext(info.filename)[1].lower().lstrip(".")
+                if extension not in types:
+                    entries.append((info.filename, HTTPException(
+                        status_code=400, detail=f"Type non supporté. Formats: {list(types.keys())}"
+                    )))
+                    continue
+                if total >= max_total:
+                    entries.append((info.filename, HTTPException(
+                        status_code=413, detail=f"Archive trop volumineuse ({max_total//(1024*1024)}MB décompressés)"
+                    )))
+                    continue
+                try:
+                    upload = _unpack_entry(archive, info, types[extension], min(max_size, max_total - total), directory)
+                    total += upload.size
+                    entries.append((info.filename, upload))
+                except HTTPException as e:
+                    entries.append((info.filename, e))
+                except (zipfile.BadZipFile, RuntimeError, OSError) as e:  # chiffrée, corrompue...
+                    logger.warning("Entrée illisible dans l'archive %s: %s", info.filename, e)
+                    entries.append((info.filename, HTTPException(status_code=400, detail="Entrée d'archive illisible")))
+    except BaseException:
+        for _, entry in entries:
+            if isinstance(entry, StoredUpload):
+                remove_upload(entry.path)
+        raise
+    return entries
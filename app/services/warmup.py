@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+from fastapi import HTTPException
+from app.services.extraction_service import start_workers
+from app.services.worker_pool import pool
+
+logger = logging.getLogger(__name__)
+
+class WarmUp:
+    """Préchauffage en arrière-plan, lancé une fois le serveur en écoute.
+
+    Importe la pile d'extraction (cv2, fitz, numpy, PIL, pytesseract), démarre
+    le pool OCR puis fait tourner un OCR minimal dans chaque worker. Tant que
+    ce n'est pas terminé, ou pendant le redémarrage du pool après la perte
+    d'un worker, `/health/ready` répond 503 et les extractions synchrones
+    sont refusées avec Retry-After.
+    """
+
+    RETRY_AFTER = 5  # Secondes
+
+    def __init__(self):
+        self.ready = False
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+        self.workers: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, on_ready: Optional[Callable[[], None]] = None) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run(on_ready))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, on_ready: Optional[Callable[[], None]]) -> None:
+        start = time.perf_counter()
+        try:
+            # Imports lourds et création du pool hors de la boucle d'événements
+            await asyncio.to_thread(start_workers)
+            from app.services.file_processing import TextExtractor
+            # Un job par worker : chacun démarre, importe et charge Tesseract
+            self.workers = await asyncio.gather(*(
+                pool.submit(("warm-up", i), TextExtractor.warm_up) for i in range(pool.max_workers)
+            ))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {str(e)}"
+            logger.critical("Échec du préchauffage (Tesseract OCR installé ?) : %s", self.error)
+            return
+
+        self.seconds = round(time.perf_counter() - start, 2)
+        self.ready = True
+        logger.info(
+            "API prête en %ss (%s workers, Tesseract %s)",
+            self.seconds, len(self.workers), self.workers[0]['tesseract'] if self.workers else '?'
+        )
+        if on_ready is not None:
+            on_ready()
+
+    @property
+    def available(self) -> bool:
+        """Préchauffage terminé et pool OCR en état de marche"""
+        return self.ready and not pool.rebuilding
+
+    def status(self) -> Dict[str, Any]:
+        if self.ready:
+            status = "recovering" if pool.rebuilding else "ready"
+        else:
+            status = "failed" if self.error else "starting"
+        return {
+            "status": status,
+            "warm_up_seconds": self.seconds,
+            "error": self.error,
+            "ocr_workers": len({worker["pid"] for worker in self.workers}),
+            "tesseract": self.workers[0]["tesseract"] if self.workers else None
+        }
+
+warmup = WarmUp()
+
+def require_ready() -> None:
+    """Dépendance FastAPI : 503 + Retry-After tant que le pool OCR n'est pas prêt"""
+    if not warmup.available:
+        if warmup.ready:
+            detail = "Pool OCR en cours de redémarrage"
+        else:
+            detail = "Service en cours de démarrage" if not warmup.error else "Service OCR indisponible"
+        raise HTTPException(
+            status_code=503,
+            detail=detail,
+            headers={"Retry-After": str(WarmUp.RETRY_AFTER)}
+        )
@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import pickle
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Hashable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from app.services.logging_pipeline import request_id, setup_worker_logging, worker_logging
+from app.services.metrics import Counter, Gauge, collect_stages, observe_stage, record_stages
+
+logger = logging.getLogger(__name__)
+
+POOL_RESTARTS = Counter("ocr_pool_restarts_total", "Redémarrages du pool OCR après la perte d'un worker")
+
+class WorkerError(Exception):
+    """Erreur HTTP levée dans un worker, transportable entre processus"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def _init_worker(logging_args: Optional[Tuple], initializer: Optional[Callable], initargs: Tuple) -> None:
+    """Initializer des workers : journaux renvoyés au processus principal,
+    puis initializer fourni à `start`"""
+    if logging_args is not None:
+        setup_worker_logging(*logging_args)
+    if initializer is not None:
+        initializer(*initargs)
+
+def _run_job(fn: Callable, args: Tuple, rid: str) -> Tuple[Any, List[Tuple[str, float]]]:
+    """Exécuté dans le worker : convertit les HTTPException en erreur picklable
+    et renvoie, avec le résultat, les étapes chronométrées pendant le job.
+    Les journaux du job portent l'identifiant de la requête d'origine"""
+    request_id.set(rid)
+    try:
+        with collect_stages() as observations:
+            result = fn(*args)
+        return result, observations
+    except HTTPException as e:
+        raise WorkerError(e.status_code, str(e.detail))
+    except Exception as e:
+        # Une exception qui ne se reconstruit pas côté parent (ex. TesseractNotFoundError)
+        # casserait tout le pool : on la remplace par une erreur simple
+        try:
+            pickle.loads(pickle.dumps(e))
+        except Exception:
+            raise RuntimeError(f"{type(e).__name__}: {str(e)}") from None
+        raise
+
+# fonction, arguments, future, [mise en file, démarrage], identifiant de requête
+_Job = Tuple[Callable, Tuple, asyncio.Future, List[float], str]
+
+class WorkerPool:
+    """Pool de processus partagé par toute l'application.
+
+    Les jobs sont rangés dans une file par "lane" (une requête, un client...)
+    et distribués en round-robin : un document de 40 pages n'affame pas
+    l'upload d'une seule image arrivé juste après. Au plus `max_workers` jobs
+    sont confiés à l'executor à la fois, les autres restent annulables.
+
+    Si un worker meurt (segfault, OOM kill), l'executor est inutilisable : les
+    jobs en cours échouent avec BrokenProcessPool, un nouvel executor est créé
+    avec le même initializer et les jobs en file attendent qu'il soit prêt
+    (`rebuilding` est vrai pendant ce temps).
+    """
+
+    RESTART_DELAY = 1.0  # Secondes, doublé à chaque échec du redémarrage, plafonné à 30
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lanes: "OrderedDict[Hashable, Deque[_Job]]" = OrderedDict()
+        self._running = 0
+        self._initializer: Optional[Callable] = None
+        self._initargs: Tuple = ()
+        self._restart: Optional[asyncio.Task] = None
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    @property
+    def rebuilding(self) -> bool:
+        return self._restart is not None
+
+    @property
+    def queued(self) -> int:
+        return sum(len(jobs) for jobs in self._lanes.values())
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def start(
+        self,
+        max_workers: Optional[int] = None,
+        initializer: Optional[Callable] = None,
+        initargs: Tuple = ()
+    ) -> None:
+        if self._executor is None:
+            if max_workers:
+                self.max_workers = max_workers
+            self._initializer, self._initargs = initializer, initargs
+            self._executor = self._new_executor()
+            logger.info("Pool OCR démarré avec %s workers", self.max_workers)
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(worker_logging(), self._initializer, self._initargs)
+        )
+
+    def shutdown(self) -> None:
+        for jobs in self._lanes.values():
+            for _, _, future, _, _ in jobs:
+                future.cancel()
+        self._lanes.clear()
+        if self._restart is not None:
+            self._restart.cancel()
+            self._restart = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info("Pool OCR arrêté")
+
+    async def submit(self, lane: Hashable, fn: Callable, *args) -> Any:
+        """Planifie `fn(*args)` dans un worker et attend son résultat.
+
+        Annuler l'attente retire le job de la file s'il n'a pas encore démarré.
+        L'attente en file et les étapes mesurées dans le worker sont
+        enregistrées dans les métriques de ce processus (et de la requête).
+        """
+        if self._executor is None:
+            raise RuntimeError("Le pool OCR n'est pas démarré")
+
+        future = asyncio.get_running_loop().create_future()
+        timing = [time.perf_counter(), 0.0]
+        self._lanes.setdefault(lane, deque()).append((fn, args, future, timing, request_id.get()))
+        self._dispatch()
+        try:
+            result, observations = await future
+        except WorkerError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        observe_stage("queue_wait", timing[1] - timing[0])
+        record_stages(observations)
+        return result
+
+    def _next_job(self) -> Optional[_Job]:
+        while self._lanes:
+            lane, jobs = self._lanes.popitem(last=False)
+            job = jobs.popleft()
+            if jobs:
+                # La lane repasse en fin de tour
+                self._lanes[lane] = jobs
+            if not job[2].cancelled():
+                return job
+        return None
+
+    def _dispatch(self) -> None:
+        if self._executor is None or self._restart is not None:
+            return
+        loop = asyncio.get_running_loop()
+        while self._running < self.max_workers:
+            job = self._next_job()
+            if job is None:
+                return
+            fn, args, future, timing, rid = job
+            timing[1] = time.perf_counter()
+            self._running += 1
+            try:
+                inner = loop.run_in_executor(self._executor, _run_job, fn, args, rid)
+            except (BrokenProcessPool, RuntimeError) as e:
+                self._running -= 1
+                if not future.done():
+                    future.set_exception(e)
+                self._rebuild()
+                return
+            inner.add_done_callback(
+                lambda done, target=future: self._on_done(done, target)
+            )
+
+    def _on_done(self, done: asyncio.Future, target: asyncio.Future) -> None:
+        self._running -= 1
+        if not target.done():
+            if done.cancelled():
+                target.cancel()
+            elif done.exception() is not None:
+                target.set_exception(done.exception())
+            else:
+                target.set_result(done.result())
+        if not done.cancelled() and isinstance(done.exception(), BrokenProcessPool):
+            self._rebuild()
+        self._dispatch()
+
+    def _rebuild(self) -> None:
+        """Remplace l'executor cassé ; les jobs en file attendent la fin du redémarrage"""
+        if self._executor is None or self._restart is not None:
+            return
+        logger.error("Worker OCR perdu, redémarrage du pool (%s jobs en file)", self.queued)
+        POOL_RESTARTS.inc()
+        self._restart = asyncio.get_running_loop().create_task(self._restart_executor(self._executor))
+
+    async def _restart_executor(self, broken: ProcessPoolExecutor) -> None:
+        broken.shutdown(wait=False, cancel_futures=True)
+        loop = asyncio.get_running_loop()
+        delay = self.RESTART_DELAY
+        while True:
+            executor = self._new_executor()
+            try:
+                # Un appel par worker : les processus démarrent et passent l'initializer
+                await asyncio.gather(*(
+                    loop.run_in_executor(executor, os.getpid) for _ in range(self.max_workers)
+                ))
+                break
+            except (BrokenProcessPool, RuntimeError) as e:
+                executor.shutdown(wait=False, cancel_futures=True)
+                logger.critical("Redémarrage du pool OCR impossible, nouvel essai dans %ss: %s", delay, e)
+                await asyncio.sleep(delay)
+                delay = min(2 * delay, 30.0)
+            except asyncio.CancelledError:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+        self._executor = executor
+        self._restart = None
+        logger.info("Pool OCR redémarré avec %s workers", self.max_workers)
+        self._dispatch()
+
+pool = WorkerPool()
+
+Gauge("ocr_pool_queued_jobs", "Jobs en attente dans les files du pool OCR", callback=lambda: pool.queued)
+Gauge("ocr_pool_running_jobs", "Jobs confiés aux workers OCR", callback=lambda: pool.running)
+Gauge("ocr_pool_workers", "Processus du pool OCR", callback=lambda: pool.max_workers if pool.started else 0)
@@ -0,0 +1,113 @@
+"""Débit des endpoints de lot face à une boucle côté client.
+
+Sur un serveur uvicorn (caches désactivés, Cohere remplacé par le stub
+local), mesure le temps pour traiter les mêmes éléments :
+
+- un appel `/extract-text` par fichier, puis un seul `/extract-text/batch` ;
+- un appel `/process-text` par texte, puis un seul `/process-text/batch`.
+
+    python -m benchmarks.bench_batch --items 40 --latency 0.5
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import build_corpus
+from benchmarks.suite import Server, _free_port
+
+def _files(corpus, items: int):
+    files = []
+    for entry in itertools.islice(itertools.cycle(corpus), items):
+        with open(entry["path"], "rb") as f:
+            files.append((entry["name"], f.read(), entry["content_type"]))
+    return files
+
+def _texts(corpus, items: int):
+    # Textes uniques : ni cache ni requêtes en vol fusionnées
+    return [
+        entry["text"][:6000] + f"\nRéférence dossier {index}"
+        for index, entry in zip(range(items), itertools.cycle(corpus))
+    ]
+
+def _batch_lines(response) -> list:
+    lines = [json.loads(line) for line in response.iter_lines() if line]
+    return [line for line in lines if line["event"] == "item"]
+
+def measure(client, files, texts) -> dict:
+    results = {}
+
+    start = time.perf_counter()
+    failed = sum(
+        client.post("/api/text-extraction/extract-text", files={"file": file}).status_code != 200
+        for file in files
+    )
+    results["extract:loop"] = {"seconds": time.perf_counter() - start, "failed": failed}
+
+    start = time.perf_counter()
+    with client.stream("POST", "/api/text-extraction/extract-text/batch",
+                       files=[("files", file) for file in files]) as response:
+        lines = _batch_lines(response)
+    results["extract:batch"] = {
+        "seconds": time.perf_counter() - start,
+        "failed": sum(line["status"] != "success" for line in lines)
+    }
+
+    start = time.perf_counter()
+    failed = sum(
+        client.post("/api/orientation/process-text", json={"text": text}).status_code != 200
+        for text in texts
+    )
+    results["profile:loop"] = {"seconds": time.perf_counter() - start, "failed": failed}
+
+    start = time.perf_counter()
+    # Mêmes textes, suffixe différent : pas de hit sur les profils de la boucle
+    with client.stream("POST", "/api/orientation/process-text/batch",
+                       json={"texts": [text + " (lot)" for text in texts]}) as response:
+        lines = _batch_lines(response)
+    results["profile:batch"] = {
+        "seconds": time.perf_counter() - start,
+        "failed": sum(line["status"] != "success" for line in lines)
+    }
+
+    for name, count in (("extract", len(files)), ("profile", len(texts))):
+        for mode in ("loop", "batch"):
+            entry = results[f"{name}:{mode}"]
+            entry["items_per_s"] = round(count / entry["seconds"], 2)
+            entry["seconds"] = round(entry["seconds"], 2)
+        results[f"{name}:speedup"] = round(results[f"{name}:loop"]["seconds"] / results[f"{name}:batch"]["seconds"], 2)
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.5, help="secondes par génération du stub Cohere")
+    args = parser.parse_args()
+
+    import httpx
+    from benchmarks.cohere_stub import serve
+
+    stub = serve(port=_free_port(), latency=args.latency)
+    host, port = stub.server_address[:2]
+    with tempfile.TemporaryDirectory() as workdir:
+        corpus = build_corpus(os.path.join(workdir, "corpus"))
+        # DOCX volumineux exclu : il dominerait les deux variantes de la même façon
+        corpus = [entry for entry in corpus if entry["name"] != "docx-large-0.docx"]
+        server = Server(f"http://{host}:{port}", workdir)
+        try:
+            server.wait_ready()
+            with httpx.Client(base_url=server.url, timeout=600) as client:
+                results = measure(client, _files(corpus, args.items), _texts(corpus, args.items))
+        finally:
+            server.stop()
+            stub.shutdown()
+    print(json.dumps(results, indent=2))
+    if any(entry["failed"] for entry in results.values() if isinstance(entry, dict)):
+        print("Des éléments ont échoué", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark de l'extraction DOCX : python-docx contre la lecture XML en flux.
+
+Génère un DOCX volumineux (paragraphes, tableaux, en-tête et pied de page,
+zone de texte) puis mesure dans un processus séparé par variante le temps
+d'extraction, le pic de mémoire résidente (VmHWM) et la quantité de texte
+récupérée :
+
+    python -m benchmarks.bench_docx --paragraphs 20000 --tables 500
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from benchmarks.memory import peak_rss_kb
+
+TEXT_BOX = (
+    '<w:p xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    '<w:r><w:pict><v:shape xmlns:v="urn:schemas-microsoft-com:vml"><v:textbox>'
+    '<w:txbxContent><w:p><w:r><w:t>Contact : jean.dupont@example.com</w:t></w:r></w:p>'
+    '</w:txbxContent></v:textbox></v:shape></w:pict></w:r></w:p>'
+)
+
+def make_docx(path: str, paragraphs: int, tables: int) -> None:
+    """DOCX de type CV répété : texte courant, tableaux, en-tête, pied de page"""
+    from docx import Document
+    from docx.oxml import parse_xml
+
+    doc = Document()
+    section = doc.sections[0]
+    section.header.paragraphs[0].text = "Jean Dupont - 06 12 34 56 78"
+    section.footer.paragraphs[0].text = "Page de pied - Lyon, France"
+    doc.element.body.insert(0, parse_xml(TEXT_BOX))
+
+    per_table = max(1, paragraphs // max(tables, 1))
+    for i in range(paragraphs):
+        doc.add_paragraph(f"Paragraphe {i} : expérience en développement, gestion de projet et analyse.")
+        if tables and i % per_table == 0 and i // per_table < tables:
+            table = doc.add_table(rows=3, cols=3)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = f"Cellule {i}-{r}-{c}"
+    doc.save(path)
+
+def python_docx(path: str) -> str:
+    """Chemin d'origine : modèle objet complet, paragraphes du corps uniquement"""
+    from docx import Document
+
+    doc = Document(path)
+    return "\n".join(p.text for p in doc.paragraphs if p.text.strip())
+
+def streaming(path: str) -> str:
+    from app.services.docx_reader import read_docx
+
+    return read_docx(path)[0]
+
+VARIANTS = {"python-docx": python_docx, "streaming": streaming}
+
+def run_variant(name: str, path: str, repeat: int) -> dict:
+    extract = VARIANTS[name]
+    if name == "streaming":
+        import app.services.docx_reader  # noqa: F401 (import hors mesure)
+    else:
+        import docx  # noqa: F401
+
+    baseline = peak_rss_kb()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = extract(path)
+        timings.append(time.perf_counter() - start)
+    peak = peak_rss_kb()
+
+    return {
+        "variant": name,
+        "best_ms": round(1000 * min(timings), 1),
+        "mean_ms": round(1000 * sum(timings) / len(timings), 1),
+        "peak_rss_delta_mb": round((peak - baseline) / 1024, 1),
+        "chars": len(text),
+        "has_header": "06 12 34 56 78" in text,
+        "has_table": "Cellule 0-0-0" in text,
+        "has_text_box": "jean.dupont@example.com" in text
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=20000)
+    parser.add_argument("--tables", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--docx", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.docx, args.repeat)))
+        return
+
+    import os
+    import tempfile
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.docx")
+        make_docx(path, args.paragraphs, args.tables)
+        print(json.dumps({"docx_mb": round(os.path.getsize(path) / 1e6, 2)}))
+        for name in VARIANTS:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_docx", "--variant", name,
+                 "--docx", path, "--repeat", str(args.repeat)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            print(output.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    main()
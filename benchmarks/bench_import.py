@@ -0,0 +1,112 @@
+"""Coût de démarrage de l'API : import de `main`, puis délai avant /health/live
+et /health/ready sur un vrai serveur uvicorn.
+
+Chaque import est mesuré dans un interpréteur neuf (médiane de --repeat
+passages), avec les modules les plus coûteux d'après `python -X importtime`.
+Le script échoue (code 1) si une dépendance lourde de l'extraction est
+importée par `main` au lieu d'être chargée par le préchauffage :
+
+    python -m benchmarks.bench_import --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.suite import REPO, Server
+
+# Chargées en arrière-plan par le préchauffage, jamais à l'import de `main`
+HEAVY_MODULES = ("cv2", "fitz", "numpy", "PIL", "pytesseract", "docx")
+
+PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import main\n"
+    "elapsed = time.perf_counter() - start\n"
+    "import json\n"
+    f"print(json.dumps({{'seconds': elapsed, 'heavy': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))\n"
+)
+
+def _env() -> dict:
+    return {**os.environ, "PYTHONPATH": REPO, "COHERE_API_KEY": os.environ.get("COHERE_API_KEY", "bench")}
+
+def import_time(repeat: int) -> dict:
+    runs = []
+    with tempfile.TemporaryDirectory() as workdir:  # api.log hors du dépôt
+        for _ in range(repeat):
+            output = subprocess.run(
+                [sys.executable, "-c", PROBE], env=_env(), cwd=workdir,
+                check=True, capture_output=True, text=True
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "import_main_ms": round(1000 * statistics.median(run["seconds"] for run in runs), 1),
+        "heavy_modules": runs[0]["heavy"]
+    }
+
+def top_imports(limit: int) -> list:
+    """Modules au coût cumulé le plus élevé (µs), d'après -X importtime"""
+    with tempfile.TemporaryDirectory() as workdir:
+        stderr = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"], env=_env(), cwd=workdir,
+            check=True, capture_output=True, text=True
+        ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(cumulative), name))
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in sorted(rows, reverse=True)[:limit]]
+
+def time_to_ready(timeout: float) -> dict:
+    """Délais (s) entre le lancement du serveur et live / ready"""
+    import httpx
+
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        server = Server("http://127.0.0.1:9", workdir)
+        result = {"live_s": None, "ready_s": None}
+        try:
+            deadline = start + timeout
+            while time.perf_counter() < deadline and result["ready_s"] is None:
+                for probe in ("live", "ready"):
+                    if result[f"{probe}_s"] is not None:
+                        continue
+                    try:
+                        response = httpx.get(f"{server.url}/health/{probe}", timeout=1.0)
+                        if response.status_code == 200:
+                            result[f"{probe}_s"] = round(time.perf_counter() - start, 2)
+                    except httpx.HTTPError:
+                        pass
+                time.sleep(0.05)
+            if result["ready_s"] is not None:
+                result["ready"] = httpx.get(f"{server.url}/health/ready", timeout=1.0).json()
+        finally:
+            server.stop()
+    return result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--no-server", action="store_true", help="import seulement")
+    args = parser.parse_args()
+
+    report = import_time(args.repeat)
+    report["top_imports"] = top_imports(args.top)
+    if not args.no_server:
+        report.update(time_to_ready(args.timeout))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if report["heavy_modules"]:
+        print(f"Import eager de : {', '.join(report['heavy_modules'])}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Détection de langue et de rotation par document face aux modèles fixes.
+
+Compare, chacune dans un processus séparé, l'OCR avec les modèles par défaut
+(`fra+eng` sur chaque page, pas de redressement) et la détection une fois
+par document (`detect_pdf` : OSD pour la rotation, un seul modèle choisi
+d'après la couche texte ou un échantillon basse résolution). Documents du
+corpus synthétique : CV français scanné, le même tourné de 90°, CV mixte
+(première page avec couche texte) et CV anglais scanné. Pour chacun : coût de
+la détection, temps d'OCR moyen par page et exactitude du texte (ratio de
+similarité avec le texte de référence, 1 = identique) :
+
+    python -m benchmarks.bench_language --pages 5 --dpi 200
+"""
+import argparse
+import difflib
+import io
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.corpus import cv_lines
+
+VARIANTS = {
+    "fixed": {"DETECT_LANGUAGE": False, "DETECT_ORIENTATION": False},
+    "detect": {"DETECT_LANGUAGE": True, "DETECT_ORIENTATION": True},
+}
+
+def english_cv_lines(seed: int) -> List[str]:
+    """CV fictif en anglais, même structure que `cv_lines`"""
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(['Emma', 'Oliver', 'Grace', 'Henry'])} {rng.choice(['Smith', 'Taylor', 'Brown', 'Wilson'])}",
+        f"Phone: +44 7{rng.randint(100, 999)} {rng.randint(100000, 999999)}",
+        f"Address: {rng.randint(1, 120)} High Street, {rng.choice(['Leeds', 'Bristol', 'York'])}, United Kingdom",
+        "Preferred subjects: computer science and economics",
+        f"Tuition budget: {rng.randint(5, 9)}000 to {rng.randint(10, 15)}000 pounds per year",
+        f"Experience: internship of {rng.randint(2, 6)} months at a software company in the city",
+        "Skills: data analysis, project management and technical writing",
+        "Tasks: gathering of the requirements, development, testing and documentation of the tools",
+        "Interests: this candidate is looking for a degree with a focus on data and the public sector",
+    ]
+
+def _scan(doc, lines: List[str], dpi: int, rotate: int = 0) -> None:
+    """Ajoute à `doc` une page image seule : rendu de `lines`, tourné de `rotate` degrés"""
+    import fitz
+    from PIL import Image
+
+    source = fitz.open()
+    page = source.new_page(width=595, height=842)
+    for num, line in enumerate(lines):
+        page.insert_text((50, 60 + num * 18), line, fontsize=11)
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    image = Image.frombytes("L", (pix.width, pix.height), pix.samples).rotate(rotate, expand=True)
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=80)
+    width, height = (842, 595) if rotate % 180 else (595, 842)
+    doc.new_page(width=width, height=height).insert_image(fitz.Rect(0, 0, width, height), stream=buffer.getvalue())
+
+def build_documents(directory: str, pages: int, dpi: int) -> List[Dict]:
+    """Documents écrits dans `directory`, avec le texte de référence de chaque page"""
+    import fitz
+
+    specs: List[Tuple[str, List[List[str]], List[bool], int]] = [
+        ("fr-scanned", [cv_lines(num) for num in range(pages)], [False] * pages, 0),
+        ("fr-rotated", [cv_lines(num) for num in range(pages)], [False] * pages, 90),
+        ("fr-mixed", [cv_lines(num) for num in range(pages)], [True] + [False] * (pages - 1), 0),
+        ("en-scanned", [english_cv_lines(num) for num in range(pages)], [False] * pages, 0),
+    ]
+    documents = []
+    for name, page_lines, text_layer, rotate in specs:
+        doc = fitz.open()
+        for lines, has_text in zip(page_lines, text_layer):
+            if has_text:
+                page = doc.new_page(width=595, height=842)
+                for num, line in enumerate(lines):
+                    page.insert_text((50, 60 + num * 18), line, fontsize=11)
+            else:
+                _scan(doc, lines, dpi, rotate)
+        path = os.path.join(directory, f"{name}.pdf")
+        doc.save(path)
+        documents.append({"name": name, "path": path, "reference": ["\n".join(lines) for lines in page_lines]})
+    return documents
+
+def _similarity(expected: str, actual: str) -> float:
+    def normalize(text: str) -> str:
+        return re.sub(r"\s+", " ", text).strip().lower()
+    return difflib.SequenceMatcher(None, normalize(expected), normalize(actual), autojunk=False).ratio()
+
+def run_variant(name: str, documents: List[Dict]) -> Dict:
+    from app.services.file_processing import TextExtractor
+
+    TextExtractor.configure(VARIANTS[name])
+    TextExtractor.warm_up()
+    results = {}
+    for document in documents:
+        start = time.perf_counter()
+        hints = TextExtractor.detect_pdf(document["path"]) if name == "detect" else None
+        detect_seconds = time.perf_counter() - start
+        ocr_times, scores = [], []
+        for num, reference in enumerate(document["reference"]):
+            page = TextExtractor.extract_pdf_page(document["path"], num, hints)
+            if page["ocr_used"]:
+                ocr_times.append(page["time"])
+            scores.append(_similarity(reference, page["text"]))
+        hints = hints or TextExtractor.default_hints()
+        results[document["name"]] = {
+            "lang": hints["lang"],
+            "rotate": hints["rotate"],
+            "detect_ms": round(1000 * detect_seconds, 1),
+            "ocr_ms_per_page": round(1000 * sum(ocr_times) / len(ocr_times), 1) if ocr_times else None,
+            "document_s": round(detect_seconds + sum(ocr_times), 2),
+            "accuracy": round(sum(scores) / len(scores), 3)
+        }
+    return {"variant": name, "documents": results}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--dpi", type=int, default=200, help="résolution des pages scannées")
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--documents", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        with open(args.documents, encoding="utf-8") as f:
+            print(json.dumps(run_variant(args.variant, json.load(f))))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        manifest = os.path.join(directory, "documents.json")
+        with open(manifest, "w", encoding="utf-8") as f:
+            json.dump(build_documents(directory, args.pages, args.dpi), f, ensure_ascii=False)
+        for name in VARIANTS:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_language", "--variant", name, "--documents", manifest],
+                check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+            ).stdout
+            print(output.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Coût de la journalisation pour le code appelant (requêtes).
+
+Compare, chacune dans un processus séparé, l'ancienne configuration
+(`basicConfig` avec FileHandler et console, écriture synchrone dans le
+thread appelant, f-strings et profil JSON indenté en INFO) et le pipeline
+par file (`setup_logging` : dépôt dans une file, formatage et écriture dans
+un thread dédié, %-formatage paresseux, journaux volumineux échantillonnés).
+Plusieurs threads simulent des requêtes concurrentes à un débit cible
+(`--rate` requêtes/s, 0 = sans pause) ; on mesure le temps passé dans les
+appels de log (moyenne et p99 par requête) et les enregistrements perdus
+si la file déborde :
+
+    python -m benchmarks.bench_logging --requests 20000 --threads 8 --rate 2000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+PROFILE = {
+    "firstName": "Jean", "lastName": "Dupont", "telephone": "06 12 34 56 78",
+    "email": "jean.dupont@example.com", "preferredSubjects": "maths, physique, chimie",
+    "fee": {"formation": {"min": 3000, "max": 5000}, "logement": {"min": 400, "max": 600}},
+    "address": {"city": "Lyon", "region": "Auvergne-Rhône-Alpes", "country": "France"},
+    "skills": "python, gestion de projet", "desiredFocus": "data", "previousExperience": "stage"
+}
+TEXT = "Expérience en développement, gestion de projet et analyse. " * 100
+
+def _sync_setup(path: str) -> None:
+    import logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(), logging.FileHandler(path, encoding='utf-8')]
+    )
+
+def _sync_request(logger, i: int) -> None:
+    logger.info(f"Début du traitement - Taille du texte: {len(TEXT)} caractères")
+    logger.debug(f"Nettoyage du texte original: {TEXT[:100]}...")
+    logger.info(f"Envoi d'une requête à Cohere - Taille du texte: {len(TEXT)} caractères")
+    logger.debug(f"Réponse reçue - Premiers 200 caractères: {TEXT[:200]}...")
+    logger.info(f"Parsing réussi: {json.dumps(PROFILE, indent=2)}")
+    logger.info(f"Traitement réussi en {0.42}s ({i})")
+
+def _queue_setup(path: str) -> None:
+    from app.services.logging_pipeline import setup_logging
+
+    class Options:
+        LOG_LEVEL = "INFO"
+        LOG_FILE = path
+        LOG_FORMAT = "json"
+        LOG_MAX_BYTES = 10 * 1024 * 1024
+        LOG_ROTATE_WHEN = ""
+        LOG_BACKUP_COUNT = 5
+        LOG_PAYLOAD_SAMPLE_RATE = 0.01
+        LOG_QUEUE_SIZE = 10000
+    setup_logging(Options)
+
+def _queue_request(logger, i: int) -> None:
+    from app.services.logging_pipeline import PAYLOAD, lazy, preview
+
+    logger.info("Début du traitement - Taille du texte: %s caractères", len(TEXT))
+    logger.debug("Nettoyage du texte original: %s...", preview(TEXT, 100), extra=PAYLOAD)
+    logger.info("Envoi d'une requête à Cohere - Taille du texte: %s caractères", len(TEXT))
+    logger.debug("Réponse reçue - Premiers 200 caractères: %s...", preview(TEXT, 200), extra=PAYLOAD)
+    logger.info("Parsing réussi (%s champs)", len(PROFILE))
+    logger.debug("Profil analysé: %s", lazy(json.dumps, PROFILE, ensure_ascii=False), extra=PAYLOAD)
+    logger.info("Traitement réussi en %ss (%s)", 0.42, i)
+
+VARIANTS = {"sync": (_sync_setup, _sync_request), "queue": (_queue_setup, _queue_request)}
+
+def run_variant(name: str, requests: int, threads: int, rate: float, path: str) -> dict:
+    import logging
+
+    setup, request = VARIANTS[name]
+    setup(path)
+    logger = logging.getLogger("bench")
+    per_thread = requests // threads
+    durations = [[] for _ in range(threads)]
+    interval = threads / rate if rate else 0.0
+
+    def worker(slot: int) -> None:
+        next_start = time.perf_counter()
+        for i in range(per_thread):
+            start = time.perf_counter()
+            request(logger, i)
+            durations[slot].append(time.perf_counter() - start)
+            # Attente de la requête suivante, comme une requête en E/S
+            next_start += interval
+            time.sleep(max(0.0, next_start - time.perf_counter()))
+
+    wall = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(slot,)) for slot in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    caller = time.perf_counter() - wall
+    dropped = 0
+    if name == "queue":
+        from app.services import logging_pipeline
+        logging_pipeline.stop_logging()  # attend l'écriture de la file
+        dropped = int(sum(logging_pipeline.LOG_RECORDS_DROPPED._values.values()))
+    logging.shutdown()
+    samples = sorted(d for slot in durations for d in slot)
+    return {
+        "variant": name,
+        "requests": len(samples),
+        "caller_wall_s": round(caller, 2),
+        "flushed_wall_s": round(time.perf_counter() - wall, 2),
+        "mean_us": round(1e6 * statistics.fmean(samples), 1),
+        "p99_us": round(1e6 * samples[int(0.99 * (len(samples) - 1))], 1),
+        # Fichier courant et fichiers tournés
+        "log_mb": round(sum(
+            os.path.getsize(os.path.join(os.path.dirname(path), name))
+            for name in os.listdir(os.path.dirname(path)) if name.startswith(os.path.basename(path))
+        ) / 1e6, 2),
+        "dropped_records": dropped
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=2000.0, help="requêtes/s visées (0 = sans pause)")
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--log", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.requests, args.threads, args.rate, args.log)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in VARIANTS:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_logging", "--variant", name,
+                 "--requests", str(args.requests), "--threads", str(args.threads), "--rate", str(args.rate),
+                 "--log", os.path.join(directory, f"{name}.log")],
+                check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+            ).stdout
+            print(output.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    main()
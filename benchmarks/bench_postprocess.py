@@ -0,0 +1,157 @@
+"""Post-traitement du texte extrait et des réponses du modèle, sur des entrées
+de plusieurs mégaoctets.
+
+- Texte : ancien `clean_text` (strip, replace puis `\\s+` sur tout le texte)
+  face à la normalisation (`normalize_text` sur chaque page,
+  `strip_repeated_lines` puis `clean_text`) sur un document OCR synthétique avec
+  en-têtes et pieds de page répétés, mots coupés en fin de ligne et lignes
+  parasites. Mesure le débit et la taille du texte envoyé au modèle
+  (caractères et tokens estimés).
+- JSON : ancienne recherche gourmande `\\{.*\\}` (DOTALL) puis `json.loads`
+  face à `first_json_object`, sur une réponse normale et sur une réponse
+  suivie de plusieurs mégaoctets de texte contenant des accolades.
+
+    python -m benchmarks.bench_postprocess --mb 4 --repeat 5
+"""
+import argparse
+import json
+import random
+import re
+import statistics
+import time
+from typing import Callable, List
+
+from benchmarks.corpus import cv_lines
+
+# Même estimation que `orientation_service.CHARS_PER_TOKEN`
+CHARS_PER_TOKEN = 4
+
+JUNK = ["| ~ .", "—— ,, ..", "l !", "' ' _", "~~~~ ::", "°"]
+
+PROFILE = {
+    "firstName": "Camille", "lastName": "Martin", "telephone": "+33 6 12 34 56 78",
+    "email": "camille.martin@example.com", "preferredSubjects": "informatique, économie",
+    "fee": {"formation": {"min": 3000, "max": 8000}, "logement": {"min": 400, "max": 700}},
+    "address": {"city": "Lyon", "region": "Auvergne-Rhône-Alpes", "country": "France"},
+    "skills": "Python, SQL", "desiredFocus": "données", "previousExperience": "stage de 4 mois"
+}
+
+def ocr_pages(megabytes: float, seed: int = 0) -> List[str]:
+    """Pages de CV telles qu'en sortie d'OCR : en-tête et pied de page
+    répétés, mots coupés par un trait d'union, lignes parasites"""
+    rng = random.Random(seed)
+    pages, size, num = [], 0, 0
+    while size < megabytes * 1_000_000:
+        lines = ["Dossier de candidature - Confidentiel"]
+        for line in cv_lines(seed + num, sections=rng.randint(20, 40)):
+            words = line.split(" ")
+            if len(words) > 3 and rng.random() < 0.3:
+                # Coupure en fin de ligne au milieu d'un mot long
+                cut = rng.randrange(1, len(words))
+                word = words[cut]
+                if len(word) > 6:
+                    half = len(word) // 2
+                    lines.append(" ".join(words[:cut] + [word[:half] + "-"]))
+                    lines.append(" ".join([word[half:]] + words[cut + 1:]))
+                    continue
+            lines.append(line)
+            if rng.random() < 0.08:
+                lines.append(rng.choice(JUNK))
+        lines.append(f"Page {num + 1}")
+        page = "\n".join(lines)
+        pages.append(page)
+        size += len(page.encode())
+        num += 1
+    return pages
+
+def legacy_clean(text: str) -> str:
+    """Ancien `clean_text`"""
+    cleaned = text.strip().replace("\n", " ")
+    return re.sub(r'\s+', ' ', cleaned)
+
+def legacy_json(text: str):
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+
+def _time(fn: Callable, repeat: int):
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+def bench_text(megabytes: float, repeat: int) -> dict:
+    """Ancien chemin (`legacy_clean` sur le document brut) face au nouveau,
+    étape par étape : normalisation des pages (dans les workers, à
+    l'extraction), retrait des en-têtes et pieds de page (assemblage), puis
+    `clean_text` avant l'envoi au modèle"""
+    from app.services.normalize import normalize_text, strip_repeated_lines
+    from app.services.text_processing import clean_text
+
+    pages = ocr_pages(megabytes)
+    document = "\n".join(pages)
+    size = len(document.encode()) / 1e6
+
+    legacy_seconds, legacy = _time(lambda: legacy_clean(document), repeat)
+    normalize_seconds, normalized = _time(lambda: [normalize_text(page) for page in pages], repeat)
+    strip_seconds, stripped = _time(lambda: strip_repeated_lines(normalized), repeat)
+    assembled = "\n".join(stripped)
+    clean_seconds, cleaned = _time(lambda: clean_text(assembled), repeat)
+
+    def tokens(text: str) -> int:
+        return len(text) // CHARS_PER_TOKEN
+
+    return {
+        "input_mb": round(size, 2),
+        "pages": len(pages),
+        "legacy": {
+            "ms": round(1000 * legacy_seconds, 1),
+            "chars": len(legacy),
+            "tokens_estimate": tokens(legacy)
+        },
+        "normalized": {
+            "normalize_ms": round(1000 * normalize_seconds, 1),
+            "strip_margins_ms": round(1000 * strip_seconds, 1),
+            "clean_text_ms": round(1000 * clean_seconds, 1),
+            "mb_per_s": round(size / (normalize_seconds + strip_seconds + clean_seconds), 1),
+            "chars": len(cleaned),
+            "tokens_estimate": tokens(cleaned)
+        },
+        "token_reduction": round(1 - tokens(cleaned) / tokens(legacy), 3)
+    }
+
+def bench_json(megabytes: float, repeat: int) -> dict:
+    from app.services.text_processing import first_json_object
+
+    body = json.dumps(PROFILE, ensure_ascii=False, indent=2)
+    # Réponse qui déborde : texte après le JSON, avec des accolades
+    trailing = ("Remarque : les champs {optionnels} sont à vérifier. " * 40 + "\n") * int(megabytes * 500)
+    cases = {
+        "normal": f"Voici le profil :\n```json\n{body}\n```",
+        "trailing": f"```json\n{body}\n```\n{trailing}"
+    }
+    results = {}
+    for case, text in cases.items():
+        iterations = 2000 if case == "normal" else 1
+        entry = {"input_mb": round(len(text.encode()) / 1e6, 2)}
+        for name, fn in (("legacy", legacy_json), ("first_json_object", first_json_object)):
+            seconds, value = _time(lambda: [fn(text) for _ in range(iterations)][-1], repeat)
+            entry[name] = {"us_per_call": round(1e6 * seconds / iterations, 1), "parsed": value == PROFILE}
+        results[case] = entry
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=4.0, help="taille des entrées, en mégaoctets")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps({"text": bench_text(args.mb, args.repeat), "json": bench_json(args.mb, args.repeat)}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Micro-benchmark du rendu des pages scannées avant OCR.
+
+Compare l'ancien chemin (rendu RGB à PDF_DPI, second rendu si la page dépasse
+MAX_PAGE_SIZE, copies PIL RGB -> L -> NumPy -> PIL) au rendu unique en niveaux
+de gris avec vue NumPy sans copie et CLAHE réutilisé.
+
+Chaque variante tourne dans un processus séparé pour mesurer le pic de mémoire
+résidente (VmHWM) propre au traitement des pages :
+
+    python -m benchmarks.bench_render --pages 20 --width 2480 --height 3508
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from benchmarks.memory import peak_rss_kb
+
+def make_scanned_pdf(pages: int, width: int, height: int) -> bytes:
+    """PDF dont chaque page ne contient qu'une image (page "scannée")"""
+    import fitz
+
+    source = fitz.open()
+    page = source.new_page(width=595, height=842)
+    for line in range(40):
+        page.insert_text((50, 60 + line * 18), f"Ligne {line} : texte de test pour le rendu OCR")
+    scan = page.get_pixmap(dpi=300, colorspace=fitz.csGRAY)
+
+    doc = fitz.open()
+    for _ in range(pages):
+        target = doc.new_page(width=width * 72 / 300, height=height * 72 / 300)
+        target.insert_image(target.rect, pixmap=scan)
+    return doc.tobytes()
+
+def legacy_render(page, dpi: int, max_size: int):
+    """Reproduction du chemin d'origine de `process_page` (sans l'OCR)"""
+    import cv2
+    import fitz
+    import numpy as np
+    from PIL import Image
+
+    pix = page.get_pixmap(dpi=dpi)
+    if max(pix.width, pix.height) > max_size:
+        scale = max_size / max(pix.width, pix.height)
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
+    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    img_array = np.array(img.convert('L'))
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    img_array = clahe.apply(img_array)
+    img_array = cv2.adaptiveThreshold(
+        img_array, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+    )
+    return Image.fromarray(img_array)
+
+def single_pass_render(page, dpi: int, max_size: int):
+    from app.services.file_processing import TextExtractor
+
+    pix = TextExtractor.render_page(page, dpi)
+    return TextExtractor.enhance_array(TextExtractor.pixmap_array(pix))
+
+VARIANTS = {"legacy": legacy_render, "single-pass": single_pass_render}
+
+def run_variant(name: str, pdf: bytes, dpi: int, max_size: int) -> dict:
+    import fitz
+    from app.services.file_processing import TextExtractor
+
+    TextExtractor.MAX_PAGE_SIZE = max_size
+    doc = fitz.open(stream=pdf, filetype="pdf")
+    render = VARIANTS[name]
+    render(doc[0], dpi, max_size)  # chauffe (imports, allocations initiales)
+
+    baseline = peak_rss_kb()
+    timings = []
+    for page in doc:
+        start = time.perf_counter()
+        result = render(page, dpi, max_size)
+        timings.append(time.perf_counter() - start)
+        del result
+    peak = peak_rss_kb()
+
+    timings.sort()
+    return {
+        "variant": name,
+        "pages": len(timings),
+        "ms_per_page": round(1000 * sum(timings) / len(timings), 2),
+        "p95_ms": round(1000 * timings[int(0.95 * (len(timings) - 1))], 2),
+        "peak_rss_delta_mb": round((peak - baseline) / 1024, 1)
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--width", type=int, default=2480, help="pixels à 300 DPI (A4 = 2480)")
+    parser.add_argument("--height", type=int, default=3508)
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--max-size", type=int, default=1600)
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--pdf", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        with open(args.pdf, "rb") as f:
+            print(json.dumps(run_variant(args.variant, f.read(), args.dpi, args.max_size)))
+        return
+
+    import tempfile
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+        tmp.write(make_scanned_pdf(args.pages, args.width, args.height))
+        tmp.flush()
+        for name in VARIANTS:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_render", "--variant", name,
+                 "--pdf", tmp.name, "--dpi", str(args.dpi), "--max-size", str(args.max_size)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            print(output.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    main()
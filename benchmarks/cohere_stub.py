@@ -0,0 +1,126 @@
+"""Serveur local imitant l'endpoint `/v1/generate` de Cohere.
+
+Permet de tester le client asynchrone et de mesurer l'API sans appeler le
+vrai service :
+
+    python -m benchmarks.cohere_stub --port 8081 --latency 0.5 --error-rate 0.1
+    COHERE_BASE_URL=http://127.0.0.1:8081 uvicorn main:app
+
+La réponse est un profil JSON construit avec quelques expressions régulières
+sur le texte reçu, ce qui suffit à faire passer `parse_cohere_response`.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMAIL_PATTERN = re.compile(r'[\w.+-]+@[\w-]+\.[\w.]+')
+PHONE_PATTERN = re.compile(r'\+?\d[\d\s\-]{7,}\d')
+
+def fake_profile(prompt: str) -> dict:
+    text = prompt.rsplit("Texte à analyser :", 1)[-1]
+    email = EMAIL_PATTERN.search(text)
+    phone = PHONE_PATTERN.search(text)
+    return {
+        "firstName": None,
+        "lastName": None,
+        "telephone": phone.group(0) if phone else None,
+        "email": email.group(0) if email else None,
+        "preferredSubjects": None,
+        "fee": {
+            "formation": {"min": None, "max": None},
+            "logement": {"min": None, "max": None}
+        },
+        "address": {"city": None, "region": None, "country": None},
+        "skills": None,
+        "desiredFocus": None,
+        "previousExperience": None
+    }
+
+class StubState:
+    def __init__(self, latency: float, jitter: float, error_rate: float, fail_first: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.fail_first = fail_first
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def count(self) -> int:
+        with self._lock:
+            self.calls += 1
+            return self.calls
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status: int, body: dict) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                # Client parti avant la réponse (timeout de son côté)
+                self.close_connection = True
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if self.path != "/v1/generate":
+                return self._reply(404, {"message": "not found"})
+            if not self.headers.get("Authorization", "").startswith("Bearer "):
+                return self._reply(401, {"message": "invalid api token"})
+
+            calls = state.count()
+            time.sleep(max(0.0, state.latency + random.uniform(-state.jitter, state.jitter)))
+            if calls <= state.fail_first or random.random() < state.error_rate:
+                return self._reply(503, {"message": "service unavailable"})
+
+            text = json.dumps(fake_profile(payload.get("prompt", "")), ensure_ascii=False)
+            self._reply(200, {
+                "id": f"stub-{calls}",
+                "generations": [{"id": "0", "text": text}],
+                "prompt": payload.get("prompt", "")
+            })
+
+    return Handler
+
+def serve(host: str = "127.0.0.1", port: int = 8081, latency: float = 0.0,
+          jitter: float = 0.0, error_rate: float = 0.0, fail_first: int = 0) -> ThreadingHTTPServer:
+    """Démarre le serveur dans un thread et le retourne (`server.shutdown()` pour l'arrêter).
+
+    `port=0` choisit un port libre (`server.server_address[1]`).
+    """
+    state = StubState(latency, jitter, error_rate, fail_first)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.5, help="secondes par génération")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="part de réponses 503")
+    parser.add_argument("--fail-first", type=int, default=0, help="nombre de premiers appels répondus en 503")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency, args.jitter, args.error_rate, args.fail_first)
+    print(f"Stub Cohere sur http://{args.host}:{args.port}/v1/generate")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
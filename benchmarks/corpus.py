@@ -0,0 +1,171 @@
+"""Corpus synthétique pour les benchmarks : PDF texte, PDF scannés à plusieurs
+DPI, documents multipages, DOCX de tailles variées et photos PNG/JPEG.
+
+Le contenu imite un CV (identité, contact, formation, expériences) pour que
+l'extraction et l'orientation travaillent sur du texte réaliste. La génération
+est déterministe (graine fixe) : deux corpus de même échelle sont identiques.
+
+    python -m benchmarks.corpus --out bench-corpus --scale 1
+"""
+import argparse
+import io
+import json
+import os
+import random
+from typing import Any, Dict, List
+
+SCANNED_DPIS = (150, 200, 300)
+
+FIRST_NAMES = ["Camille", "Léa", "Hugo", "Inès", "Lucas", "Chloé", "Nathan", "Manon"]
+LAST_NAMES = ["Martin", "Bernard", "Dubois", "Moreau", "Laurent", "Garcia", "Roux", "Fournier"]
+CITIES = ["Lyon", "Lille", "Nantes", "Bordeaux", "Toulouse", "Rennes", "Grenoble", "Dijon"]
+SUBJECTS = ["mathématiques", "informatique", "biologie", "économie", "physique", "droit", "histoire"]
+SKILLS = ["Python", "gestion de projet", "analyse de données", "anglais courant", "SQL", "rédaction"]
+
+def cv_lines(seed: int, sections: int = 3) -> List[str]:
+    """Lignes d'un CV fictif ; `sections` contrôle la longueur"""
+    rng = random.Random(seed)
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    lines = [
+        f"{first} {last}",
+        f"Email : {first.lower()}.{last.lower()}@example.com",
+        f"Téléphone : +33 6 {rng.randint(10, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)}",
+        f"Adresse : {rng.randint(1, 120)} rue de la République, {rng.choice(CITIES)}, France",
+        f"Matières préférées : {', '.join(rng.sample(SUBJECTS, 2))}",
+        f"Budget formation : {rng.randint(2, 6)}000 à {rng.randint(7, 12)}000 euros par an",
+        f"Budget logement : {rng.randint(3, 5)}00 à {rng.randint(6, 9)}00 euros par mois"
+    ]
+    for section in range(sections):
+        lines.append(f"Expérience {section + 1} : stage de {rng.randint(2, 6)} mois à {rng.choice(CITIES)}")
+        lines.append(f"Compétences : {', '.join(rng.sample(SKILLS, 3))}")
+        lines.append("Missions : analyse des besoins, développement, tests et documentation.")
+    return lines
+
+def _text_page(doc, lines: List[str]) -> None:
+    page = doc.new_page(width=595, height=842)
+    y = 60
+    for line in lines:
+        if y > 800:
+            page = doc.new_page(width=595, height=842)
+            y = 60
+        page.insert_text((50, y), line, fontsize=11)
+        y += 18
+
+def text_pdf(pages: int, seed: int = 0) -> bytes:
+    """PDF avec couche texte (une page de CV par page)"""
+    import fitz
+
+    doc = fitz.open()
+    for num in range(pages):
+        _text_page(doc, cv_lines(seed + num))
+    return doc.tobytes()
+
+def scanned_pdf(pages: int, dpi: int, seed: int = 0) -> bytes:
+    """PDF image seule : chaque page est le rendu JPEG à `dpi` d'une page de CV,
+    comme en sortie de scanner"""
+    import fitz
+
+    doc = fitz.open()
+    for num in range(pages):
+        source = fitz.open()
+        _text_page(source, cv_lines(seed + num))
+        pix = source[0].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        target = doc.new_page(width=595, height=842)
+        target.insert_image(target.rect, stream=pix.tobytes("jpg", jpg_quality=80))
+    return doc.tobytes()
+
+def photo(fmt: str, seed: int = 0, dpi: int = 200) -> bytes:
+    """Photo de document : page rendue, légèrement tournée, bruitée, fond gris"""
+    import fitz
+    import numpy as np
+    from PIL import Image
+
+    source = fitz.open()
+    _text_page(source, cv_lines(seed))
+    pix = source[0].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    image = image.rotate(random.Random(seed).uniform(-2, 2), expand=True, fillcolor=200)
+    rng = np.random.default_rng(seed)
+    noisy = np.asarray(image, dtype=np.int16) + rng.normal(0, 12, (image.height, image.width))
+    image = Image.fromarray(np.clip(noisy, 0, 255).astype(np.uint8))
+    buffer = io.BytesIO()
+    if fmt == "jpeg":
+        image.save(buffer, "JPEG", quality=85, dpi=(dpi, dpi))
+    else:
+        image.save(buffer, "PNG", dpi=(dpi, dpi))
+    return buffer.getvalue()
+
+def docx(sections: int, seed: int = 0) -> bytes:
+    """DOCX : CV en paragraphes, tableau de formation, en-tête et pied de page"""
+    from docx import Document
+
+    lines = cv_lines(seed, sections)
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = lines[0]
+    doc.sections[0].footer.paragraphs[0].text = lines[1]
+    for line in lines[2:]:
+        doc.add_paragraph(line)
+    table = doc.add_table(rows=3, cols=2)
+    for row, (year, diploma) in enumerate([("2021", "Baccalauréat"), ("2023", "BTS"), ("2024", "Licence")]):
+        table.rows[row].cells[0].text = year
+        table.rows[row].cells[1].text = diploma
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "png": "image/png",
+    "jpeg": "image/jpeg"
+}
+
+def build_corpus(directory: str, scale: int = 1) -> List[Dict[str, Any]]:
+    """Écrit le corpus dans `directory` avec un `manifest.json`, et le retourne.
+
+    Chaque entrée : nom, chemin, type MIME, catégorie (`text`, `scanned`,
+    `docx`, `photo`), nombre de pages et texte de référence (lignes du CV).
+    """
+    os.makedirs(directory, exist_ok=True)
+    entries = []
+
+    def add(name: str, kind: str, content: bytes, pages: int, seed: int, sections: int = 3) -> None:
+        path = os.path.join(directory, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        extension = name.rsplit(".", 1)[-1]
+        entries.append({
+            "name": name,
+            "path": os.path.abspath(path),
+            "content_type": CONTENT_TYPES[extension],
+            "kind": kind,
+            "pages": pages,
+            "text": "\n".join(cv_lines(seed, sections))
+        })
+
+    for seed in range(scale):
+        add(f"text-1p-{seed}.pdf", "text", text_pdf(1, seed), 1, seed)
+        add(f"text-10p-{seed}.pdf", "text", text_pdf(10, seed), 10, seed)
+        for dpi in SCANNED_DPIS:
+            add(f"scanned-{dpi}dpi-{seed}.pdf", "scanned", scanned_pdf(1, dpi, seed), 1, seed)
+        add(f"scanned-5p-{seed}.pdf", "scanned", scanned_pdf(5, 200, seed), 5, seed)
+        add(f"docx-small-{seed}.docx", "docx", docx(3, seed), 1, seed, 3)
+        add(f"docx-large-{seed}.docx", "docx", docx(2000, seed), 1, seed, 2000)
+        add(f"photo-{seed}.png", "photo", photo("png", seed), 1, seed)
+        add(f"photo-{seed}.jpeg", "photo", photo("jpeg", seed), 1, seed)
+
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False, indent=2)
+    return entries
+
+def load_corpus(directory: str) -> List[Dict[str, Any]]:
+    with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default="bench-corpus")
+    parser.add_argument("--scale", type=int, default=1, help="nombre de variantes par catégorie")
+    args = parser.parse_args()
+    for entry in build_corpus(args.out, args.scale):
+        print(f"{entry['kind']:8} {entry['pages']:3}p  {os.path.getsize(entry['path']) / 1e3:8.1f} kB  {entry['name']}")
@@ -0,0 +1,41 @@
+"""Pic de mémoire résidente d'un processus.
+
+`ru_maxrss` est conservé à travers `execve` sous Linux : un sous-processus de
+benchmark hérite du pic de son parent (génération du corpus, etc.). On lit
+donc de préférence `VmHWM`, remis à zéro avec l'espace d'adressage.
+"""
+import os
+import resource
+from typing import Optional
+
+def peak_rss_kb(pid: Optional[int] = None) -> Optional[int]:
+    """Pic de mémoire résidente en kB (`pid` absent = processus courant)"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except FileNotFoundError:
+        pass
+    if pid is None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return None
+
+def tree_peak_rss_kb(pid: int) -> Optional[int]:
+    """Somme des pics de `pid` et de ses descendants (serveur et workers, Linux)"""
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        peak = peak_rss_kb(current)
+        if peak is None:
+            if current == pid:
+                return None
+            continue
+        total += peak
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except FileNotFoundError:
+            pass
+    return total
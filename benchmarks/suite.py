@@ -0,0 +1,386 @@
+"""Suite de benchmarks des pipelines d'extraction et d'orientation.
+
+Deux familles de mesures sur le corpus synthétique (`benchmarks.corpus`) :
+
+- étapes de `TextExtractor` (`process_page` texte et scanné par DPI,
+  `render_page`, `enhance_image`, OCR, `extract_from_word`), chacune dans un
+  processus séparé pour isoler son pic de mémoire ;
+- endpoints `/extract-text` et `/process-text` sous concurrence, sur un
+  serveur uvicorn lancé pour l'occasion, Cohere remplacé par le stub local
+  (`benchmarks.cohere_stub`) à latence réglable. Les caches sont désactivés
+  pour mesurer le traitement et non les hits.
+
+Chaque mesure donne le débit, les latences p50/p95/p99 et le pic de mémoire
+résidente. Les résultats peuvent être enregistrés comme référence puis
+comparés lors d'un passage ultérieur (code de sortie 1 en cas de régression) :
+
+    python -m benchmarks.suite --save benchmarks/baselines/local.json
+    python -m benchmarks.suite --compare benchmarks/baselines/local.json --tolerance 0.2
+    python -m benchmarks.suite --only endpoints --concurrency 16 --requests 128 --latency 0.8
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.memory import peak_rss_kb, tree_peak_rss_kb
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Métriques comparées aux références : plus haut = pire, sauf le débit
+HIGHER_IS_WORSE = ("p50_ms", "p95_ms", "p99_ms", "peak_rss_mb")
+LOWER_IS_WORSE = ("throughput",)
+
+def summarize(samples: List[float], wall: Optional[float] = None) -> Dict[str, Any]:
+    """Latences (ms) aux percentiles usuels et débit (opérations par seconde)"""
+    ordered = sorted(samples)
+
+    def percentile(q: float) -> float:
+        return round(1000 * ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+    wall = wall if wall is not None else sum(ordered)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(1000 * sum(ordered) / len(ordered), 2),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(1000 * ordered[-1], 2),
+        "throughput": round(len(ordered) / wall, 2) if wall else None
+    }
+
+# --- Étapes de TextExtractor -------------------------------------------------
+
+def _pdf_pages(corpus, prefix: str):
+    import fitz
+
+    for entry in corpus:
+        if entry["name"].startswith(prefix):
+            yield from fitz.open(entry["path"])
+
+def _photos(corpus):
+    from PIL import Image
+
+    for entry in corpus:
+        if entry["kind"] == "photo":
+            with Image.open(entry["path"]) as image:
+                yield image.convert("L")
+
+def stage_operations(name: str, corpus) -> List[Callable[[], Any]]:
+    """Opérations à chronométrer pour une étape (une par page ou fichier) ;
+    la préparation (ouverture, décodage) reste hors mesure"""
+    import numpy as np
+    from app.services.file_processing import TextExtractor
+
+    if name == "process_page:text":
+        return [lambda page=page: TextExtractor.process_page(page, page.number)
+                for page in _pdf_pages(corpus, "text-")]
+    if name.startswith("process_page:scanned-"):
+        prefix = name.split(":", 1)[1]
+        return [lambda page=page: TextExtractor.process_page(page, page.number)
+                for page in _pdf_pages(corpus, prefix)]
+    if name == "render_page":
+        return [lambda page=page: TextExtractor.pixmap_array(TextExtractor.render_page(page))
+                for page in _pdf_pages(corpus, "scanned-")]
+    if name == "enhance_image":
+        return [lambda image=image: TextExtractor.enhance_image(image) for image in _photos(corpus)]
+    if name == "ocr":
+        arrays = [TextExtractor.enhance_array(np.asarray(image)) for image in _photos(corpus)]
+        return [lambda array=array: TextExtractor.ocr_data(array, 6) for array in arrays]
+    if name.startswith("extract_from_word:"):
+        size = name.split(":", 1)[1]
+        return [lambda path=entry["path"]: TextExtractor.extract_from_word(path)
+                for entry in corpus if entry["name"].startswith(f"docx-{size}")]
+    raise ValueError(f"Étape inconnue : {name}")
+
+def stage_names() -> List[str]:
+    from benchmarks.corpus import SCANNED_DPIS
+
+    return (
+        ["process_page:text"]
+        + [f"process_page:scanned-{dpi}dpi" for dpi in SCANNED_DPIS]
+        + ["render_page", "enhance_image", "ocr", "extract_from_word:small", "extract_from_word:large"]
+    )
+
+def run_stage(name: str, corpus, repeat: int) -> Dict[str, Any]:
+    """Mesure d'une étape dans le processus courant (appelé en sous-processus)"""
+    operations = stage_operations(name, corpus)
+    operations[0]()  # chauffe (imports, CLAHE, premiers appels Tesseract)
+    baseline = peak_rss_kb()
+    samples = []
+    for _ in range(repeat):
+        for operation in operations:
+            start = time.perf_counter()
+            operation()
+            samples.append(time.perf_counter() - start)
+    peak = peak_rss_kb()
+    return {
+        **summarize(samples),
+        "peak_rss_mb": round(peak / 1024, 1),
+        "rss_delta_mb": round((peak - baseline) / 1024, 1)
+    }
+
+def bench_stages(corpus_dir: str, repeat: int) -> Dict[str, Any]:
+    results = {}
+    for name in stage_names():
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.suite", "--stage", name,
+             "--corpus", corpus_dir, "--repeat", str(repeat)],
+            check=True, capture_output=True, text=True, cwd=REPO
+        ).stdout
+        results[f"stage:{name}"] = json.loads(output.strip().splitlines()[-1])
+        print(f"stage:{name}", json.dumps(results[f"stage:{name}"]), file=sys.stderr)
+    return results
+
+# --- Endpoints sous concurrence ----------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class Server:
+    """Serveur uvicorn de l'API dans un sous-processus, caches désactivés"""
+
+    def __init__(self, cohere_url: str, workdir: str):
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        env = {
+            **os.environ,
+            "PYTHONPATH": REPO,
+            "COHERE_API_KEY": "bench",
+            "COHERE_BASE_URL": cohere_url,
+            "EXTRACTION_CACHE_SIZE": "0",
+            "EXTRACTION_CACHE_PATH": "",
+            "ORIENTATION_CACHE_SIZE": "0",
+            "ORIENTATION_CACHE_PATH": "",
+            "JOBS_DB_PATH": os.path.join(workdir, "jobs.sqlite3"),
+            "JOBS_DIR": os.path.join(workdir, "jobs"),
+            "UPLOAD_DIR": os.path.join(workdir, "uploads")
+        }
+        # cwd = workdir : api.log et .env du dépôt restent hors du benchmark
+        self.log_path = os.path.join(workdir, "server.log")
+        with open(self.log_path, "wb") as log:
+            self.process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", REPO,
+                 "--port", str(self.port), "--log-level", "warning"],
+                env=env, cwd=workdir, stdout=log, stderr=subprocess.STDOUT
+            )
+
+    def wait_ready(self, timeout: float = 60.0) -> None:
+        import httpx
+
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                with open(self.log_path, encoding="utf-8", errors="replace") as f:
+                    raise RuntimeError(f"Le serveur s'est arrêté au démarrage :\n{f.read()[-2000:]}")
+            try:
+                # Pool OCR préchauffé : les mesures ne comptent pas le démarrage
+                if httpx.get(f"{self.url}/health/ready", timeout=1.0).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError("Serveur non prêt")
+
+    def peak_rss_mb(self) -> Optional[float]:
+        peak = tree_peak_rss_kb(self.process.pid)
+        return round(peak / 1024, 1) if peak is not None else None
+
+    def stop(self) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+async def drive(client, requests: List[Callable[[], Any]], concurrency: int) -> Dict[str, Any]:
+    """Envoie les requêtes avec au plus `concurrency` en vol ; latences par catégorie"""
+    samples: Dict[str, List[float]] = {}
+    statuses: Dict[str, int] = {}
+    pending = iter(requests)
+
+    async def worker() -> None:
+        for label, send in pending:
+            start = time.perf_counter()
+            try:
+                response = await send(client)
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "200":
+                samples.setdefault(label, []).append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    everything = [sample for values in samples.values() for sample in values]
+    result = {"all": {**summarize(everything, wall), "statuses": statuses}} if everything else {
+        "all": {"count": 0, "statuses": statuses}
+    }
+    for label, values in samples.items():
+        result[label] = summarize(values)
+    return result
+
+def extract_requests(corpus, total: int) -> List[tuple]:
+    def make(entry):
+        async def send(client):
+            with open(entry["path"], "rb") as f:
+                files = {"file": (entry["name"], f.read(), entry["content_type"])}
+            return await client.post("/api/text-extraction/extract-text", files=files)
+        return entry["kind"], send
+
+    return [make(entry) for entry in itertools.islice(itertools.cycle(corpus), total)]
+
+def orientation_requests(corpus, total: int) -> List[tuple]:
+    def make(index, entry):
+        # Texte unique par requête : ni cache ni requêtes en vol fusionnées
+        text = entry["text"][:6000] + f"\nRéférence dossier {index}"
+
+        async def send(client):
+            return await client.post("/api/orientation/process-text", json={"text": text})
+        return "profile", send
+
+    return [make(index, entry) for index, entry in zip(range(total), itertools.cycle(corpus))]
+
+def bench_endpoints(corpus, requests: int, concurrency: int, latency: float, jitter: float) -> Dict[str, Any]:
+    import httpx
+    from benchmarks.cohere_stub import serve
+
+    stub = serve(port=_free_port(), latency=latency, jitter=jitter)
+    host, port = stub.server_address[:2]
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        server = Server(f"http://{host}:{port}", workdir)
+        try:
+            server.wait_ready()
+
+            async def run() -> None:
+                limits = httpx.Limits(max_connections=concurrency)
+                async with httpx.AsyncClient(base_url=server.url, timeout=600, limits=limits) as client:
+                    # Chauffe : démarrage des workers OCR, connexions
+                    await drive(client, extract_requests(corpus, len(corpus)), concurrency)
+                    extraction = await drive(client, extract_requests(corpus, requests), concurrency)
+                    calls_before = stub.state.calls
+                    orientation = await drive(client, orientation_requests(corpus, requests), concurrency)
+                    orientation["all"]["upstream_calls"] = stub.state.calls - calls_before
+                for label, summary in extraction.items():
+                    results[f"endpoint:extract-text:{label}"] = summary
+                results["endpoint:process-text"] = orientation["all"]
+
+            asyncio.run(run())
+            peak = server.peak_rss_mb()
+            for key in results:
+                if key.endswith(":all") or key == "endpoint:process-text":
+                    results[key]["peak_rss_mb"] = peak
+                    results[key]["concurrency"] = concurrency
+        finally:
+            server.stop()
+            stub.shutdown()
+    for key, summary in results.items():
+        print(key, json.dumps(summary), file=sys.stderr)
+    return results
+
+# --- Références ---------------------------------------------------------------
+
+def metadata(args) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "options": {
+            "repeat": args.repeat, "requests": args.requests, "concurrency": args.concurrency,
+            "latency": args.latency, "jitter": args.jitter, "scale": args.scale
+        }
+    }
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Régressions au-delà de `tolerance` (0.2 = 20 %) par rapport à la référence"""
+    regressions = []
+    for name, reference in baseline["results"].items():
+        current = results.get(name)
+        if not current:
+            continue
+        for metric in HIGHER_IS_WORSE + LOWER_IS_WORSE:
+            before, after = reference.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            ratio = after / before
+            worse = ratio > 1 + tolerance if metric in HIGHER_IS_WORSE else ratio < 1 - tolerance
+            print(f"{'REGRESSION' if worse else 'ok':10} {name:45} {metric:12} {before:>10} -> {after:>10} ({ratio:.2f}x)")
+            if worse:
+                regressions.append(f"{name} {metric}")
+    return regressions
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="corpus existant (sinon généré dans un dossier temporaire)")
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--only", choices=["stages", "endpoints"])
+    parser.add_argument("--repeat", type=int, default=3, help="passages par étape")
+    parser.add_argument("--requests", type=int, default=48, help="requêtes par endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.5, help="latence du stub Cohere (s)")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--save", help="enregistre les résultats comme référence")
+    parser.add_argument("--compare", help="référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--stage", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    from benchmarks.corpus import build_corpus, load_corpus
+
+    if args.stage:
+        print(json.dumps(run_stage(args.stage, load_corpus(args.corpus), args.repeat)))
+        return
+
+    with tempfile.TemporaryDirectory() as scratch:
+        corpus_dir = args.corpus or os.path.join(scratch, "corpus")
+        if os.path.exists(os.path.join(corpus_dir, "manifest.json")):
+            corpus = load_corpus(corpus_dir)
+        else:
+            corpus = build_corpus(corpus_dir, args.scale)
+
+        results: Dict[str, Any] = {}
+        if args.only != "endpoints":
+            results.update(bench_stages(corpus_dir, args.repeat))
+        if args.only != "stages":
+            results.update(bench_endpoints(corpus, args.requests, args.concurrency, args.latency, args.jitter))
+
+    report = {"meta": metadata(args), "results": results}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} régression(s) : {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,62 @@ logger = logging.getLogger(__name__)
 class Settings(BaseSettings):
     COHERE_API_KEY: str
     ALLOWED_ORIGINS: str = "*"
+    COHERE_BASE_URL: str = "https://api.cohere.com"
+    COHERE_MAX_CONCURRENCY: int = 8  # Appels simultanés (et connexions gardées ouvertes)
+    COHERE_TIMEOUT: float = 30.0  # Secondes par tentative
+    COHERE_DEADLINE: float = 60.0  # Budget total, nouvelles tentatives comprises
+    COHERE_MAX_RETRIES: int = 3
+    OCR_WORKERS: int = 0  # Processus OCR partagés (0 = nombre de cœurs)
+    OCR_ADAPTIVE: bool = True  # Échelle de qualité OCR pilotée par la confiance
+    OCR_MIN_CONFIDENCE: float = 75.0  # Confiance moyenne (0-100) pour s'arrêter à un échelon
+    OCR_TEXT_REGIONS: bool = True  # OCR limité aux blocs de texte détectés
+    TEXT_NORMALIZE: bool = True  # Texte extrait : mots coupés recollés, lignes parasites et en-têtes répétés retirés
+    OCR_LANGUAGES: str = "fra+eng"  # Modèles Tesseract quand la langue du document n'est pas identifiée
+    OCR_DETECT_LANGUAGE: bool = True  # Un seul modèle par document, choisi d'après la couche texte ou un échantillon
+    OCR_DETECT_ORIENTATION: bool = True  # Rotation des pages scannées détectée une fois par document (OSD)
+    OCR_DETECT_MIN_PAGES: int = 3  # Pages à OCRiser à partir desquelles la langue est échantillonnée par OCR
+    MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # Octets par fichier reçu
+    BATCH_MAX_UPLOAD_SIZE: int = 200 * 1024 * 1024  # Octets par requête de lot (fichiers ou zip)
+    BATCH_MAX_ITEMS: int = 500  # Éléments (fichiers, entrées du zip, textes) par lot
+    BATCH_CONCURRENCY: int = 8  # Éléments d'un même lot traités simultanément
+    UPLOAD_DIR: str = ""  # Fichiers reçus en cours de traitement (vide = dossier temporaire système)
+    EXTRACTION_CACHE_SIZE: int = 256  # Documents gardés en mémoire
+    EXTRACTION_CACHE_PATH: str = "cache/extraction.sqlite3"  # Vide = pas de cache disque
+    EXTRACTION_CACHE_MAX_ENTRIES: int = 50000  # Documents et pages sur disque, les plus anciens supprimés au-delà (0 = illimité)
+    EXTRACTION_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024  # Octets sur disque, idem (0 = illimité)
+    PAGE_MAX_ATTEMPTS: int = 3  # Essais par page avant de la déclarer en échec
+    PAGE_RETRY_BACKOFF: float = 0.5  # Secondes avant le 2e essai, doublées ensuite
+    JOBS_DB_PATH: str = "cache/jobs.sqlite3"  # File de jobs partagée entre workers
+    JOBS_DIR: str = "cache/jobs"  # Fichiers en attente de traitement
+    JOBS_MAX_QUEUE: int = 100  # Jobs en file ou en cours au-delà desquels on répond 429
+    JOBS_CONCURRENCY: int = 2  # Jobs traités simultanément par worker uvicorn
+    JOBS_TIMEOUT: float = 1800.0  # Secondes par job
+    JOBS_MAX_ATTEMPTS: int = 3  # Essais interrompus (worker arrêté) avant de passer le job en échec
+    JOBS_RESULT_TTL: float = 86400.0  # Conservation des résultats
+    ADMISSION_OCR_BUDGET: int = 0  # Pages OCR admises simultanément (0 = 16 par processus OCR)
+    ADMISSION_OCR_PAGE_COST: int = 4  # Coût d'une page à OCRiser (page avec couche texte, DOCX : 1)
+    ADMISSION_OCR_MAX_COST: int = 0  # Coût maximal compté pour un document (0 = moitié du budget OCR)
+    ADMISSION_LLM_BUDGET: int = 0  # Appels Cohere admis simultanément (0 = 2 x COHERE_MAX_CONCURRENCY)
+    ADMISSION_CLIENT_QUEUE: int = 16  # Demandes en attente par client au-delà desquelles on répond 429
+    ADMISSION_MAX_QUEUE: int = 64  # Demandes en attente au total au-delà desquelles on répond 503
+    ADMISSION_MAX_WAIT: float = 2.0  # Secondes d'attente d'admission avant 503 (requêtes interactives)
+    ADMISSION_TRUST_CLIENT_ID: bool = False  # En-tête X-Client-ID pris comme identité (proxy de confiance, clients authentifiés) ; sinon adresse IP
+    SERVER_TIMING: bool = True  # En-tête Server-Timing (durée par étape) sur les réponses
+    LOG_LEVEL: str = "INFO"
+    LOG_FILE: str = "api.log"  # Un fichier par processus, pid ajouté au nom (api.1234.log) ; vide = console seulement
+    LOG_FORMAT: str = "json"  # Format du fichier : "json" (une ligne par enregistrement) ou "text"
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024  # Rotation par taille...
+    LOG_ROTATE_WHEN: str = ""  # ... ou par période si renseigné ("midnight", "H"...)
+    LOG_BACKUP_COUNT: int = 5  # Fichiers tournés conservés, et journaux des derniers processus arrêtés
+    LOG_PAYLOAD_SAMPLE_RATE: float = 0.01  # Part des journaux volumineux (textes, profils) gardés en DEBUG
+    LOG_QUEUE_SIZE: int = 10000  # Enregistrements en attente d'écriture au-delà desquels on les perd
+    ORIENTATION_CHUNK_TOKENS: int = 1500  # Au-delà, texte découpé en fragments analysés en parallèle
+    ORIENTATION_CHUNK_OVERLAP: int = 100  # Tokens repris d'un fragment au suivant
+    ORIENTATION_MAX_CHUNKS: int = 8  # Fragments agrandis au besoin pour ne pas dépasser ce nombre
+    ORIENTATION_CACHE_SIZE: int = 1024  # Profils gardés en mémoire (0 = désactivé)
+    ORIENTATION_CACHE_TTL: float = 3600.0  # Secondes
+    ORIENTATION_CACHE_PATH: str = ""  # Ex. "cache/orientation.sqlite3" pour survivre aux redémarrages
+    ORIENTATION_CACHE_MAX_ENTRIES: int = 100000  # Profils sur disque, les plus anciens supprimés au-delà (0 = illimité)
     
     class Config:
         env_file = ".env"
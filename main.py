@@ -3,18 +3,23 @@ from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.api.router import api_router
+from app.api.endpoints import health, metrics
+from app.services import admission
+from app.services.cohere_service import client as cohere_client
+from app.services.extraction_service import extraction_cache
+from app.services.jobs import runner as job_runner
+from app.services.logging_pipeline import REQUEST_ID_PATTERN, request_id, setup_logging
+from app.services.metrics import REQUEST_SECONDS, REQUESTS_IN_FLIGHT, collect_stages, server_timing
+from app.services.orientation_service import profile_cache
+from app.services.warmup import warmup
+from app.services.worker_pool import pool
 from config.settings import settings
 import asyncio
+import time
+import uuid
 
-# Configuration du logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('api.log', encoding='utf-8')
-    ]
-)
+# Configuration du logging : écriture dans un thread dédié, hors des requêtes
+setup_logging(settings)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
@@ -38,22 +43,83 @@ async def timeout_middleware(request: Request, call_next):
             content={"detail": "Timeout du serveur"}
         )
 
+# Marge pour l'enveloppe multipart (bornes, en-têtes de parties)
+MULTIPART_OVERHEAD = 64 * 1024
+
+@app.middleware("http")
+async def upload_size_middleware(request: Request, call_next):
+    """Refuse un upload trop gros sur son Content-Length, avant d'en lire le corps"""
+    length = request.headers.get("content-length")
+    # Les lots (plusieurs fichiers ou un zip) ont leur propre plafond
+    limit = settings.BATCH_MAX_UPLOAD_SIZE if request.url.path.endswith("/batch") else settings.MAX_UPLOAD_SIZE
+    if length and length.isdigit() and int(length) > limit + MULTIPART_OVERHEAD:
+        logger.warning("Upload refusé (%s octets) pour %s %s", length, request.method, request.url)
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Taille max dépassée ({limit//(1024*1024)}MB)"}
+        )
+    return await call_next(request)
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """Durée et requêtes en cours par route ; détail par étape dans Server-Timing"""
+    start = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc()
+    status = 500
+    try:
+        with collect_stages() as observations:
+            response = await call_next(request)
+        status = response.status_code
+        if settings.SERVER_TIMING and observations:
+            response.headers["Server-Timing"] = server_timing(observations, time.perf_counter() - start)
+        return response
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status)
+        )
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Identifiant de corrélation (X-Request-ID reçu ou généré) : présent dans
+    chaque journal de la requête et renvoyé dans la réponse"""
+    rid = request.headers.get("x-request-id", "")
+    if not REQUEST_ID_PATTERN.fullmatch(rid):
+        rid = uuid.uuid4().hex[:16]
+    token = request_id.set(rid)
+    # Client de la file équitable d'admission (adresse IP, ou X-Client-ID si autorisé)
+    client_token = admission.client.set(
+        admission.client_key(request.headers, request.client.host if request.client else None)
+    )
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = rid
+        return response
+    finally:
+        admission.client.reset(client_token)
+        request_id.reset(token)
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """Gestion des erreurs HTTP"""
     logger.warning(
-        f"Erreur {exc.status_code} pour {request.method} {request.url}: {exc.detail}"
+        "Erreur %s pour %s %s: %s", exc.status_code, request.method, request.url, exc.detail
     )
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
+        headers=getattr(exc, "headers", None),
     )
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """Gestion des autres exceptions"""
     logger.error(
-        f"Erreur inattendue pour {request.method} {request.url}",
+        "Erreur inattendue pour %s %s", request.method, request.url,
         exc_info=True
     )
     return JSONResponse(
@@ -71,17 +137,28 @@ app.add_middleware(
 
 # Router principal
 app.include_router(api_router, prefix="/api")
+app.include_router(health.router, tags=["Monitoring"])
+app.include_router(metrics.router, tags=["Monitoring"])
 
 @app.on_event("startup")
 async def startup():
     """Actions au démarrage"""
     logger.info("Démarrage de l'API")
-    # Vérification des dépendances
-    try:
-        import pytesseract
-        pytesseract.get_tesseract_version()
-    except Exception:
-        logger.critical("Tesseract OCR n'est pas installé correctement")
+    # Extraction (documents et pages partagent le fichier) et profils d'orientation
+    purged = await extraction_cache.purge() + await profile_cache.purge()
+    if purged:
+        logger.info("%s entrée(s) du cache disque supprimée(s)", purged)
+    # Pool OCR et Tesseract préchauffés en arrière-plan : le serveur écoute
+    # tout de suite, /health/ready passe à 200 une fois le préchauffage fini
+    warmup.start(on_ready=job_runner.start)
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Actions à l'arrêt"""
+    await warmup.stop()
+    await job_runner.stop()
+    pool.shutdown()
+    await cohere_client.aclose()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,16 @@
+"""Configuration commune des tests : racine du dépôt importable, réglages
+minimaux et aucun fichier (journaux, caches) écrit dans le dossier courant"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TEST_ENV = {
+    "COHERE_API_KEY": "test",
+    "LOG_FILE": "",
+    "EXTRACTION_CACHE_PATH": "",
+    "JOBS_DB_PATH": "",
+}
+for name, value in TEST_ENV.items():
+    os.environ.setdefault(name, value)
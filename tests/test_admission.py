@@ -0,0 +1,41 @@
+"""Budget d'admission : plafond du coût d'une demande et budget rendu
+quand une attente expire au moment où elle est servie"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.admission import Budget
+
+def test_cost_is_capped():
+    async def run():
+        budget = Budget("test_cap", capacity=16, client_queue=4, max_queue=8, max_cost=8)
+        first = await budget.acquire(64, "a", wait=0)
+        second = await budget.acquire(64, "b", wait=0)
+        return first, second, budget.in_use
+
+    assert asyncio.run(run()) == (8, 8, 16)
+
+def test_timeout_does_not_leak_granted_cost():
+    async def run():
+        budget = Budget("test_timeout", capacity=1, client_queue=4, max_queue=8)
+        await budget.acquire(1, "a", wait=0)
+        loop = asyncio.get_running_loop()
+        # Budget rendu juste avant l'expiration : accordé à la demande qui abandonne
+        loop.call_later(0.049, budget.release, 1, 0.0)
+        original = asyncio.wait_for
+
+        async def late_wait_for(awaitable, timeout):
+            await asyncio.sleep(0.05)
+            awaitable.cancel()
+            raise asyncio.TimeoutError
+
+        asyncio.wait_for = late_wait_for
+        try:
+            with pytest.raises(HTTPException) as error:
+                await budget.acquire(1, "b", wait=0.05)
+        finally:
+            asyncio.wait_for = original
+        return error.value.status_code, budget.in_use
+
+    assert asyncio.run(run()) == (503, 0)
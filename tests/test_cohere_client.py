@@ -0,0 +1,67 @@
+"""Client Cohere face au serveur local `benchmarks.cohere_stub` : nouvelles
+tentatives, fusion des requêtes identiques et budget de temps global"""
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.cohere_service import AsyncCohereClient
+from benchmarks.cohere_stub import serve
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**options):
+        server = serve(port=0, **options)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def client_for(server, **options) -> AsyncCohereClient:
+    host, port = server.server_address[:2]
+    options.setdefault("backoff_base", 0.01)
+    return AsyncCohereClient("test", base_url=f"http://{host}:{port}", **options)
+
+async def generate(client: AsyncCohereClient, prompt: str, count: int = 1):
+    try:
+        return await asyncio.gather(*(client.generate(prompt) for _ in range(count)))
+    finally:
+        await client.aclose()
+
+def test_retries_until_success(stub):
+    server = stub(fail_first=2)
+    client = client_for(server, max_retries=3)
+    [text] = asyncio.run(generate(client, "Texte à analyser : jean@example.com"))
+    assert "jean@example.com" in text
+    assert server.state.calls == 3
+
+def test_gives_up_after_max_retries(stub):
+    server = stub(error_rate=1.0)
+    client = client_for(server, max_retries=2)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(generate(client, "Texte à analyser : rien"))
+    assert error.value.status_code == 502
+    assert server.state.calls == 3
+
+def test_identical_requests_share_one_call(stub):
+    server = stub(latency=0.2)
+    client = client_for(server)
+    texts = asyncio.run(generate(client, "Texte à analyser : même prompt", count=5))
+    assert len(set(texts)) == 1
+    assert server.state.calls == 1
+
+def test_deadline_bounds_total_time(stub):
+    server = stub(latency=1.0)
+    client = client_for(server, timeout=0.2, deadline=0.5, max_retries=10)
+    start = time.monotonic()
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(generate(client, "Texte à analyser : lent"))
+    assert error.value.status_code == 504
+    assert time.monotonic() - start < 1.0
+    assert server.state.calls <= 4
@@ -0,0 +1,26 @@
+"""Import de `main` dans un interpréteur neuf : les dépendances lourdes de
+l'extraction sont chargées par le préchauffage, pas à l'import"""
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.bench_import import HEAVY_MODULES
+from tests.conftest import ROOT, TEST_ENV
+
+PROBE = (
+    "import json, sys\n"
+    "import main\n"
+    "print(json.dumps(sorted(sys.modules)))\n"
+)
+
+def test_main_does_not_import_heavy_modules(tmp_path):
+    env = {**os.environ, **TEST_ENV, "PYTHONPATH": ROOT}
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], env=env, cwd=tmp_path,
+        check=True, capture_output=True, text=True
+    ).stdout
+    modules = set(json.loads(output.strip().splitlines()[-1]))
+    assert not modules & set(HEAVY_MODULES)
+    # Importer `main` n'écrit rien (journaux, bases SQLite) dans le dossier courant
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,22 @@
+"""File de jobs SQLite : plafond de la file, prise des jobs et abandon
+après trop d'essais interrompus"""
+from app.services.jobs import JobStore
+
+def test_enqueue_refuses_when_queue_is_full(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    results = [store.enqueue("cv.pdf", "application/pdf", "/tmp/cv", max_queue=2) for _ in range(3)]
+    assert [job is not None for job, _ in results] == [True, True, False]
+    assert [pending for _, pending in results] == [0, 1, 2]
+    assert store.pending() == 2
+
+def test_claim_counts_attempts_and_gives_up(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job, _ = store.enqueue("cv.pdf", "application/pdf", "/tmp/cv", max_queue=10)
+    for attempt in range(1, 3):
+        claimed = store.claim("worker")
+        assert claimed["id"] == job["id"]
+        assert store.claim("worker") is None
+        # Heartbeat expiré : remis en file tant qu'il reste des essais
+        assert store.requeue_stale(stale_after=-1, max_attempts=2) == ((1, 0) if attempt < 2 else (0, 1))
+    assert store.get(job["id"])["status"] == "failed"
+    assert store.claim("worker") is None
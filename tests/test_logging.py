@@ -0,0 +1,32 @@
+"""Journaux par processus : fichiers des processus arrêtés supprimés au
+démarrage, sauf les plus récents"""
+import os
+import subprocess
+import sys
+
+from app.services.logging_pipeline import process_log_file, remove_stale_log_files
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+def test_removes_logs_of_stopped_processes(tmp_path):
+    path = str(tmp_path / "api.log")
+    stale = []
+    for age, pid in enumerate(dead_pid() for _ in range(3)):
+        names = [tmp_path / f"api.{pid}.log", tmp_path / f"api.{pid}.log.1"]
+        for name in names:
+            name.write_text("x")
+            os.utime(name, (1000 - age, 1000 - age))
+        stale.append(names)
+    current = tmp_path / os.path.basename(process_log_file(path))
+    current.write_text("x")
+    other = tmp_path / "autre.log"
+    other.write_text("x")
+
+    assert remove_stale_log_files(path, keep=1) == 4
+    # Le plus récent des processus arrêtés, ce processus et les autres fichiers restent
+    assert all(name.exists() for name in stale[0])
+    assert not any(name.exists() for names in stale[1:] for name in names)
+    assert current.exists() and other.exists()
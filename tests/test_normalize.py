@@ -0,0 +1,35 @@
+"""Normalisation du texte extrait : en-têtes et pieds de page répétés,
+mots coupés en fin de ligne"""
+from app.services.normalize import normalize_text, strip_repeated_lines
+from app.services.text_processing import clean_text
+
+def transcript(count: int):
+    return [
+        f"Relevé de notes\nÉtudiant {i}\nMathématiques : {10 + i}/20\nMoyenne générale : {12 + i},5/20"
+        for i in range(count)
+    ]
+
+def test_keeps_lines_that_differ_beyond_page_numbers():
+    pages = strip_repeated_lines(transcript(4))
+    assert pages == [
+        f"Étudiant {i}\nMathématiques : {10 + i}/20\nMoyenne générale : {12 + i},5/20" for i in range(4)
+    ]
+
+def test_drops_headers_and_page_numbers():
+    pages = [
+        f"Dossier de candidature\nContenu de la page {i} avec {i * 3} points\nPage {i + 1} / 5"
+        for i in range(5)
+    ]
+    assert strip_repeated_lines(pages) == [f"Contenu de la page {i} avec {i * 3} points" for i in range(5)]
+
+def test_never_empties_a_page():
+    pages = ["Annexe\n1", "Annexe\n2", "Annexe\n3"]
+    assert strip_repeated_lines(pages) == pages
+
+def test_ocr_joins_split_words():
+    assert normalize_text("une infor-\nmation utile") == "une information utile"
+    assert normalize_text("Jean-\nPierre et E-\nmail") == "Jean-Pierre et E-mail"
+
+def test_typed_text_keeps_compound_words():
+    text = "un porte-\nmonnaie, un auto-\nentrepreneur, c'est-\nà-dire peut-\nêtre"
+    assert clean_text(text) == "un porte-monnaie, un auto-entrepreneur, c'est-à-dire peut-être"
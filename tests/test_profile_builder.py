@@ -0,0 +1,45 @@
+"""Profil construit page par page : fragments lancés pendant l'extraction
+gardés ou recalculés selon le texte assemblé du document"""
+import asyncio
+
+from app.services import orientation_service
+from app.services.orientation_service import CHUNK_CHARS, ProfileBuilder
+
+def pages(count: int):
+    sentence = "Étudiante en licence, je souhaite poursuivre en master d'informatique. "
+    page = sentence * (CHUNK_CHARS // len(sentence))
+    return [f"{page}Page {num}" for num in range(count)]
+
+def rebase(monkeypatch, fed, final):
+    async def partial_profile(chunk, fields):
+        return {}
+
+    monkeypatch.setattr(orientation_service, "_partial_profile", partial_profile)
+
+    async def run():
+        builder = ProfileBuilder()
+        for text in fed:
+            builder.feed(text)
+        started = builder.chunks_started
+        kept = builder.rebase(final)
+        builder.cancel()
+        return started, kept, builder.text
+
+    return asyncio.run(run())
+
+def test_keeps_chunks_when_only_the_end_differs(monkeypatch):
+    fed = pages(3)
+    # Marges repérées sur tout le document : seul le pied de la dernière page change
+    final = "\n".join(fed[:-1] + [fed[-1].rsplit("Page", 1)[0]])
+    started, kept, text = rebase(monkeypatch, fed, final)
+    assert started > 0
+    assert kept
+    assert not text.endswith("Page 2")
+
+def test_recomputes_when_sent_text_differs(monkeypatch):
+    fed = pages(3)
+    final = "\n".join(text.rsplit("Page", 1)[0] for text in fed)
+    started, kept, text = rebase(monkeypatch, fed, final)
+    assert started > 0
+    assert not kept
+    assert "Page 0" not in text